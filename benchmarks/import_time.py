@@ -0,0 +1,142 @@
+"""
+Startup cost of the entry points and engines.
+
+    python -m benchmarks.import_time --runs 5
+    python -m benchmarks.import_time --compare benchmarks/results/<old>.json --max-regression 25
+
+Every target is imported (or its --help run) in a fresh interpreter with
+`python -X importtime`, so nothing is shared between measurements. The
+report gives the median import time per target, the packages that take
+most of it and, with --compare, the change against a previous results file.
+The exit status is 1 when a target regresses more than --max-regression
+percent, so the benchmark can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "results")
+
+
+
+def _cli_help(module: str) -> str:
+    """Code running `python -m <module> --help` (argument parsing included)."""
+    return (f"import runpy, sys\nsys.argv = ['{module}', '--help']\n"
+            f"try:\n    runpy.run_module('{module}', run_name='__main__')\nexcept SystemExit:\n    pass")
+
+
+# (name, python -c code)
+TARGETS: List[Tuple[str, str]] = [
+    ("src.main --help", _cli_help("src.main")),
+    ("src.worker --help", _cli_help("src.worker")),
+    ("src.pipeline", "import src.pipeline"),
+    ("src.engines.script_engine", "import src.engines.script_engine"),
+    ("src.engines.visual_engine", "import src.engines.visual_engine"),
+    ("src.engines.audio_engine", "import src.engines.audio_engine"),
+    ("src.engines.video_engine", "import src.engines.video_engine"),
+    ("google.generativeai", "import google.generativeai"),
+    ("moviepy.editor", "import moviepy.editor"),
+]
+
+
+def _import_times(code: str) -> List[Tuple[str, int]]:
+    """(module, self time in us) of every import done by `code` in a fresh interpreter."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=PROJECT_ROOT,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    times = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, _, name = line[len("import time:"):].split("|", 2)
+        if own.strip().isdigit():
+            times.append((name.strip(), int(own)))
+    return times
+
+
+_startup_modules: Optional[set] = None
+
+
+def measure(code: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Import time of `code` in ms, excluding what the interpreter imports at
+    startup anyway, and the same time split by top-level package (each
+    module's own time, so nested imports are not counted twice).
+    """
+    global _startup_modules
+    if _startup_modules is None:
+        _startup_modules = {name for name, _ in _import_times("pass")}
+    packages: Dict[str, float] = {}
+    for name, own_us in _import_times(code):
+        if name in _startup_modules:
+            continue
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + own_us / 1000
+    return sum(packages.values()), packages
+
+
+def run_target(code: str, runs: int) -> Dict:
+    totals, per_package = [], []
+    for _ in range(runs):
+        total, packages = measure(code)
+        totals.append(total)
+        per_package.append(packages)
+    top = sorted(per_package[-1].items(), key=lambda item: item[1], reverse=True)[:3]
+    return {
+        "median_ms": round(statistics.median(totals), 1),
+        "min_ms": round(min(totals), 1),
+        "top_packages": [[name, round(ms, 1)] for name, ms in top],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark of entry points and engines")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per target")
+    parser.add_argument("--targets", nargs="+", help="Only these targets (names from the table)")
+    parser.add_argument("--compare", type=str, help="Previous results file to diff against")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="Exit with status 1 if a target is this many percent slower than --compare")
+    parser.add_argument("--output", type=str, help="Where to store results (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    baseline: Dict[str, Dict] = {}
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)["results"]
+
+    results: Dict[str, Dict] = {}
+    regressions = []
+    print(f"{'objetivo':<30}{'mediana (ms)':>14}{'min (ms)':>10}{'cambio':>9}  paquetes más lentos")
+    for name, code in TARGETS:
+        if args.targets and name not in args.targets:
+            continue
+        result = results[name] = run_target(code, args.runs)
+        change: Optional[float] = None
+        old = baseline.get(name, {}).get("median_ms")
+        if old:
+            change = (result["median_ms"] - old) / old * 100
+            if args.max_regression is not None and change > args.max_regression:
+                regressions.append(name)
+        top = ", ".join(f"{pkg} {ms:.0f}" for pkg, ms in result["top_packages"])
+        change_txt = f"{change:+.0f}%" if change is not None else "-"
+        print(f"{name:<30}{result['median_ms']:>14.1f}{result['min_ms']:>10.1f}{change_txt:>9}  {top}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"import_time_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({"created": time.time(), "python": sys.version.split()[0], "runs": args.runs,
+                   "results": results}, f, indent=4, ensure_ascii=False)
+    print(f"\nResultados guardados en: {output}")
+
+    if regressions:
+        print(f"❌ Regresión de más del {args.max_regression:.0f}% en: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Frames/second of the Ken Burns frame generator.
+
+    python -m benchmarks.ken_burns_fps --seconds 5 --frames 120
+
+Compares the previous per-frame approach (LANCZOS resize of the whole image
+to the zoomed size, then a center crop, as MoviePy's resize did) against
+KenBurns with the default resampling (KEN_BURNS_RESAMPLE), the other modes
+and a panning camera. Also prints the mean absolute pixel difference from
+the previous frames (0-255 scale), so a change in framing shows up as a
+large error.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_frame(img: Image.Image, zoom: float, width: int, height: int) -> np.ndarray:
+    zoomed = np.asarray(img.resize((round(width * zoom), round(height * zoom)), Image.LANCZOS))
+    y = (zoomed.shape[0] - height) // 2
+    x = (zoomed.shape[1] - width) // 2
+    return zoomed[y:y + height, x:x + width]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ken Burns frame generator microbenchmark")
+    parser.add_argument("--image", type=str, help="Source image (default: synthetic 1280x720 test image)")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Scene duration")
+    parser.add_argument("--frames", type=int, default=120, help="Frames generated per variant")
+    args = parser.parse_args()
+
+    sys.path.insert(0, PROJECT_ROOT)
+    from src.engines.ken_burns import KenBurns
+    from src.variables import VIDEO_FPS, VIDEO_HEIGHT, KEN_BURNS_ZOOM_PER_SECOND, KEN_BURNS_RESAMPLE
+
+    image_path = args.image
+    if not image_path:
+        image_path = os.path.join(tempfile.mkdtemp(prefix="ken_burns_"), "source.png")
+        Image.effect_mandelbrot((1280, 720), (-2.2, -1.2, 1.0, 1.2), 120).convert("RGB").save(image_path)
+
+    with Image.open(image_path) as img:
+        w, h = img.size
+        width = int(round(w * VIDEO_HEIGHT / h / 2)) * 2
+        base = img.convert("RGB").resize((width, VIDEO_HEIGHT), Image.LANCZOS)
+
+    frame_times = [n / VIDEO_FPS for n in range(args.frames)]
+    frame_times = [t for t in frame_times if t < args.seconds] or [0.0]
+
+    start = time.perf_counter()
+    reference = [legacy_frame(base, 1 + KEN_BURNS_ZOOM_PER_SECOND * t, width, VIDEO_HEIGHT) for t in frame_times]
+    legacy_fps = len(frame_times) / (time.perf_counter() - start)
+
+    print(f"{len(frame_times)} frames de {width}x{VIDEO_HEIGHT}, escena de {args.seconds}s")
+    print(f"{'variante':<32}{'fps':>10}{'x':>8}{'diff':>8}")
+    print(f"{'legacy (LANCZOS por frame)':<32}{legacy_fps:>10.1f}{1.0:>8.1f}{0.0:>8.2f}")
+
+    variants = [
+        (KEN_BURNS_RESAMPLE, None),
+        ("nearest", None),
+        ("lanczos", None),
+        (KEN_BURNS_RESAMPLE, {"pan": "left", "easing": "ease_in_out"}),
+    ]
+    for resample, camera in variants:
+        setup = time.perf_counter()
+        engine = KenBurns(image_path, (width, VIDEO_HEIGHT), width, args.seconds, camera=camera, resample=resample)
+        setup = time.perf_counter() - setup
+        buffer = np.empty((VIDEO_HEIGHT, width, 3), dtype=np.uint8)
+
+        diffs = []
+        start = time.perf_counter()
+        for t, ref in zip(frame_times, reference):
+            frame = engine.render(t, buffer)
+            if camera is None:
+                diffs.append(np.abs(frame.astype(np.int16) - ref).mean())
+        fps = len(frame_times) / (time.perf_counter() - start)
+
+        name = resample + (f" {camera['pan']}/{camera['easing']}" if camera else "")
+        if resample == KEN_BURNS_RESAMPLE and camera is None:
+            name += " (default)"
+        diff = f"{np.mean(diffs):>8.2f}" if diffs else f"{'-':>8}"
+        print(f"{name:<32}{fps:>10.1f}{fps / legacy_fps:>8.1f}{diff}   (prescale {setup * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
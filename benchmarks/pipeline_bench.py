@@ -0,0 +1,197 @@
+"""
+End-to-end pipeline benchmark against local provider stand-ins.
+
+    python -m benchmarks.pipeline_bench --scenes 1 10 50 --episodes 3
+    python -m benchmarks.pipeline_bench --compare benchmarks/results/<old>.json
+
+For every script size a fresh worker process runs the batch pipeline
+(script -> assets -> render -> memory) against src.utils.standins. The
+report gives episodes/hour, p50/p95 latency per stage and peak RSS. Results
+are saved under benchmarks/results/ so regressions can be diffed.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "results")
+STAGES = ["script", "assets", "render", "memory", "total"]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def make_project(work_dir: str, backend: str, unlimited: bool) -> str:
+    """Temporary project root with a copy of the kids_story pod."""
+    pod_dir = os.path.join(work_dir, "pods", "bench")
+    os.makedirs(pod_dir, exist_ok=True)
+    with open(os.path.join(PROJECT_ROOT, "pods", "kids_story", "config.json"), 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    config.setdefault("render", {})["backend"] = backend
+    if unlimited:
+        for settings in config.get("performance", {}).get("providers", {}).values():
+            settings["rate"] = 1000.0
+            settings["burst"] = 1000
+    with open(os.path.join(pod_dir, "config.json"), 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=4)
+    return work_dir
+
+
+def run_worker(project_root: str, episodes: int):
+    """Child process: runs the batch pipeline and prints a JSON result line."""
+    sys.path.insert(0, PROJECT_ROOT)
+    from src.batch import BatchRunner
+    from src.pipeline import PodPipeline
+
+    runner = BatchRunner()
+    runner.pipelines["bench"] = PodPipeline("bench", project_root=project_root)
+    jobs = [{"pod": "bench", "topic": f"Benchmark episodio {n+1}"} for n in range(episodes)]
+
+    start = time.perf_counter()
+    try:
+        summaries = runner.run(jobs)
+        elapsed = time.perf_counter() - start
+    finally:
+        runner.close()
+
+    peak_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    print("RESULT " + json.dumps({
+        "wall_seconds": round(elapsed, 3),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "summaries": summaries,
+    }, ensure_ascii=False))
+
+
+def summarize(scenes: int, raw: Dict) -> Dict:
+    done = [s for s in raw["summaries"] if s["status"] == "done"]
+    stages = {}
+    for stage in STAGES:
+        values = [s["timings"][stage] for s in done if stage in s["timings"]]
+        stages[stage] = {"p50": percentile(values, 50), "p95": percentile(values, 95)}
+    return {
+        "scenes": scenes,
+        "episodes": len(raw["summaries"]),
+        "completed": len(done),
+        "wall_seconds": raw["wall_seconds"],
+        "episodes_per_hour": round(len(done) / raw["wall_seconds"] * 3600, 2) if raw["wall_seconds"] else 0.0,
+        "peak_rss_mb": raw["peak_rss_mb"],
+        "stages": stages,
+    }
+
+
+def print_report(results: List[Dict], baseline: Optional[Dict] = None):
+    base_by_scenes = {r["scenes"]: r for r in (baseline or {}).get("results", [])}
+
+    def delta(new: Optional[float], old: Optional[float]) -> str:
+        if new is None or old is None or old == 0:
+            return ""
+        return f" ({(new - old) / old * 100:+.0f}%)"
+
+    for r in results:
+        old = base_by_scenes.get(r["scenes"], {})
+        print(f"\n=== {r['scenes']} escenas | {r['completed']}/{r['episodes']} episodios ===")
+        print(f"episodios/hora: {r['episodes_per_hour']:.1f}{delta(r['episodes_per_hour'], old.get('episodes_per_hour'))}")
+        print(f"peak RSS: {r['peak_rss_mb']:.1f} MB{delta(r['peak_rss_mb'], old.get('peak_rss_mb'))}")
+        print(f"{'etapa':<10}{'p50 (s)':>12}{'p95 (s)':>12}")
+        for stage in STAGES:
+            p50, p95 = r["stages"][stage]["p50"], r["stages"][stage]["p95"]
+            old_p50 = old.get("stages", {}).get(stage, {}).get("p50")
+            p50_txt = f"{p50:.2f}" if p50 is not None else "-"
+            p95_txt = f"{p95:.2f}" if p95 is not None else "-"
+            print(f"{stage:<10}{p50_txt:>12}{p95_txt:>12}{delta(p50, old_p50)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark")
+    parser.add_argument("--scenes", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--episodes", type=int, default=3, help="Episodes per script size")
+    parser.add_argument("--backend", default="ffmpeg", choices=["moviepy", "ffmpeg", "segments", "stream"])
+    parser.add_argument("--profile", type=str, help="JSON file overriding src.utils.standins.DEFAULT_PROFILE")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplies every provider latency")
+    parser.add_argument("--error-rate", type=float, help="Error rate applied to every provider")
+    parser.add_argument("--unlimited", action="store_true", help="Lift the pod's provider rate limits")
+    parser.add_argument("--compare", type=str, help="Previous results file to diff against")
+    parser.add_argument("--output", type=str, help="Where to store results (default: benchmarks/results/)")
+    parser.add_argument("--worker", type=str, help=argparse.SUPPRESS)
+    parser.add_argument("--worker-episodes", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.worker_episodes)
+        return
+
+    sys.path.insert(0, PROJECT_ROOT)
+    from src.utils.standins import StandInServer, merge_profile
+
+    overrides = {}
+    if args.profile:
+        with open(args.profile, 'r', encoding='utf-8') as f:
+            overrides = json.load(f)
+    profile = merge_profile(overrides)
+    for settings in profile["providers"].values():
+        settings["latency"] *= args.latency_scale
+        settings["jitter"] *= args.latency_scale
+        if args.error_rate is not None:
+            settings["error_rate"] = args.error_rate
+
+    results = []
+    for scenes in args.scenes:
+        work_dir = tempfile.mkdtemp(prefix="pipeline_bench_")
+        server = StandInServer(dict(profile, scenes=scenes)).start()
+        env = dict(os.environ, **server.env(),
+                   ASSET_CACHE_DIR=os.path.join(work_dir, "cache", "assets"),
+                   SEGMENT_CACHE_DIR=os.path.join(work_dir, "cache", "segments"),
+                   SCRIPT_CACHE_DIR=os.path.join(work_dir, "cache", "scripts"))
+        print(f"▶ {scenes} escenas x {args.episodes} episodios (stand-ins en {server.url})")
+        try:
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.pipeline_bench",
+                 "--worker", make_project(work_dir, args.backend, args.unlimited),
+                 "--worker-episodes", str(args.episodes)],
+                cwd=PROJECT_ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+            )
+        finally:
+            server.stop()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("RESULT ")]
+        if proc.returncode != 0 or not lines:
+            print(f"[ERROR] El worker de {scenes} escenas falló (exit {proc.returncode})")
+            continue
+        results.append(summarize(scenes, json.loads(lines[-1][len("RESULT "):])))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            "created": time.time(),
+            "backend": args.backend,
+            "episodes": args.episodes,
+            "profile": profile,
+            "results": results,
+        }, f, indent=4, ensure_ascii=False)
+    print(f"\nResultados guardados en: {output}")
+
+
+if __name__ == "__main__":
+    main()
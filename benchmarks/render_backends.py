@@ -0,0 +1,150 @@
+"""
+Compares render time and peak RSS of the VideoAssembler backends on
+Pillow mock assets.
+
+    python -m benchmarks.render_backends --scenes 6 --seconds 3
+    python -m benchmarks.render_backends --scenes 10 40 160 --backends moviepy stream
+    python -m benchmarks.render_backends --backends ffmpeg --profiles preview final shorts
+
+Each backend renders in its own subprocess so peak RSS is not polluted by
+the other run. Several --scenes values give a peak-RSS-versus-length table:
+the Python process RSS is reported apart from the largest child (ffmpeg or
+segment workers), since only the former depends on how frames are produced.
+With several --profiles every backend renders once per render profile, which
+gives the render-time-versus-file-size table of the profiles.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+from src.variables import RENDER_PROFILES, DEFAULT_RENDER_PROFILE
+
+BACKENDS = ["moviepy", "ffmpeg", "segments", "stream"]
+
+
+def build_assets(work_dir: str, scenes: int, seconds: float):
+    """Writes a pod config, Pillow mock images and sine-tone narration."""
+    sys.path.insert(0, PROJECT_ROOT)
+    from src.engines.visual_engine import VisualGenerator
+    from src.utils.ffmpeg import run_ffmpeg
+
+    config_path = os.path.join(work_dir, "config.json")
+    with open(os.path.join(PROJECT_ROOT, "pods", "kids_story", "config.json"), 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+
+    visuals = VisualGenerator(config_path)
+    visual_paths, audio_paths = [], {}
+    for i in range(scenes):
+        image_path = os.path.join(visuals.assets_dir, f"scene_{i+1:03d}.png")
+        visuals._generate_pillow_image(f"Benchmark scene {i+1}", image_path, i)
+        visual_paths.append(image_path)
+
+        audio_path = os.path.join(visuals.assets_dir, f"audio_{i+1:03d}.mp3")
+        run_ffmpeg(["-f", "lavfi", "-i", f"sine=frequency={220 + 40 * i}:duration={seconds}", "-q:a", "5", audio_path])
+        audio_paths[i] = audio_path
+
+    script = {"title": "Benchmark", "scenes": [{"duration_est": seconds} for _ in range(scenes)]}
+    return config_path, script, visual_paths, audio_paths
+
+
+def run_worker(backend: str, work_dir: str, profile: str):
+    """Child process: renders once and prints a JSON result line."""
+    sys.path.insert(0, PROJECT_ROOT)
+    import PIL.Image
+    if not hasattr(PIL.Image, 'ANTIALIAS'):
+        PIL.Image.ANTIALIAS = PIL.Image.LANCZOS
+    from src.engines.video_engine import VideoAssembler
+
+    with open(os.path.join(work_dir, "inputs.json"), 'r', encoding='utf-8') as f:
+        inputs = json.load(f)
+    audio_paths = {int(k): v for k, v in inputs["audio_paths"].items()}
+
+    assembler = VideoAssembler(inputs["config_path"], profile=profile)
+    assembler.backend = backend
+    script = dict(inputs["script"], title=f"bench_{backend}")
+    settings = assembler.profile
+
+    start = time.perf_counter()
+    output_path = assembler.assemble_video(script, inputs["visual_paths"], audio_paths)
+    elapsed = time.perf_counter() - start
+
+    self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print("RESULT " + json.dumps({
+        "backend": backend,
+        "profile": profile,
+        "resolution": f"{settings['width'] or '-'}x{settings['height']}@{settings['fps']}",
+        "scenes": len(script["scenes"]),
+        "seconds": round(elapsed, 3),
+        "peak_rss_mb": round(max(self_kb, children_kb) / 1024, 1),
+        "python_rss_mb": round(self_kb / 1024, 1),
+        "child_rss_mb": round(children_kb / 1024, 1),
+        "size_kb": round(os.path.getsize(output_path) / 1024, 1),
+    }))
+
+
+def run_scene_count(scenes: int, seconds: float, backends: List[str], profiles: List[str]) -> List[Dict]:
+    work_dir = tempfile.mkdtemp(prefix="render_bench_")
+    config_path, script, visual_paths, audio_paths = build_assets(work_dir, scenes, seconds)
+    with open(os.path.join(work_dir, "inputs.json"), 'w', encoding='utf-8') as f:
+        json.dump({"config_path": config_path, "script": script,
+                   "visual_paths": visual_paths, "audio_paths": audio_paths}, f)
+
+    print(f"Benchmark: {scenes} escenas x {seconds}s ({work_dir})")
+    results = []
+    for profile in profiles:
+        for backend in backends:
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.render_backends", "--worker", backend, "--work-dir", work_dir,
+                 "--profiles", profile],
+                cwd=PROJECT_ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+                # Fresh segment cache so the "segments" backend really encodes
+                env=dict(os.environ, SEGMENT_CACHE_DIR=tempfile.mkdtemp(dir=work_dir))
+            )
+            lines = [line for line in proc.stdout.splitlines() if line.startswith("RESULT ")]
+            if proc.returncode != 0 or not lines:
+                print(f"[ERROR] backend {backend} ({profile}) falló (exit {proc.returncode})")
+                continue
+            results.append(json.loads(lines[-1][len("RESULT "):]))
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render backend benchmark")
+    parser.add_argument("--scenes", type=int, nargs="+", default=[6])
+    parser.add_argument("--seconds", type=float, default=3.0, help="Narration length per scene")
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--profiles", nargs="+", default=[DEFAULT_RENDER_PROFILE],
+                        help=f"Render profiles ({', '.join(RENDER_PROFILES)})")
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.work_dir, args.profiles[0])
+        return
+
+    results = []
+    for scenes in args.scenes:
+        results += run_scene_count(scenes, args.seconds, args.backends, args.profiles)
+
+    print(f"\n{'perfil':<9}{'backend':<10}{'formato':>16}{'escenas':>8}{'render (s)':>12}{'python RSS (MB)':>17}"
+          f"{'hijos RSS (MB)':>16}{'size (KB)':>12}")
+    for r in results:
+        print(f"{r['profile']:<9}{r['backend']:<10}{r['resolution']:>16}{r['scenes']:>8}{r['seconds']:>12.2f}"
+              f"{r['python_rss_mb']:>17.1f}{r['child_rss_mb']:>16.1f}{r['size_kb']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,20 @@
-import requests
 import os
 from dotenv import load_dotenv
 
+from src.utils import http_client
+from src.variables import ELEVENLABS_API_BASE
+
 load_dotenv()
 
 API_KEY = os.getenv("ELEVENLABS_API_KEY")
-URL = "https://api.elevenlabs.io/v1/voices"
+URL = f"{ELEVENLABS_API_BASE}/v1/voices"
 
 headers = {
   "Accept": "application/json",
   "xi-api-key": API_KEY
 }
 
-response = requests.get(URL, headers=headers)
+response = http_client.request("elevenlabs", "GET", URL, headers=headers)
 
 if response.status_code == 200:
     voices = response.json().get('voices', [])
@@ -0,0 +1,177 @@
+import argparse
+import json
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+from src.pipeline import PodPipeline
+from src.utils.concurrency import submit_in_context
+from src.utils.metrics import RunMetrics, activate
+
+# Load env vars
+load_dotenv()
+
+
+def load_jobs(path: str, pods: List[str]) -> List[Dict]:
+    """
+    Reads a topics file. Plain text holds one topic per line (blank lines and
+    `#` comments are skipped) and every topic is produced for every pod.
+    A `.jsonl` queue holds {"topic": ..., "pod": ...} objects; entries
+    without a pod go to every pod. Jobs are interleaved across pods so
+    consecutive episodes rarely share a pod.
+    """
+    jobs = []
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+    for line in lines:
+        if path.endswith(".jsonl"):
+            entry = json.loads(line)
+            targets = [entry["pod"]] if entry.get("pod") else pods
+            jobs += [{"pod": pod, "topic": entry["topic"]} for pod in targets]
+        else:
+            jobs += [{"pod": pod, "topic": line} for pod in pods]
+    return jobs
+
+
+class BatchRunner:
+    """
+    Produces many episodes in one process. Each pod's engines are built once
+    and reused, and rendering runs on a single background worker so episode
+    N+1's script and assets are generated while episode N renders. Because
+    that worker is FIFO, memory writes stay in episode order for every pod.
+    `prometheus` also writes a Prometheus dump of every episode's metrics.
+    """
+
+    def __init__(self, prometheus: bool = False):
+        self.pipelines: Dict[str, PodPipeline] = {}
+        self.prometheus = prometheus
+
+    def _pipeline(self, pod: str) -> PodPipeline:
+        if pod not in self.pipelines:
+            self.pipelines[pod] = PodPipeline(pod)
+        return self.pipelines[pod]
+
+    def run(self, jobs: List[Dict]) -> List[Dict]:
+        summaries = []
+        with ThreadPoolExecutor(max_workers=1) as render_executor:
+            renders = []
+            for n, job in enumerate(jobs, start=1):
+                summary = {"episode": n, "pod": job["pod"], "topic": job["topic"], "status": "running", "timings": {}}
+                summaries.append(summary)
+                print(f"\n🎬 [{n}/{len(jobs)}] Pod: {job['pod']} | Tema: {job['topic']}")
+
+                try:
+                    pipeline = self._pipeline(job["pod"])
+                    manifest = pipeline.new_manifest(job["topic"])
+                    summary["run_id"] = manifest.run_id
+                    metrics = pipeline.new_metrics(manifest)
+
+                    with activate(metrics):
+                        visual_paths, audio_paths, script = self._generate(pipeline, manifest, job, summary)
+                except Exception as e:
+                    self._fail(summary, e)
+                    continue
+
+                with activate(metrics):
+                    renders.append(submit_in_context(
+                        render_executor, self._finish, pipeline, script, visual_paths, audio_paths, manifest, summary, metrics
+                    ))
+
+            for future in renders:
+                future.result()
+        return summaries
+
+    def close(self):
+        for pipeline in self.pipelines.values():
+            pipeline.close()
+
+    def _generate(self, pipeline: PodPipeline, manifest, job: Dict, summary: Dict):
+        start = time.perf_counter()
+        script = pipeline.produce_script(job["topic"], manifest)
+        summary["timings"]["script"] = round(time.perf_counter() - start, 3)
+        if not script:
+            raise Exception("Script generation returned no script")
+        summary["title"] = script.get("title")
+
+        start = time.perf_counter()
+        try:
+            visual_paths, audio_paths = pipeline.produce_assets(script, manifest)
+        except Exception:
+            pipeline.abandon_run(manifest.run_id)
+            raise
+        summary["timings"]["assets"] = round(time.perf_counter() - start, 3)
+        return visual_paths, audio_paths, script
+
+    def _finish(self, pipeline: PodPipeline, script: Dict, visual_paths: List[str],
+                audio_paths: Dict[int, str], manifest, summary: Dict, metrics: RunMetrics):
+        try:
+            start = time.perf_counter()
+            summary["output"] = pipeline.render(script, visual_paths, audio_paths, manifest)
+            summary["timings"]["render"] = round(time.perf_counter() - start, 3)
+
+            start = time.perf_counter()
+            pipeline.save_memory(script, manifest)
+            summary["timings"]["memory"] = round(time.perf_counter() - start, 3)
+            summary["status"] = "done"
+            summary["metrics"] = metrics.write_reports(summary["output"], prometheus=self.prometheus)
+        except Exception as e:
+            self._fail(summary, e)
+            pipeline.abandon_run(manifest.run_id)
+        if summary["status"] == "done":
+            summary["timings"]["total"] = round(sum(summary["timings"].values()), 3)
+            print(f"✅ Episodio {summary['episode']} ({summary['pod']}): {summary['status']} en {summary['timings']['total']:.1f}s")
+
+    @staticmethod
+    def _fail(summary: Dict, error: Exception):
+        summary["status"] = "failed"
+        summary["error"] = str(error)
+        summary["timings"]["total"] = round(sum(summary["timings"].values()), 3)
+        print(f"❌ Episodio {summary['episode']} ({summary['pod']}) falló: {error}")
+        traceback.print_exc()
+
+
+def print_summary(summaries: List[Dict]):
+    print(f"\n{'#':>3}  {'pod':<14}{'estado':<8}{'guion':>8}{'assets':>8}{'render':>8}{'total':>8}  título")
+    for s in summaries:
+        t = s["timings"]
+        cells = [f"{t[k]:>8.1f}" if k in t else f"{'-':>8}" for k in ("script", "assets", "render", "total")]
+        print(f"{s['episode']:>3}  {s['pod']:<14}{s['status']:<8}{''.join(cells)}  {s.get('title') or s['topic']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI Video Creator - Batch production")
+    parser.add_argument("--topics", type=str, required=True, help="Topics file (.txt, one per line) or JSONL queue")
+    parser.add_argument("--pods", nargs="+", default=["kids_story"], help="Pods to produce for")
+    parser.add_argument("--summary", type=str, help="Write the per-episode summary as JSONL to this path")
+    parser.add_argument("--prometheus", action="store_true",
+                        help="Also write a Prometheus/OpenMetrics text dump of each episode's metrics")
+    args = parser.parse_args()
+
+    jobs = load_jobs(args.topics, args.pods)
+    print(f"🚀 Producción en lote: {len(jobs)} episodios en {len(set(j['pod'] for j in jobs))} pods")
+
+    start = time.perf_counter()
+    runner = BatchRunner(prometheus=args.prometheus)
+    try:
+        summaries = runner.run(jobs)
+    finally:
+        runner.close()
+    elapsed = time.perf_counter() - start
+
+    print_summary(summaries)
+    done = sum(1 for s in summaries if s["status"] == "done")
+    print(f"\n{done}/{len(summaries)} episodios completados en {elapsed:.1f}s")
+
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            for s in summaries:
+                f.write(json.dumps(s, ensure_ascii=False) + "\n")
+        print(f"Resumen guardado en: {args.summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,30 @@ from src.variables import (
     ELEVENLABS_DEFAULT_VOICE_ID, 
     ELEVENLABS_MODEL_ID, 
     ELEVENLABS_STABILITY, 
-    ELEVENLABS_SIMILARITY_BOOST
+    ELEVENLABS_SIMILARITY_BOOST,
+    ELEVENLABS_STYLE,
+    AUDIO_MAX_WORKERS,
+    AUDIO_STREAM_CHUNK_BYTES,
+    ELEVENLABS_API_BASE
 )
-from typing import Dict
+from src.utils.asset_cache import get_asset_cache, make_cache_key
+from src.utils.metrics import current_metrics
+from src.utils.concurrency import map_ordered, provider_limits, provider_slot
+from src.utils.placeholders import placeholder_mp3, speech_seconds
+from src.utils import http_client
+from typing import Callable, Dict, Optional
 import os
 import json
-import requests
 
 class AudioGenerator:
-    def __init__(self, pod_config_path: str):
+    def __init__(self, pod_config_path: str, config: Optional[dict] = None):
         # ... (keep existing init)
-        self.config = self._load_config(pod_config_path)
+        self.config = config if config is not None else self._load_config(pod_config_path)
         self.api_key = os.getenv("ELEVENLABS_API_KEY")
         self.mock_mode = not self.api_key or self.api_key == "your_elevenlabs_api_key_here"
-        
+        self.limits = provider_limits(self.config)
+        self.max_workers = self.config.get("performance", {}).get("audio_workers", AUDIO_MAX_WORKERS)
+
         # Ensure assets directory exists
         self.assets_dir = os.path.join(os.path.dirname(pod_config_path), "assets")
         os.makedirs(self.assets_dir, exist_ok=True)
@@ -24,32 +34,60 @@ class AudioGenerator:
         with open(path, 'r', encoding='utf-8') as f:
             return json.load(f)
 
-    def generate_narration(self, script: Dict) -> Dict[str, str]:
-        # ... (keep existing implementation)
-        audio_paths = {}
+    def generate_narration(self, script: Dict, completed: Optional[Dict[int, str]] = None,
+                           on_scene_ready: Optional[Callable[[int, str], None]] = None,
+                           assets_dir: Optional[str] = None) -> Dict[int, str]:
+        """
+        Generates one narration file per scene with `audio_text`.
+        Scenes in `completed` (index -> path) are reused as-is, and
+        `on_scene_ready(index, path)` is called as each new scene finishes.
+        Files go to `assets_dir` (default: the pod's assets folder).
+        """
         print(f"--- Iniciando Generación de Audio ({'MODO MOCK' if self.mock_mode else 'MODO API REAL'}) ---")
+        completed = completed or {}
+        assets_dir = assets_dir or self.assets_dir
+        os.makedirs(assets_dir, exist_ok=True)
 
-        for i, scene in enumerate(script['scenes']):
-            text = scene.get('audio_text')
-            character_name = scene.get('character', 'Narrator')
-            
-            if not text:
-                continue
-
-            # Determine voice ID based on character
-            voice_id = self._get_voice_id(character_name)
-            
-            output_filename = f"audio_{i+1:03d}_{character_name}.mp3"
-            output_path = os.path.join(self.assets_dir, output_filename)
-            
-            if self.mock_mode:
-                self._generate_mock_audio(text, output_path, i)
-            else:
-                self._generate_real_audio(text, voice_id, output_path)
-            
-            audio_paths[i] = output_path
-        
-        return audio_paths
+        def run_scene(i: int, scene: Dict) -> Optional[str]:
+            if i in completed:
+                print(f"[RESUME] Audio {i+1} ya generado: {completed[i]}")
+                return completed[i]
+            with current_metrics().scene("audio", i):
+                path = self._generate_scene(i, scene, assets_dir)
+            if path and on_scene_ready:
+                on_scene_ready(i, path)
+            return path
+
+        results = map_ordered(run_scene, script['scenes'], self.max_workers)
+        return {i: path for i, path in enumerate(results) if path}
+
+    def _generate_scene(self, i: int, scene: Dict, assets_dir: str) -> Optional[str]:
+        text = scene.get('audio_text')
+        character_name = scene.get('character', 'Narrator')
+
+        if not text:
+            return None
+
+        # Determine voice ID based on character
+        voice_id = self._get_voice_id(character_name)
+
+        output_filename = f"audio_{i+1:03d}_{character_name}.mp3"
+        output_path = os.path.join(assets_dir, output_filename)
+
+        if self.mock_mode:
+            with provider_slot("mock", self.limits):
+                self._generate_mock_audio(text, output_path, i, voice_id)
+        else:
+            try:
+                with provider_slot("elevenlabs", self.limits):
+                    self._generate_real_audio(text, voice_id, output_path)
+            except http_client.CircuitOpenError:
+                # ElevenLabs keeps failing: finish the run with mock narration instead of stalling it
+                print(f"[WARN] ElevenLabs no disponible (circuito abierto). Usando audio mock para escena {i+1}.")
+                with provider_slot("mock", self.limits):
+                    self._generate_mock_audio(text, output_path, i, voice_id)
+
+        return output_path
 
     def _get_voice_id(self, character_name: str) -> str:
         for char in self.config.get("characters", []):
@@ -57,19 +95,36 @@ class AudioGenerator:
                 return char.get("voice_id", ELEVENLABS_DEFAULT_VOICE_ID)
         return ELEVENLABS_DEFAULT_VOICE_ID
 
-    def _generate_mock_audio(self, text: str, path: str, index: int):
-        # ... (keep existing mock implementation)
+    def _generate_mock_audio(self, text: str, path: str, index: int, voice_id: str = ""):
+        """Valid MP3 as long as the text takes to say, from the local stand-in synthesizer."""
         print(f"[MOCK AUDIO] Generando para escena {index+1}: '{text[:30]}...'")
-        try:
-            os.system(f"say -o '{path}' --data-format=LEF32@22050 '{text}'")
-            if not os.path.exists(path):
-                raise Exception("System TTS failed")
-        except Exception:
-            with open(path, 'w') as f:
-                f.write("Mock Audio Content")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(placeholder_mp3(speech_seconds(text), voice_id))
+        os.replace(tmp_path, path)
 
     def _generate_real_audio(self, text: str, voice_id: str, output_path: str):
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+        voice_settings = {
+            "stability": ELEVENLABS_STABILITY,
+            "similarity_boost": ELEVENLABS_SIMILARITY_BOOST,
+            "style": ELEVENLABS_STYLE
+        }
+        cache_key = make_cache_key(
+            engine="elevenlabs",
+            model=ELEVENLABS_MODEL_ID,
+            text=text,
+            voice_id=voice_id,
+            **voice_settings
+        )
+        get_asset_cache().get_or_create(
+            cache_key,
+            output_path,
+            lambda: self._request_audio(text, voice_id, voice_settings, output_path),
+            meta={"engine": "elevenlabs", "voice_id": voice_id, "text": text[:80]}
+        )
+
+    def _request_audio(self, text: str, voice_id: str, voice_settings: Dict, output_path: str):
+        url = f"{ELEVENLABS_API_BASE}/v1/text-to-speech/{voice_id}"
         
         headers = {
             "Accept": "audio/mpeg",
@@ -80,23 +135,27 @@ class AudioGenerator:
         data = {
             "text": text,
             "model_id": ELEVENLABS_MODEL_ID,
-            "voice_settings": {
-                "stability": ELEVENLABS_STABILITY,
-                "similarity_boost": ELEVENLABS_SIMILARITY_BOOST
-            }
+            "voice_settings": voice_settings
         }
         
-        response = requests.post(url, json=data, headers=headers)
+        # stream=True: the MP3 is written as it arrives instead of after the whole body
+        response = http_client.request("elevenlabs", "POST", url, limits=self.limits, json=data, headers=headers,
+                                       stream=True)
         
-        if response.status_code == 200:
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=1024):
-                    if chunk:
-                        f.write(chunk)
-            print(f"[API] Audio generado para: {output_path}")
-        else:
-            print(f"Error {response.status_code}: {response.text}")
-            raise Exception("ElevenLabs API Error")
+        with response:
+            if response.status_code == 200:
+                # Written under a temp name so a scene is only announced once its file is complete
+                tmp_path = f"{output_path}.part"
+                with open(tmp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=AUDIO_STREAM_CHUNK_BYTES):
+                        if chunk:
+                            f.write(chunk)
+                os.replace(tmp_path, output_path)
+                current_metrics().incr("bytes_downloaded", os.path.getsize(output_path), provider="elevenlabs")
+                print(f"[API] Audio generado para: {output_path}")
+            else:
+                print(f"Error {response.status_code}: {response.text}")
+                raise Exception("ElevenLabs API Error")
 
 if __name__ == "__main__":
     from dotenv import load_dotenv
@@ -0,0 +1,20 @@
+from typing import Callable, Dict, Tuple
+
+# Kept apart from ken_burns so the script schema can validate a scene's
+# camera without importing NumPy and Pillow
+
+EASINGS: Dict[str, Callable[[float], float]] = {
+    "linear": lambda p: p,
+    "ease_in": lambda p: p * p,
+    "ease_out": lambda p: 1 - (1 - p) * (1 - p),
+    "ease_in_out": lambda p: p * p * (3 - 2 * p),
+}
+
+# Direction the view travels towards while zooming in (x, y)
+PAN_DIRECTIONS: Dict[str, Tuple[int, int]] = {
+    "center": (0, 0),
+    "left": (-1, 0),
+    "right": (1, 0),
+    "up": (0, -1),
+    "down": (0, 1),
+}
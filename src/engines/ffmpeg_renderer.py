@@ -0,0 +1,428 @@
+import glob
+import os
+import uuid
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from src.engines.subtitles import Cue, caption_png, caption_style
+from src.utils.asset_cache import make_cache_key
+from src.utils.ffmpeg import run_ffmpeg
+from src.utils.metrics import current_metrics
+from src.utils.run_manifest import file_sha256
+from src.variables import (
+    VIDEO_FPS,
+    VIDEO_CODEC,
+    AUDIO_CODEC,
+    VIDEO_HEIGHT,
+    VIDEO_WIDTH,
+    KEN_BURNS_ZOOM_PER_SECOND,
+    RENDER_THREADS,
+    SEGMENT_CACHE_DIR,
+    SEGMENT_CACHE_MAX_BYTES,
+    SUBTITLE_FONT
+)
+
+AUDIO_SAMPLE_RATE = 44100
+
+# Encoder settings of a renderer built without a profile: the codec defaults
+ENCODING_DEFAULTS = {"codec": VIDEO_CODEC, "preset": None, "crf": None, "threads": None,
+                     "audio_codec": AUDIO_CODEC, "audio_bitrate": None, "two_pass": False, "video_bitrate": None}
+
+# ISO 639-2 codes for the MP4 audio track language tag
+_LANGUAGE_TAGS = {"es": "spa", "en": "eng", "pt": "por", "fr": "fra", "de": "deu", "it": "ita",
+                  "ca": "cat", "ja": "jpn", "zh": "zho", "ko": "kor", "ru": "rus", "ar": "ara"}
+
+
+def language_tag(language: str) -> str:
+    """"en-US" -> "eng" ("und" if unknown)."""
+    return _LANGUAGE_TAGS.get(language.split("-")[0].lower(), "und")
+
+
+class FFmpegRenderer:
+    """
+    Renders the timeline with ffmpeg filter graphs. Scaling, the Ken Burns
+    zoom, concatenation and audio padding all run inside ffmpeg, so no frame
+    ever goes through Python. `render` uses a single invocation for the whole
+    video; `render_segments` encodes scenes in parallel and stream-copies them.
+
+    A timeline is a list of scenes: {"image": path, "audio": path or None,
+    "duration": seconds, "cues": [(start, end, text)]}. With `burn_subtitles`
+    the cues are overlaid (as cached caption PNGs) in the same filter graph.
+
+    `width` fixes the frame width (scenes are center-cropped or padded to
+    it) and `encoding` overrides ENCODING_DEFAULTS; both usually come from a
+    render profile (see from_profile).
+    """
+
+    def __init__(self, fps: int = VIDEO_FPS, height: int = VIDEO_HEIGHT,
+                 zoom_per_second: float = KEN_BURNS_ZOOM_PER_SECOND, burn_subtitles: bool = False,
+                 width: Optional[int] = None, encoding: Optional[Dict] = None):
+        self.fps = fps
+        self.height = height
+        self.width = width
+        self.zoom_per_second = zoom_per_second
+        self.burn_subtitles = burn_subtitles
+        self.encoding = {**ENCODING_DEFAULTS, **(encoding or {})}
+        self.caption_size, self.caption_margin = caption_style((width or VIDEO_WIDTH, height))
+
+    @classmethod
+    def from_profile(cls, profile: Dict, burn_subtitles: bool = False) -> "FFmpegRenderer":
+        """Renderer for a RENDER_PROFILES entry."""
+        encoding = {key: profile[key] for key in ENCODING_DEFAULTS if key in profile}
+        encoding.setdefault("threads", RENDER_THREADS)
+        return cls(fps=profile["fps"], height=profile["height"], width=profile.get("width"),
+                   encoding=encoding, burn_subtitles=burn_subtitles)
+
+    def video_args(self) -> List[str]:
+        """Video encoder options: constant quality (CRF), or the target bitrate when encoding in two passes."""
+        enc = self.encoding
+        args = ["-c:v", enc["codec"], "-pix_fmt", "yuv420p"]
+        if enc["preset"]:
+            args += ["-preset", enc["preset"]]
+        if enc["two_pass"]:
+            if not enc["video_bitrate"]:
+                raise ValueError("Two-pass encoding needs a 'video_bitrate' in the render profile")
+            args += ["-b:v", str(enc["video_bitrate"])]
+        elif enc["crf"] is not None:
+            args += ["-crf", str(enc["crf"])]
+        if enc["threads"] is not None:
+            args += ["-threads", str(enc["threads"])]
+        return args
+
+    def audio_args(self) -> List[str]:
+        args = ["-c:a", self.encoding["audio_codec"]]
+        if self.encoding["audio_bitrate"]:
+            args += ["-b:a", str(self.encoding["audio_bitrate"])]
+        return args
+
+    @property
+    def two_pass(self) -> bool:
+        return bool(self.encoding["two_pass"])
+
+    def scaled_width(self, image_path: str) -> int:
+        """Width of the image once scaled to the target height (kept even for yuv420p)."""
+        with Image.open(image_path) as img:
+            w, h = img.size
+        return int(round(w * self.height / h / 2)) * 2
+
+    def canvas_size(self, timeline: List[Dict]) -> Tuple[int, int]:
+        """
+        The fixed width if there is one; otherwise the same rule as
+        concatenate_videoclips(method="compose"): the widest scene wins.
+        """
+        if self.width:
+            return self.width, self.height
+        return max(self.scaled_width(scene["image"]) for scene in timeline), self.height
+
+    def caption_inputs(self, scene: Dict, first_input: int) -> Tuple[List[str], List[Tuple[int, Cue]]]:
+        """Input arguments for the scene's caption images and the (input index, cue) of each."""
+        if not self.burn_subtitles:
+            return [], []
+        args, captions = [], []
+        for n, cue in enumerate(scene.get("cues", [])):
+            args += ["-i", caption_png(cue[2], self.caption_size)]
+            captions.append((first_input + n, cue))
+        return args, captions
+
+    def scene_filters(self, index: int, scene: Dict, scene_width: int, canvas: Tuple[int, int],
+                      video_input: int, audio_input: int,
+                      captions: Sequence[Tuple[int, Cue]] = ()) -> List[str]:
+        """Filter chains producing the [v<index>] and [a<index>] pads of one scene."""
+        canvas_w, canvas_h = canvas
+        zoom = self.zoom_per_second
+        crop_w = min(scene_width, canvas_w)
+        # crop only reads the input size once, so the centring offsets follow the zoom explicitly
+        crop_x = f"(trunc({scene_width}*(1+{zoom}*t)/2)*2-{crop_w})/2"
+        crop_y = f"(trunc({self.height}*(1+{zoom}*t)/2)*2-{self.height})/2"
+        video = (
+            f"[{video_input}:v]scale=-2:{self.height},"
+            f"scale=w='trunc(iw*(1+{zoom}*t)/2)*2':h='trunc(ih*(1+{zoom}*t)/2)*2':eval=frame,"
+            f"crop={crop_w}:{self.height}:x='{crop_x}':y='{crop_y}',"
+            f"pad={canvas_w}:{canvas_h}:(ow-iw)/2:(oh-ih)/2,"
+            f"setsar=1,fps={self.fps}"
+        )
+        # Each caption is a still image shown between its cue times (t restarts at 0 every scene)
+        for n, (caption_input, (start, end, _)) in enumerate(captions):
+            video += (f"[c{index}_{n}];[c{index}_{n}][{caption_input}:v]overlay="
+                      f"x=(W-w)/2:y=H-h-{self.caption_margin}:enable='between(t,{start:.3f},{end:.3f})'")
+        video += f",format=yuv420p[v{index}]"
+        return [video, self.scene_audio_filter(index, scene, audio_input)]
+
+    def scene_audio_filter(self, index: int, scene: Dict, audio_input: Optional[int]) -> str:
+        """Filter chain producing the [a<index>] pad: the narration padded/trimmed to the scene, or silence."""
+        duration = scene["duration"]
+        if scene.get("audio"):
+            return (
+                f"[{audio_input}:a]aresample={AUDIO_SAMPLE_RATE},"
+                f"aformat=sample_fmts=fltp:channel_layouts=stereo,"
+                f"apad,atrim=0:{duration:.3f}[a{index}]"
+            )
+        return f"aevalsrc=0:c=stereo:s={AUDIO_SAMPLE_RATE}:d={duration:.3f}[a{index}]"
+
+    def build_command(self, timeline: List[Dict], output_path: str) -> List[str]:
+        """ffmpeg arguments (without the binary) that render the timeline."""
+        canvas = self.canvas_size(timeline)
+        inputs, filters, pads = [], [], []
+        input_count = 0
+
+        for i, scene in enumerate(timeline):
+            duration = scene["duration"]
+            inputs += ["-loop", "1", "-framerate", str(self.fps), "-t", f"{duration:.3f}", "-i", scene["image"]]
+            video_input = input_count
+            input_count += 1
+
+            audio_input = None
+            if scene.get("audio"):
+                inputs += ["-i", scene["audio"]]
+                audio_input = input_count
+                input_count += 1
+
+            caption_args, captions = self.caption_inputs(scene, input_count)
+            inputs += caption_args
+            input_count += len(captions)
+
+            filters += self.scene_filters(i, scene, self.scaled_width(scene["image"]), canvas,
+                                          video_input, audio_input, captions)
+            pads.append(f"[v{i}][a{i}]")
+
+        filters.append(f"{''.join(pads)}concat=n={len(timeline)}:v=1:a=1[vout][aout]")
+
+        return inputs + [
+            "-filter_complex", ";".join(filters),
+            "-map", "[vout]", "-map", "[aout]",
+            "-r", str(self.fps),
+            *self.video_args(),
+            *self.audio_args(),
+            "-movflags", "+faststart",
+            output_path
+        ]
+
+    def render(self, timeline: List[Dict], output_path: str) -> str:
+        run_encode(self.build_command(timeline, output_path), self.two_pass)
+        return output_path
+
+    def build_audio_track_command(self, timeline: List[Dict], audio_paths: Dict[int, str],
+                                  output_path: str) -> List[str]:
+        """
+        ffmpeg arguments that render only a soundtrack: the timeline's scene
+        timing with other narration files (e.g. another language), padded
+        and trimmed per scene exactly like the video's own audio.
+        """
+        inputs, filters, pads = [], [], []
+        for i, scene in enumerate(timeline):
+            track_scene = {"duration": scene["duration"], "audio": audio_paths.get(i)}
+            audio_input = None
+            if track_scene["audio"]:
+                audio_input = len(inputs) // 2
+                inputs += ["-i", track_scene["audio"]]
+            filters.append(self.scene_audio_filter(i, track_scene, audio_input))
+            pads.append(f"[a{i}]")
+        filters.append(f"{''.join(pads)}concat=n={len(timeline)}:v=0:a=1[aout]")
+        return inputs + ["-filter_complex", ";".join(filters), "-map", "[aout]", *self.audio_args(), output_path]
+
+    def render_audio_track(self, timeline: List[Dict], audio_paths: Dict[int, str], output_path: str) -> str:
+        run_ffmpeg(self.build_audio_track_command(timeline, audio_paths, output_path))
+        return output_path
+
+    def mux_audio_tracks(self, video_path: str, tracks: List[Tuple[str, str]], output_path: str,
+                         keep_language: Optional[str] = None) -> str:
+        """
+        Stream-copies the video of `video_path` with the (language, file)
+        audio `tracks`. With `keep_language`, the video's own audio stays as
+        the first (default) track, tagged with that language. Nothing is
+        re-encoded.
+        """
+        args = ["-i", video_path]
+        for _, path in tracks:
+            args += ["-i", path]
+        args += ["-map", "0:v"]
+        languages = []
+        if keep_language:
+            args += ["-map", "0:a"]
+            languages.append(keep_language)
+        for n, (language, _) in enumerate(tracks, start=1):
+            args += ["-map", f"{n}:a"]
+            languages.append(language)
+        args += ["-c", "copy"]
+        for n, language in enumerate(languages):
+            args += [f"-metadata:s:a:{n}", f"language={language_tag(language)}",
+                     f"-disposition:a:{n}", "default" if n == 0 else "0"]
+        run_ffmpeg(args + ["-movflags", "+faststart", output_path])
+        return output_path
+
+    def build_segment_command(self, scene: Dict, canvas: Tuple[int, int], output_path: str) -> List[str]:
+        """ffmpeg arguments that render a single scene to its own segment."""
+        inputs = ["-loop", "1", "-framerate", str(self.fps), "-t", f"{scene['duration']:.3f}", "-i", scene["image"]]
+        audio_input = None
+        if scene.get("audio"):
+            inputs += ["-i", scene["audio"]]
+            audio_input = 1
+        caption_args, captions = self.caption_inputs(scene, 2 if audio_input else 1)
+        inputs += caption_args
+        video_filter, audio_filter = self.scene_filters(0, scene, self.scaled_width(scene["image"]), canvas, 0,
+                                                        audio_input, captions)
+
+        return inputs + [
+            "-filter_complex", f"{video_filter};{audio_filter}",
+            "-map", "[v0]", "-map", "[a0]",
+            "-r", str(self.fps),
+            *self.video_args(),
+            *self.audio_args(), "-ar", str(AUDIO_SAMPLE_RATE), "-ac", "2",
+            output_path
+        ]
+
+    def segment_key(self, scene: Dict, canvas: Tuple[int, int]) -> str:
+        """Hash of everything that changes a segment's pixels or samples."""
+        return make_cache_key(
+            engine="segment",
+            image=file_sha256(scene["image"]),
+            audio=file_sha256(scene["audio"]) if scene.get("audio") else None,
+            duration=round(scene["duration"], 3),
+            fps=self.fps,
+            height=self.height,
+            zoom=self.zoom_per_second,
+            zoom_anchor="center",
+            canvas=list(canvas),
+            captions=([list(cue) for cue in scene.get("cues", [])], SUBTITLE_FONT, self.caption_size,
+                      self.caption_margin) if self.burn_subtitles else None,
+            encoding=self.encoding
+        )
+
+    def submit_segment(self, executor: Executor, index: int, scene: Dict, canvas: Tuple[int, int],
+                       segment_dir: str = SEGMENT_CACHE_DIR) -> Tuple[str, Optional[Future]]:
+        """
+        Queues one scene's segment on `executor` unless it is already cached.
+        Returns the segment path and the render future (None on a cache hit).
+        """
+        os.makedirs(segment_dir, exist_ok=True)
+        path = os.path.join(segment_dir, f"{self.segment_key(scene, canvas)}.mp4")
+        if _touch(path):
+            print(f"[SEGMENT] Escena {index+1} reutilizada de caché")
+            current_metrics().incr("cache_hits", cache="segments")
+            return path, None
+        current_metrics().incr("cache_misses", cache="segments")
+        # Unique temp name: overlapping episodes may render the same segment at once
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp.mp4"
+        return path, executor.submit(_render_segment, self.build_segment_command(scene, canvas, tmp_path), path,
+                                     self.two_pass)
+
+    def concat_segments(self, segment_paths: List[str], output_path: str) -> str:
+        """Joins rendered segments with the concat demuxer using stream copy (no re-encode)."""
+        concat_list = f"{output_path}.segments.txt"
+        with open(concat_list, 'w', encoding='utf-8') as f:
+            for path in segment_paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        try:
+            run_ffmpeg(["-f", "concat", "-safe", "0", "-i", concat_list, "-c", "copy",
+                        "-movflags", "+faststart", output_path])
+        finally:
+            os.remove(concat_list)
+        if segment_paths:
+            prune_segment_cache(os.path.dirname(segment_paths[0]))
+        return output_path
+
+    def render_segments(self, timeline: List[Dict], output_path: str, workers: Optional[int] = None,
+                        segment_dir: str = SEGMENT_CACHE_DIR) -> str:
+        """
+        Renders every scene to its own segment on a process pool, then joins
+        them with stream copy. Segments are cached by input hash, so editing
+        one scene only re-encodes that scene.
+        """
+        canvas = self.canvas_size(timeline)
+        workers = min(workers or os.cpu_count() or 1, len(timeline))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            jobs = [self.submit_segment(executor, i, scene, canvas, segment_dir) for i, scene in enumerate(timeline)]
+            pending = [(i, future) for i, (_, future) in enumerate(jobs) if future]
+            if pending:
+                print(f"[SEGMENT] Renderizando {len(pending)} segmentos con {min(workers, len(pending))} procesos...")
+            for i, future in pending:
+                future.result()
+                print(f"[SEGMENT] Escena {i+1} renderizada")
+
+        return self.concat_segments([path for path, _ in jobs], output_path)
+
+
+def _touch(path: str) -> bool:
+    """Marks a cached segment as just used; False if it is not (or no longer) there."""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def prune_segment_cache(segment_dir: str = SEGMENT_CACHE_DIR, max_bytes: int = SEGMENT_CACHE_MAX_BYTES) -> int:
+    """
+    Deletes the least recently used segments until the cache fits in
+    `max_bytes`. Use is tracked by mtime, which every cache hit refreshes,
+    so the segments of the episode just joined are the last to go.
+    Returns the number of bytes freed.
+    """
+    entries = []
+    with os.scandir(segment_dir) as it:
+        for entry in it:
+            if entry.name.endswith(".mp4") and not entry.name.endswith(".tmp.mp4"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total - freed <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        freed += size
+    if freed:
+        print(f"[SEGMENT] Caché recortada: {freed / 1024 ** 2:.1f} MB liberados")
+        current_metrics().incr("cache_evicted_bytes", freed, cache="segments")
+    return freed
+
+
+def encode_passes(args: List[str], two_pass: bool) -> List[List[str]]:
+    """
+    ffmpeg invocations of one encode. Two-pass adds an analysis pass first
+    (no audio, null output) that leaves x264's stats next to the output.
+    """
+    if not two_pass:
+        return [args]
+    output_path = args[-1]
+    log = f"{output_path}.passlog"
+    return [args[:-1] + ["-pass", "1", "-passlogfile", log, "-an", "-f", "null", os.devnull],
+            args[:-1] + ["-pass", "2", "-passlogfile", log, output_path]]
+
+
+def remove_pass_logs(output_path: str):
+    for path in glob.glob(f"{glob.escape(output_path)}.passlog*"):
+        os.remove(path)
+
+
+def run_encode(args: List[str], two_pass: bool = False):
+    try:
+        for pass_args in encode_passes(args, two_pass):
+            run_ffmpeg(pass_args)
+    finally:
+        if two_pass:
+            remove_pass_logs(args[-1])
+
+
+def _render_segment(args: List[str], final_path: str, two_pass: bool = False):
+    """Process-pool worker: encodes one segment and publishes it atomically."""
+    tmp_path = args[-1]
+    try:
+        run_encode(args, two_pass)
+    except BaseException:
+        # A partial *.tmp.mp4 is never pruned from the cache, so it goes now
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    os.replace(tmp_path, final_path)
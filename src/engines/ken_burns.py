@@ -0,0 +1,146 @@
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from src.engines.camera import EASINGS, PAN_DIRECTIONS
+from src.variables import VIDEO_FPS, KEN_BURNS_ZOOM_PER_SECOND, KEN_BURNS_RESAMPLE
+
+RESAMPLE_MODES = ("bilinear", "nearest", "lanczos")
+
+
+class KenBurns:
+    """
+    Ken Burns frames for one scene image, written into a caller-provided
+    buffer. "bilinear" (the default) and "nearest" resize the source once,
+    with LANCZOS, to the size it reaches at the end of the zoom, so every
+    frame is a NumPy crop-and-resample of that array (a downscale by at most
+    the zoom range) into preallocated scratch arrays. "lanczos" instead
+    resizes just the visible box of the image with LANCZOS every frame, the
+    quality of MoviePy's per-frame resize at about its speed.
+
+    `base_size` is the image scaled to the video height (zoom 1.0) and
+    `out_width` the width of the frame (the base width, or less when the
+    canvas is narrower). With the default camera (center, linear) the framing
+    matches the ffmpeg/MoviePy zoom: 1 + zoom_per_second * t, centered.
+
+    A scene can set {"camera": {"pan": "left", "easing": "ease_in_out"}} in
+    the script. Easing shapes both the zoom and the pan over the scene, and
+    the pan slides the view towards one edge as far as the zoom allows.
+    """
+
+    def __init__(self, image_path: str, base_size: Tuple[int, int], out_width: int, duration: float,
+                 fps: int = VIDEO_FPS, zoom_per_second: float = KEN_BURNS_ZOOM_PER_SECOND,
+                 camera: Optional[Dict] = None, resample: str = KEN_BURNS_RESAMPLE):
+        camera = camera or {}
+        pan = camera.get("pan", "center")
+        easing = camera.get("easing", "linear")
+        if pan not in PAN_DIRECTIONS:
+            raise ValueError(f"Unknown pan '{pan}'. Options: {', '.join(PAN_DIRECTIONS)}")
+        if easing not in EASINGS:
+            raise ValueError(f"Unknown easing '{easing}'. Options: {', '.join(EASINGS)}")
+        if resample not in RESAMPLE_MODES:
+            raise ValueError(f"Unknown resample '{resample}'. Options: {', '.join(RESAMPLE_MODES)}")
+
+        self.base_w, self.height = base_size
+        self.out_width = out_width
+        self.duration = duration
+        self.fps = fps
+        self.zoom_range = zoom_per_second * duration
+        self.pan = PAN_DIRECTIONS[pan]
+        self.ease = EASINGS[easing]
+        self.resample = resample
+
+        if resample == "lanczos":
+            with Image.open(image_path) as img:
+                self.base = img.convert("RGB").resize(base_size, Image.LANCZOS)
+            return
+
+        max_zoom = 1 + self.zoom_range
+        with Image.open(image_path) as img:
+            prescaled = img.convert("RGBA").resize(
+                (math.ceil(self.base_w * max_zoom), math.ceil(self.height * max_zoom)), Image.LANCZOS
+            )
+        # One uint32 per RGBA pixel, so every gather moves whole pixels
+        self.source = np.asarray(prescaled).view(np.uint32).reshape(prescaled.height, prescaled.width)
+        self.src_h, self.src_w = self.source.shape
+        self.scale_x, self.scale_y = self.src_w / self.base_w, self.src_h / self.height
+
+        # Pixel-center offsets of the output frame, relative to its middle
+        self._offsets_x = np.arange(out_width) + 0.5 - out_width / 2
+        self._offsets_y = np.arange(self.height) + 0.5 - self.height / 2
+        self._rows = np.empty((self.height, self.src_w), dtype=np.uint32)
+        self._pixels = np.empty((self.height, out_width), dtype=np.uint32)
+        if resample == "bilinear":
+            # Channels blended as uint16; a 4-channel uint16 pixel is gathered as one uint64
+            self._rows_next = np.empty_like(self._rows)
+            self._blend = np.empty((self.height, self.src_w * 4), dtype=np.uint16)
+            self._blend_tmp = np.empty_like(self._blend)
+            self._cols = np.empty((self.height, out_width * 4), dtype=np.uint16)
+            self._cols_next = np.empty_like(self._cols)
+
+    def view(self, t: float) -> Tuple[float, float, float]:
+        """Zoom and center (in base-size pixels) of the frame at time t."""
+        progress = self.ease(min(max(t / self.duration, 0.0), 1.0)) if self.duration > 0 else 0.0
+        zoom = 1 + self.zoom_range * progress
+        half_w, half_h = self.out_width / zoom / 2, self.height / zoom / 2
+        center_x = self.base_w / 2 + self.pan[0] * progress * (self.base_w / 2 - half_w)
+        center_y = self.height / 2 + self.pan[1] * progress * (self.height / 2 - half_h)
+        return zoom, center_x, center_y
+
+    def source_coords(self, t: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Source-array coordinates sampled by every output column and row at time t."""
+        zoom, center_x, center_y = self.view(t)
+        xs = (center_x + self._offsets_x / zoom) * self.scale_x - 0.5
+        ys = (center_y + self._offsets_y / zoom) * self.scale_y - 0.5
+        return xs, ys
+
+    def render(self, t: float, out: np.ndarray) -> np.ndarray:
+        """Fills `out` (height x out_width x 3, uint8) with the frame at time t."""
+        if self.resample == "lanczos":
+            zoom, center_x, center_y = self.view(t)
+            half_w, half_h = self.out_width / zoom / 2, self.height / zoom / 2
+            box = (center_x - half_w, center_y - half_h, center_x + half_w, center_y + half_h)
+            out[...] = np.asarray(self.base.resize((self.out_width, self.height), Image.LANCZOS, box=box))
+            return out
+
+        xs, ys = self.source_coords(t)
+        if self.resample == "nearest":
+            cols = np.clip(np.rint(xs).astype(np.intp), 0, self.src_w - 1)
+            rows = np.clip(np.rint(ys).astype(np.intp), 0, self.src_h - 1)
+            np.take(self.source, rows, axis=0, out=self._rows, mode="clip")
+            np.take(self._rows, cols, axis=1, out=self._pixels, mode="clip")
+            return self._store(self._pixels.view(np.uint8), out)
+
+        # Separable bilinear in 8-bit fixed point: rows first, then columns
+        x0 = np.clip(np.floor(xs).astype(np.intp), 0, self.src_w - 2)
+        y0 = np.clip(np.floor(ys).astype(np.intp), 0, self.src_h - 2)
+        wx = np.repeat((np.clip(xs - x0, 0, 1) * 256).astype(np.uint16), 4)
+        wy = (np.clip(ys - y0, 0, 1) * 256).astype(np.uint16)[:, None]
+        np.take(self.source, y0, axis=0, out=self._rows, mode="clip")
+        np.take(self.source, y0 + 1, axis=0, out=self._rows_next, mode="clip")
+        # Only the columns the frame samples (all of them only at the end of the zoom)
+        span = slice(x0[0] * 4, (x0[-1] + 2) * 4)
+        rows, rows_next = self._rows.view(np.uint8)[:, span], self._rows_next.view(np.uint8)[:, span]
+        blend, blend_tmp = self._blend[:, span], self._blend_tmp[:, span]
+        np.multiply(rows, 256 - wy, out=blend)
+        np.multiply(rows_next, wy, out=blend_tmp)
+        np.add(blend, blend_tmp, out=blend)
+        np.right_shift(blend, 8, out=blend)
+        blend = self._blend.view(np.uint64)
+        np.take(blend, x0, axis=1, out=self._cols.view(np.uint64), mode="clip")
+        np.take(blend, x0 + 1, axis=1, out=self._cols_next.view(np.uint64), mode="clip")
+        np.multiply(self._cols, 256 - wx, out=self._cols)
+        np.multiply(self._cols_next, wx, out=self._cols_next)
+        np.add(self._cols, self._cols_next, out=self._cols)
+        np.right_shift(self._cols, 8, out=self._cols)
+        return self._store(self._cols, out)
+
+    def _store(self, rgba: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """Copies the RGB channels of a (height, out_width * 4) array into `out`."""
+        # One channel at a time: a 3-of-4 channel copy runs NumPy's inner loop 3 elements long
+        pixels = rgba.reshape(self.height, self.out_width, 4)
+        for channel in range(3):
+            np.copyto(out[..., channel], pixels[..., channel], casting="unsafe")
+        return out
@@ -0,0 +1,88 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+# --- MONKEY PATCH FOR MOVIEPY COMPATIBILITY WITH NEW PILLOW ---
+import PIL.Image
+if not hasattr(PIL.Image, 'ANTIALIAS'):
+    PIL.Image.ANTIALIAS = PIL.Image.LANCZOS
+# ----------------------------------------------------------------
+
+from moviepy.audio.AudioClip import AudioClip
+from moviepy.editor import VideoClip, AudioFileClip
+
+from src.engines.ffmpeg_renderer import FFmpegRenderer
+from src.engines.ken_burns import KenBurns
+from src.engines.subtitles import burn_caption
+
+# MoviePy (and imageio/ffmpeg discovery) is only imported by the "moviepy"
+# backend, through this module, so other backends and CLI commands skip it.
+
+
+def ken_burns_clip(scene: Dict, renderer: FFmpegRenderer) -> VideoClip:
+    """
+    Scene clip whose frames come from a KenBurns engine. The engine (and
+    its prescaled image) is only built when the scene's first frame is
+    requested and dropped after its last one, like LazyAudioFileClip.
+    Size, frame rate and burned-in captions follow `renderer`'s settings.
+    """
+    cues = scene.get('cues', []) if renderer.burn_subtitles else []
+    height = renderer.height
+    scene_width = renderer.scaled_width(scene['image'])
+    width = min(scene_width, renderer.width) if renderer.width else scene_width
+    duration = scene['duration']
+    state = {}
+
+    def make_frame(t):
+        if "engine" not in state:
+            state["engine"] = KenBurns(scene['image'], (scene_width, height), width, duration,
+                                       fps=renderer.fps, zoom_per_second=renderer.zoom_per_second,
+                                       camera=scene.get('camera'))
+            state["buffer"] = np.empty((height, width, 3), dtype=np.uint8)
+        frame = state["engine"].render(t, state["buffer"])
+        if cues:
+            burn_caption(frame, cues, t, renderer.caption_size, renderer.caption_margin)
+        if t >= duration - 1.0 / renderer.fps:
+            state.clear()
+        return frame
+
+    # Built without make_frame so VideoClip does not render frame 0 just to learn the size
+    clip = VideoClip()
+    clip.make_frame = make_frame
+    clip.size = (width, height)
+    return clip.set_duration(duration)
+
+
+class LazyAudioFileClip(AudioClip):
+    """
+    AudioFileClip that only keeps an ffmpeg reader open while its frames are
+    being read. MoviePy writes the soundtrack front to back, so the reader is
+    opened at the scene's first chunk and closed after its last one, instead
+    of every scene holding a reader for the whole render.
+    """
+
+    def __init__(self, filename: str, duration: float, fps: int = 44100, nchannels: int = 2):
+        AudioClip.__init__(self, duration=duration, fps=fps)
+        self.filename = filename
+        self.nchannels = nchannels
+        self._reader_clip: Optional[AudioFileClip] = None
+        self.make_frame = self._read_frame
+
+    def _read_frame(self, t):
+        if self._reader_clip is None:
+            self._reader_clip = AudioFileClip(self.filename, fps=self.fps)
+            reader = self._reader_clip.reader
+            # ffmpeg guesses the length of an MP3 without a Xing header from its first
+            # frame's bitrate, which is off for VBR; `duration` comes from counting every
+            # frame, so the reader is held to it instead of failing on the last chunks
+            reader.duration = self.duration
+            reader.nframes = int(self.fps * self.duration) + 1
+        frame = self._reader_clip.get_frame(t)
+        if np.max(t) >= self.duration - 2.0 / self.fps:
+            self.close()
+        return frame
+
+    def close(self):
+        if self._reader_clip is not None:
+            self._reader_clip.close()
+            self._reader_clip = None
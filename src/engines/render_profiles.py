@@ -0,0 +1,24 @@
+from typing import Dict, Optional
+
+from src.variables import RENDER_PROFILES, DEFAULT_RENDER_PROFILE
+
+# Kept apart from the video engine so the pipeline and CLI can validate a
+# profile name without importing the renderers.
+
+
+def resolve_render_profile(config: Dict, name: Optional[str] = None) -> Dict:
+    """
+    Settings of a render profile: the RENDER_PROFILES entry with the pod's
+    overrides ("render": {"profiles": {name: {...}}}) on top. A pod can also
+    define a profile of its own there. Without `name`, the pod's
+    "render": {"profile"} or DEFAULT_RENDER_PROFILE is used.
+    """
+    render_config = config.get("render", {})
+    name = name or render_config.get("profile", DEFAULT_RENDER_PROFILE)
+    overrides = render_config.get("profiles", {}).get(name)
+    if name not in RENDER_PROFILES and overrides is None:
+        known = sorted(set(RENDER_PROFILES) | set(render_config.get("profiles", {})))
+        raise ValueError(f"Unknown render profile '{name}'. Options: {', '.join(known)}")
+    # Pod-defined profiles start from the default one, so they only list what differs
+    base = RENDER_PROFILES.get(name, RENDER_PROFILES[DEFAULT_RENDER_PROFILE])
+    return {**base, **(overrides or {}), "name": name}
@@ -1,47 +1,132 @@
 import os
 import json
-import google.generativeai as genai
+import threading
+import time
+from datetime import timedelta
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
+from src.utils import http_client
+from src.utils.asset_cache import make_cache_key
 from src.utils.memory_manager import MemoryManager
+from src.utils.metrics import current_metrics
 
-from src.variables import GEMINI_MODEL_NAME
+from src.variables import (
+    GEMINI_MODEL_NAME, GEMINI_API_ENDPOINT, HTTP_READ_TIMEOUT, SCRIPT_REPAIR_ATTEMPTS, SCRIPT_CACHE_DIR,
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS, GEMINI_CONTEXT_CACHE_TTL_SECONDS, GEMINI_CONTEXT_CACHE_RETRY_SECONDS
+)
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
 
 # Load environment variables
 load_dotenv()
 
+# genai.configure is process-global; only redo it when the key changes
+_configured_api_key = None
+_configure_lock = threading.Lock()
+
+def _configure_genai(api_key: str):
+    global _configured_api_key
+    # The Gemini SDK takes most of this module's import time; load it on first use
+    import google.generativeai as genai
+    with _configure_lock:
+        if _configured_api_key != api_key:
+            if GEMINI_API_ENDPOINT:
+                genai.configure(api_key=api_key, transport="rest",
+                                client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+            else:
+                genai.configure(api_key=api_key)
+            _configured_api_key = api_key
+
+def _is_transient_gemini_error(error: BaseException) -> bool:
+    """429/5xx from Gemini are retried with the shared backoff; anything else fails fast."""
+    from google.api_core import exceptions as google_exceptions
+    return isinstance(error, (google_exceptions.TooManyRequests, google_exceptions.ServerError))
+
+def _json_object(text: str) -> str:
+    """Strips Markdown fences and any text around the outermost JSON object."""
+    text = (text or "").strip()
+    start, end = text.find("{"), text.rfind("}")
+    return text[start:end + 1] if start != -1 and end > start else text
+
+def parse_script(text: str) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Parses and validates a script returned by Gemini (fences and surrounding
+    text are ignored). Returns (script, None)
+    or (None, error description) so the error can be sent back for repair.
+    """
+    from pydantic import ValidationError
+    from src.engines.script_schema import Script
+
+    text = _json_object(text)
+    try:
+        return Script.model_validate(json.loads(text)).to_dict(), None
+    except json.JSONDecodeError as e:
+        return None, f"JSON inválido: {e}"
+    except ValidationError as e:
+        problems = "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+        return None, f"Estructura inválida: {problems}"
+
+def parse_translations(text: str, languages: List[str], count: int) -> Tuple[Optional[Dict[str, List[str]]], Optional[str]]:
+    """
+    Parses a translation response: {"translations": {lang: [text, ...]}}
+    with `count` texts for every requested language.
+    """
+    from pydantic import ValidationError
+    from src.engines.script_schema import Translations
+
+    text = _json_object(text)
+    try:
+        translations = Translations.model_validate(json.loads(text)).translations
+    except json.JSONDecodeError as e:
+        return None, f"JSON inválido: {e}"
+    except ValidationError as e:
+        return None, f"Estructura inválida: {e.errors()[0]['msg']}"
+    problems = [f"{lang}: falta" if lang not in translations else f"{lang}: {len(translations[lang])} textos, se esperaban {count}"
+                for lang in languages if len(translations.get(lang, [])) != count]
+    if problems:
+        return None, "Estructura inválida: " + "; ".join(problems)
+    return {lang: translations[lang] for lang in languages}, None
+
 class ScriptGenerator:
-    def __init__(self, pod_config_path: str):
-        self.config = self._load_config(pod_config_path)
+    def __init__(self, pod_config_path: str, config: Optional[dict] = None, cache_dir: str = SCRIPT_CACHE_DIR):
+        self.config = config if config is not None else self._load_config(pod_config_path)
         self.memory_manager = MemoryManager(os.path.dirname(pod_config_path))
+        self.cache_dir = cache_dir
         
         # Configure Gemini
         api_key = os.getenv("GOOGLE_API_KEY")
         if not api_key:
             raise ValueError("GOOGLE_API_KEY not found in .env")
         
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(GEMINI_MODEL_NAME) 
+        import google.generativeai as genai
+        _configure_genai(api_key)
+        # Everything that only depends on the pod is built once and sent as the
+        # system instruction, so each request carries just the episode context
+        self.static_prompt = self._build_static_prompt()
+        self.config_hash = make_cache_key(config=self.config)
+        self.model = genai.GenerativeModel(GEMINI_MODEL_NAME, system_instruction=self.static_prompt)
+        self._cached_model = None
+        self._cached_model_expires = 0.0
+        self._context_cache_retry_at = 0.0
+        self.context_cache_enabled = len(self.static_prompt) / 4 >= GEMINI_CONTEXT_CACHE_MIN_TOKENS
+        if not self.context_cache_enabled:
+            print(f"[CACHE] Prompt estático de ~{len(self.static_prompt) // 4} tokens (mínimo para context caching: "
+                  f"{GEMINI_CONTEXT_CACHE_MIN_TOKENS}); se envía como system instruction en cada llamada")
+        self._model_lock = threading.Lock()
+        self._translation_model = None
 
     def _load_config(self, path: str) -> dict:
         with open(path, 'r', encoding='utf-8') as f:
             return json.load(f)
 
-    def generate_script(self, topic: str) -> dict:
-        """
-        Generates a script for a new episode based on a topic and previous context.
-        """
-        context = self.memory_manager.get_context_summary()
+    def _build_static_prompt(self) -> str:
         pod_settings = self.config
-        
-        prompt = f"""
+        return f"""
         ACT AS: {pod_settings['system_prompt']}
         
-        CONTEXTO ACTUAL (Memoria):
-        {context}
-        
         TAREA:
         Escribe un guion para un video de Youtube Shorts ({pod_settings['video_duration_seconds']} segundos).
-        Tema del episodio: "{topic}"
         
         PERSONAJES:
         {json.dumps(pod_settings['characters'], ensure_ascii=False)}
@@ -61,21 +146,190 @@ class ScriptGenerator:
         }}
         """
 
-        response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-        
+    def _generation_model(self) -> "genai.GenerativeModel":
+        """
+        The model bound to a Gemini context cache of the static prompt when
+        the prompt is large enough for the API to accept one, otherwise the
+        plain model. The cache is recreated shortly before its TTL runs out; if
+        creating it fails, the plain model is used until the retry backoff ends.
+        """
+        if not self.context_cache_enabled or time.time() < self._context_cache_retry_at:
+            return self.model
+        with self._model_lock:
+            if self._cached_model is None or time.time() > self._cached_model_expires:
+                import google.generativeai as genai
+                try:
+                    from google.generativeai import caching
+                    current_metrics().incr("api_calls", provider="gemini")
+                    cached_content = caching.CachedContent.create(
+                        model=GEMINI_MODEL_NAME,
+                        system_instruction=self.static_prompt,
+                        ttl=timedelta(seconds=GEMINI_CONTEXT_CACHE_TTL_SECONDS)
+                    )
+                except Exception as e:
+                    print(f"[CACHE] Context caching no disponible, se envía el prompt completo "
+                          f"(reintento en {GEMINI_CONTEXT_CACHE_RETRY_SECONDS}s): {e}")
+                    self._context_cache_retry_at = time.time() + GEMINI_CONTEXT_CACHE_RETRY_SECONDS
+                    return self.model
+                self._cached_model = genai.GenerativeModel.from_cached_content(cached_content)
+                self._cached_model_expires = time.time() + GEMINI_CONTEXT_CACHE_TTL_SECONDS - 60
+            return self._cached_model
+
+    def _call_gemini(self, contents, model: Optional["genai.GenerativeModel"] = None) -> str:
+        def call_gemini():
+            current_metrics().incr("api_calls", provider="gemini")
+            return (model or self._generation_model()).generate_content(
+                contents,
+                generation_config={"response_mime_type": "application/json"},
+                request_options={"timeout": HTTP_READ_TIMEOUT}
+            )
+
+        response = http_client.call_with_retries("gemini", call_gemini, retry_on=_is_transient_gemini_error)
+        try:
+            return response.text
+        except ValueError:
+            # Blocked or empty candidates: treated like an invalid script
+            return ""
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_cached_script(self, key: str) -> Optional[dict]:
         try:
-            script_data = json.loads(response.text)
-            return script_data
-        except json.JSONDecodeError:
-            # Fallback or retry logic could go here
+            with open(self._cache_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _store_cached_script(self, key: str, script_data: dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._cache_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(script_data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def generate_script(self, topic: str, pending_episodes: Optional[List[Dict]] = None) -> Optional[dict]:
+        """
+        Generates a script for a new episode based on a topic and previous context.
+        `pending_episodes` are episodes still being produced (not yet in memory)
+        that the new script should follow on from.
+        The same pod, context, topic and model return the cached script. A
+        response that does not validate is sent back to Gemini for repair up to
+        SCRIPT_REPAIR_ATTEMPTS times; None is returned if it never validates.
+        """
+        context = self.memory_manager.get_context_summary(topic)
+        if pending_episodes:
+            context += "Episodios en producción (aún no publicados):\n"
+            for ep in pending_episodes:
+                context += f"- {ep.get('title', 'Sin título')}: {ep.get('summary', 'Sin resumen')}\n"
+
+        cache_key = make_cache_key(engine="gemini_script", model=GEMINI_MODEL_NAME,
+                                   pod=self.config_hash, memory=context, topic=topic)
+        cached = self._load_cached_script(cache_key)
+        if cached is not None:
+            print(f"[CACHE] Guion reutilizado: {cached.get('title')}")
+            current_metrics().incr("cache_hits", cache="scripts")
+            return cached
+        current_metrics().incr("cache_misses", cache="scripts")
+
+        prompt = f"""
+        CONTEXTO ACTUAL (Memoria):
+        {context}
+        
+        Tema del episodio: "{topic}"
+        """
+        script_data = self._generate_validated(prompt, parse_script)
+        if script_data is None:
             print("Error decoding JSON from Gemini response")
             return None
+        self._store_cached_script(cache_key, script_data)
+        return script_data
+
+    def _generate_validated(self, prompt: str, parse: Callable[[str], Tuple[Optional[object], Optional[str]]],
+                            model: Optional["genai.GenerativeModel"] = None) -> Optional[object]:
+        """
+        Sends `prompt` and returns the parsed response. A response that
+        `parse` rejects is sent back with the error for correction, up to
+        SCRIPT_REPAIR_ATTEMPTS times. Returns None if it never validates.
+        """
+        contents = [{"role": "user", "parts": [prompt]}]
+        text = self._call_gemini(contents, model)
+        for attempt in range(SCRIPT_REPAIR_ATTEMPTS + 1):
+            result, error = parse(text)
+            if result is not None:
+                return result
+            if attempt == SCRIPT_REPAIR_ATTEMPTS:
+                break
+            print(f"[SCRIPT] Respuesta inválida ({error}). Pidiendo corrección {attempt+1}/{SCRIPT_REPAIR_ATTEMPTS}...")
+            current_metrics().incr("script_repairs")
+            contents += [
+                {"role": "model", "parts": [text or "(vacío)"]},
+                {"role": "user", "parts": [
+                    f"Tu respuesta no es válida: {error}. Devuelve solo el JSON completo y corregido "
+                    f"siguiendo exactamente el formato pedido."
+                ]},
+            ]
+            text = self._call_gemini(contents, model)
+        return None
+
+    def translate_narration(self, script: Dict, languages: List[str]) -> Optional[Dict[str, List[str]]]:
+        """
+        Translates every scene's `audio_text` to each language in a single
+        Gemini call. Returns {language: [text per scene]} in scene order ("" for
+        scenes without narration), or None if no valid translation came back.
+        Results are cached like scripts.
+        """
+        source_language = self.config.get("language", "es-ES")
+        indexes = [i for i, scene in enumerate(script["scenes"]) if scene.get("audio_text")]
+        texts = [script["scenes"][i]["audio_text"] for i in indexes]
+        cache_key = make_cache_key(engine="gemini_translation", model=GEMINI_MODEL_NAME,
+                                   source=source_language, languages=languages, texts=texts)
+        cached = self._load_cached_script(cache_key)
+        if cached is not None:
+            current_metrics().incr("cache_hits", cache="translations")
+            return cached
+        current_metrics().incr("cache_misses", cache="translations")
+
+        prompt = f"""
+        Traduce estos textos de narración de un video infantil ({source_language}) a: {", ".join(languages)}.
+        Mantén el tono, los nombres propios y una longitud parecida para que la narración dure lo mismo.
+        
+        TEXTOS (JSON):
+        {json.dumps(texts, ensure_ascii=False)}
+        
+        FORMATO DE SALIDA (JSON estrictamente, {len(texts)} textos por idioma y en el mismo orden):
+        {{"translations": {{{", ".join(f'"{lang}": ["..."]' for lang in languages)}}}}}
+        """
+        with self._model_lock:
+            if self._translation_model is None:
+                import google.generativeai as genai
+                # Without the pod's system instruction, which asks for a script
+                self._translation_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+        translated = self._generate_validated(prompt, lambda text: parse_translations(text, languages, len(texts)),
+                                              model=self._translation_model)
+        if translated is None:
+            return None
+
+        result = {}
+        for lang in languages:
+            per_scene = [""] * len(script["scenes"])
+            for i, text in zip(indexes, translated[lang]):
+                per_scene[i] = text
+            result[lang] = per_scene
+        self._store_cached_script(cache_key, result)
+        return result
 
     def save_episode_to_memory(self, script_data: dict):
         if script_data:
+            # Characters on screen remember the episode they were last in, so topics
+            # about them find their state through the character index
+            appeared = dict.fromkeys(scene.get("character") for scene in script_data.get("scenes", []))
+            last_seen = {"ultimo_episodio": script_data.get("title"), "ultimo_resumen": script_data.get("summary")}
             self.memory_manager.add_episode({
                 "title": script_data.get("title"),
-                "summary": script_data.get("summary")
+                "summary": script_data.get("summary"),
+                "characters": {name: last_seen for name in appeared if name and name != "Narrador"}
             })
 
 if __name__ == "__main__":
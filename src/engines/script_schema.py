@@ -0,0 +1,52 @@
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from src.engines.camera import EASINGS, PAN_DIRECTIONS
+
+
+class Camera(BaseModel):
+    pan: str = "center"
+    easing: str = "linear"
+
+    @field_validator("pan")
+    @classmethod
+    def _known_pan(cls, value: str) -> str:
+        if value not in PAN_DIRECTIONS:
+            raise ValueError(f"pan must be one of: {', '.join(PAN_DIRECTIONS)}")
+        return value
+
+    @field_validator("easing")
+    @classmethod
+    def _known_easing(cls, value: str) -> str:
+        if value not in EASINGS:
+            raise ValueError(f"easing must be one of: {', '.join(EASINGS)}")
+        return value
+
+
+class Scene(BaseModel):
+    # Extra keys written by the model are kept rather than rejected
+    model_config = ConfigDict(extra="allow")
+
+    visual_prompt: str = Field(min_length=1)
+    audio_text: str = ""
+    character: str = "Narrador"
+    duration_est: float = Field(default=5, gt=0)
+    camera: Optional[Camera] = None
+
+
+class Script(BaseModel):
+    """Shape every episode script must have before it reaches the asset engines."""
+    model_config = ConfigDict(extra="allow")
+
+    title: str = Field(min_length=1)
+    summary: str = Field(min_length=1)
+    scenes: List[Scene] = Field(min_length=1)
+
+    def to_dict(self) -> dict:
+        return self.model_dump(exclude_none=True)
+
+
+class Translations(BaseModel):
+    """Narration texts per extra language, in the order they were sent."""
+    translations: Dict[str, List[str]]
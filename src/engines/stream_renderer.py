@@ -0,0 +1,151 @@
+import contextlib
+import os
+import subprocess
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.engines.ffmpeg_renderer import AUDIO_SAMPLE_RATE, FFmpegRenderer
+from src.engines.ken_burns import KenBurns
+from src.engines.subtitles import burn_caption
+from src.engines.ffmpeg_renderer import encode_passes, remove_pass_logs
+from src.utils.ffmpeg import get_ffmpeg_binary
+
+
+class StreamingRenderer(FFmpegRenderer):
+    """
+    Bounded-memory render for long videos. Scenes are handled one at a time:
+    the image is decoded and prescaled once, its Ken Burns frames are generated
+    on the fly and piped to a single ffmpeg encoder as raw RGB, and the image
+    is released before the next scene starts. Only one scene image and one
+    frame buffer are ever alive, so peak memory does not grow with the
+    number of scenes. The narration is read through the concat demuxer, so
+    only one scene's audio file is open at a time as well.
+    """
+
+    def narration_entries(self, timeline: List[Dict]) -> Tuple[float, List[List]]:
+        """
+        Silence before the first narration and the [file, seconds] entries
+        of the narration concat list. Each file's slot runs until the next
+        narration starts: its own scene plus any silent scenes after it.
+        """
+        lead, entries = 0.0, []
+        for scene in timeline:
+            if scene.get("audio"):
+                entries.append([scene["audio"], scene["duration"]])
+            elif entries:
+                entries[-1][1] += scene["duration"]
+            else:
+                lead += scene["duration"]
+        return lead, entries
+
+    def write_narration_list(self, entries: List[List], list_path: str):
+        """Concat demuxer script: every narration file with the length of its slot."""
+        with open(list_path, 'w', encoding='utf-8') as f:
+            for path, seconds in entries:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\nduration {seconds:.6f}\n")
+
+    def build_stream_command(self, timeline: List[Dict], canvas: Tuple[int, int], output_path: str,
+                             narration_list: str) -> List[str]:
+        """
+        ffmpeg arguments reading raw frames from stdin and the narration
+        through the concat demuxer, so scene files are opened one at a time
+        instead of as one input each. The gaps between a narration's end and
+        its slot's end are filled with silence by aresample.
+        """
+        canvas_w, canvas_h = canvas
+        inputs = ["-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{canvas_w}x{canvas_h}",
+                  "-r", str(self.fps), "-i", "pipe:0"]
+        total = sum(scene["duration"] for scene in timeline)
+        lead, entries = self.narration_entries(timeline)
+        if entries:
+            inputs += ["-f", "concat", "-safe", "0", "-i", narration_list]
+            # The demuxer starts the first file before zero by its encoder delay, hence the PTS reset
+            audio = (f"[1:a]asetpts=PTS-STARTPTS,aresample={AUDIO_SAMPLE_RATE}:async=1,"
+                     f"aformat=sample_fmts=fltp:channel_layouts=stereo,adelay={lead * 1000:.0f}:all=1,"
+                     f"apad,atrim=0:{total:.3f}[aout]")
+        else:
+            audio = f"aevalsrc=0:c=stereo:s={AUDIO_SAMPLE_RATE}:d={total:.3f}[aout]"
+
+        return inputs + [
+            "-filter_complex", audio,
+            "-map", "0:v", "-map", "[aout]",
+            "-r", str(self.fps),
+            *self.video_args(),
+            *self.audio_args(),
+            "-movflags", "+faststart",
+            output_path
+        ]
+
+    def scene_frames(self, scene: Dict, frame_count: int, canvas: Tuple[int, int], buffer: np.ndarray):
+        """
+        Yields `buffer` once per frame, filled by the scene's Ken Burns
+        engine (centered linear zoom unless the scene sets a camera), with
+        the active caption blended in when subtitles are burned.
+        """
+        canvas_w, _ = canvas
+        scene_width = self.scaled_width(scene["image"])
+        crop_width = min(scene_width, canvas_w)
+        x_offset = (canvas_w - crop_width) // 2
+        ken_burns = KenBurns(scene["image"], (scene_width, self.height), crop_width, scene["duration"],
+                             fps=self.fps, zoom_per_second=self.zoom_per_second, camera=scene.get("camera"))
+
+        buffer.fill(0)
+        view = buffer[:, x_offset:x_offset + crop_width]
+        cues = scene.get("cues", []) if self.burn_subtitles else []
+        # Ken Burns only redraws the view, so on a letterboxed scene a caption that reaches
+        # into the side bars would be blended over itself frame after frame
+        bars = [buffer[:, :x_offset], buffer[:, x_offset + crop_width:]] if cues and crop_width < canvas_w else []
+        for n in range(frame_count):
+            ken_burns.render(n / self.fps, view)
+            if cues:
+                for bar in bars:
+                    bar.fill(0)
+                burn_caption(buffer, cues, n / self.fps, self.caption_size, self.caption_margin)
+            yield buffer
+
+    def render(self, timeline: List[Dict], output_path: str) -> str:
+        canvas = self.canvas_size(timeline)
+        narration_list = f"{output_path}.narration.txt"
+        self.write_narration_list(self.narration_entries(timeline)[1], narration_list)
+        # Frames are not kept between passes: a two-pass encode generates them twice
+        try:
+            command = self.build_stream_command(timeline, canvas, output_path, narration_list)
+            for pass_args in encode_passes(command, self.two_pass):
+                self._encode(timeline, canvas, pass_args)
+        finally:
+            os.remove(narration_list)
+            if self.two_pass:
+                remove_pass_logs(output_path)
+        return output_path
+
+    def _encode(self, timeline: List[Dict], canvas: Tuple[int, int], args: List[str]):
+        cmd = [get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error"] + args
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        buffer = np.zeros((canvas[1], canvas[0], 3), dtype=np.uint8)
+        elapsed, frames_written = 0.0, 0
+        try:
+            try:
+                for scene in timeline:
+                    # Frame boundaries follow the cumulative timeline so rounding never drifts from the audio
+                    elapsed += scene["duration"]
+                    frame_count = int(round(elapsed * self.fps)) - frames_written
+                    for frame in self.scene_frames(scene, frame_count, canvas, buffer):
+                        proc.stdin.write(frame.data)
+                    frames_written += frame_count
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+            stderr = proc.stderr.read()
+            if proc.wait() != 0:
+                raise Exception(f"ffmpeg failed ({proc.returncode}): {stderr.decode(errors='replace')[-2000:]}")
+        finally:
+            # A scene that fails to render must not leave the encoder waiting on stdin
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            with contextlib.suppress(BrokenPipeError):
+                proc.stdin.close()
+            proc.stderr.close()
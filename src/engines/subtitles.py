@@ -0,0 +1,188 @@
+import os
+import uuid
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from src.utils.asset_cache import make_cache_key
+from src.variables import (
+    SUBTITLE_MAX_WORDS,
+    SUBTITLE_MAX_CHARS,
+    SUBTITLE_FONT,
+    SUBTITLE_FONT_SIZE,
+    SUBTITLE_MARGIN,
+    SUBTITLE_CACHE_DIR,
+    VIDEO_HEIGHT,
+    VIDEO_WIDTH
+)
+
+# A cue is (start, end, text), in seconds from the start of its scene (or of
+# the video, once placed on the timeline by timeline_cues).
+Cue = Tuple[float, float, str]
+
+
+def split_caption_lines(text: str, max_words: int = SUBTITLE_MAX_WORDS,
+                        max_chars: int = SUBTITLE_MAX_CHARS) -> List[str]:
+    """
+    Splits narration into caption lines on word boundaries. A line ends at
+    the word/character limit, after a sentence, or after a clause once it
+    already holds a few words.
+    """
+    lines, current = [], []
+    for word in text.split():
+        if current and (len(current) >= max_words or len(" ".join(current + [word])) > max_chars):
+            lines.append(" ".join(current))
+            current = []
+        current.append(word)
+        if word[-1] in ".!?…" or (word[-1] in ",;:" and len(current) >= 3):
+            lines.append(" ".join(current))
+            current = []
+    if current:
+        lines.append(" ".join(current))
+    return lines
+
+
+def scene_cues(text: str, duration: float) -> List[Cue]:
+    """
+    Cues of one scene's narration. The narration time is shared between the
+    lines in proportion to their length, as a stand-in for speaking time.
+    """
+    lines = split_caption_lines(text or "")
+    if not lines or duration <= 0:
+        return []
+    weights = [len(line) + 1 for line in lines]
+    total = sum(weights)
+    cues, start = [], 0.0
+    for line, weight in zip(lines, weights):
+        end = start + duration * weight / total
+        cues.append((round(start, 3), round(end, 3), line))
+        start = end
+    return cues
+
+
+def timeline_cues(timeline: List[Dict]) -> List[Cue]:
+    """Every scene's cues shifted to the scene's start in the video."""
+    cues, offset = [], 0.0
+    for scene in timeline:
+        cues += [(round(offset + start, 3), round(offset + end, 3), text) for start, end, text in scene.get("cues", [])]
+        offset += scene["duration"]
+    return cues
+
+
+def _timestamp(seconds: float, separator: str) -> str:
+    ms = int(round(seconds * 1000))
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{ms:03d}"
+
+
+def to_srt(cues: List[Cue]) -> str:
+    return "".join(f"{n}\n{_timestamp(start, ',')} --> {_timestamp(end, ',')}\n{text}\n\n"
+                   for n, (start, end, text) in enumerate(cues, start=1))
+
+
+def to_vtt(cues: List[Cue]) -> str:
+    return "WEBVTT\n\n" + "".join(f"{_timestamp(start, '.')} --> {_timestamp(end, '.')}\n{text}\n\n"
+                                  for start, end, text in cues)
+
+
+SIDECAR_WRITERS = {"srt": to_srt, "vtt": to_vtt}
+
+
+def write_sidecars(timeline: List[Dict], base_path: str, formats: List[str]) -> List[str]:
+    """Writes `<base_path>.<format>` for every format; returns the paths."""
+    cues = timeline_cues(timeline)
+    paths = []
+    for fmt in formats:
+        if fmt not in SIDECAR_WRITERS:
+            raise ValueError(f"Unknown subtitle format '{fmt}'. Options: {', '.join(SIDECAR_WRITERS)}")
+        path = f"{base_path}.{fmt}"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(SIDECAR_WRITERS[fmt](cues))
+        paths.append(path)
+    return paths
+
+
+# --- Burned-in captions ---
+# Each caption line is rasterized once (PIL) and then only composited:
+# ffmpeg overlays the cached PNG, the Python backends blend a cached array.
+
+def caption_style(frame_size: Tuple[int, int]) -> Tuple[int, int]:
+    """
+    Font size and bottom margin for a frame size. SUBTITLE_FONT_SIZE and
+    SUBTITLE_MARGIN are meant for VIDEO_WIDTH x VIDEO_HEIGHT and shrink or
+    grow with the frame, following whichever side limits the line.
+    """
+    scale = min(frame_size[0] / VIDEO_WIDTH, frame_size[1] / VIDEO_HEIGHT)
+    return max(8, round(SUBTITLE_FONT_SIZE * scale)), round(SUBTITLE_MARGIN * scale)
+
+
+@lru_cache(maxsize=8)
+def _font(name: str, size: int) -> ImageFont.FreeTypeFont:
+    try:
+        return ImageFont.truetype(name, size)
+    except OSError:
+        return ImageFont.load_default(size)
+
+
+def caption_image(text: str, font: str = SUBTITLE_FONT, size: int = SUBTITLE_FONT_SIZE) -> Image.Image:
+    """White text with a dark outline on a transparent background, cropped to the text."""
+    face = _font(font, size)
+    stroke = max(1, size // 12)
+    left, top, right, bottom = ImageDraw.Draw(Image.new("RGBA", (1, 1))).textbbox(
+        (0, 0), text, font=face, stroke_width=stroke)
+    img = Image.new("RGBA", (right - left + 2 * stroke, bottom - top + 2 * stroke), (0, 0, 0, 0))
+    ImageDraw.Draw(img).text((stroke - left, stroke - top), text, font=face, fill=(255, 255, 255, 255),
+                             stroke_width=stroke, stroke_fill=(0, 0, 0, 255))
+    return img
+
+
+def caption_png(text: str, size: int = SUBTITLE_FONT_SIZE, cache_dir: str = SUBTITLE_CACHE_DIR) -> str:
+    """Path of the caption's PNG, rendered on first use and shared by every video."""
+    os.makedirs(cache_dir, exist_ok=True)
+    key = make_cache_key(engine="caption", text=text, font=SUBTITLE_FONT, size=size)
+    path = os.path.join(cache_dir, f"{key}.png")
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp.png"
+        caption_image(text, size=size).save(tmp_path)
+        os.replace(tmp_path, path)
+    return path
+
+
+@lru_cache(maxsize=32)
+def caption_bitmap(text: str, size: int = SUBTITLE_FONT_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """Premultiplied colour and inverse alpha of a caption, as uint16 arrays ready to blend."""
+    rgba = np.asarray(caption_image(text, size=size)).astype(np.uint16)
+    alpha = rgba[:, :, 3:4]
+    return rgba[:, :, :3] * alpha, 255 - alpha
+
+
+def caption_position(frame_size: Tuple[int, int], caption_size: Tuple[int, int],
+                     margin: int = SUBTITLE_MARGIN) -> Tuple[int, int]:
+    """Top-left corner of a caption: centred, `margin` above the bottom edge."""
+    (frame_w, frame_h), (w, h) = frame_size, caption_size
+    return (frame_w - w) // 2, frame_h - h - margin
+
+
+def burn_caption(frame: np.ndarray, cues: List[Cue], t: float, size: int = SUBTITLE_FONT_SIZE,
+                 margin: int = SUBTITLE_MARGIN) -> np.ndarray:
+    """Blends the cue active at time t (scene-relative) into `frame` in place."""
+    text = next((text for start, end, text in cues if start <= t < end), None)
+    if text is None:
+        return frame
+    premultiplied, inverse_alpha = caption_bitmap(text, size)
+    frame_h, frame_w = frame.shape[:2]
+    h, w = inverse_alpha.shape[:2]
+    x, y = caption_position((frame_w, frame_h), (w, h), margin)
+    # Captions wider than the frame are cut at both sides
+    cx = max(0, -x)
+    x, w = max(0, x), min(w - 2 * cx, frame_w)
+    region = frame[y:y + h, x:x + w]
+    blended = region * inverse_alpha[:, cx:cx + w]
+    blended += premultiplied[:, cx:cx + w]
+    blended //= 255
+    region[...] = blended
+    return frame
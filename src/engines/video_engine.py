@@ -1,75 +1,318 @@
 import os
 import json
-from moviepy.editor import ImageClip, AudioFileClip, concatenate_videoclips
-from typing import Dict, List
-from src.variables import VIDEO_FPS, VIDEO_CODEC, AUDIO_CODEC
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.variables import (
+    VIDEO_BACKEND,
+    RENDER_WORKERS,
+    DEFAULT_RENDER_PROFILE,
+    SCENE_AUDIO_PADDING,
+    LANGUAGE_DURATION_POLICY,
+    LANGUAGE_OUTPUT,
+    SUBTITLE_FORMATS,
+    SUBTITLES_BURN_IN
+)
+from src.engines.ffmpeg_renderer import FFmpegRenderer
+from src.engines.render_profiles import resolve_render_profile
+from src.engines.subtitles import scene_cues, write_sidecars
+from src.utils.audio_probe import audio_duration
+from src.utils.ffmpeg import probe_duration
+from src.utils.metrics import current_metrics
+
 
 class VideoAssembler:
-    def __init__(self, pod_config_path: str):
-        self.config = self._load_config(pod_config_path)
+    def __init__(self, pod_config_path: str, config: Optional[dict] = None, profile: Optional[str] = None):
+        self.config = config if config is not None else self._load_config(pod_config_path)
         self.output_dir = os.path.join(os.path.dirname(pod_config_path), "output")
         os.makedirs(self.output_dir, exist_ok=True)
+        # Pod config can override the global backend: "render": {"backend": "ffmpeg"}
+        self.backend = self.config.get("render", {}).get("backend", VIDEO_BACKEND)
+        self.render_workers = self.config.get("render", {}).get("workers", RENDER_WORKERS)
+        self.language = self.config.get("language", "es-ES")
+        self.language_policy = self.config.get("language_duration_policy", LANGUAGE_DURATION_POLICY)
+        self.language_output = self.config.get("language_output", LANGUAGE_OUTPUT)
+        subtitles = self.config.get("subtitles", {})
+        self.subtitle_formats = subtitles.get("formats", SUBTITLE_FORMATS)
+        self.burn_subtitles = subtitles.get("burn", SUBTITLES_BURN_IN)
+        self.profile = resolve_render_profile(self.config, profile)
+        self._segment_executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
 
     def _load_config(self, path: str) -> dict:
         with open(path, 'r', encoding='utf-8') as f:
             return json.load(f)
 
-    def assemble_video(self, script: Dict, visual_paths: List[str], audio_paths: Dict[int, str]) -> str:
+    def assemble_video(self, script: Dict, visual_paths: List[str], audio_paths: Dict[int, str],
+                       language_tracks: Optional[Dict[str, Dict[int, str]]] = None,
+                       run_id: Optional[str] = None) -> str:
         """
         Assembles the video from visual and audio assets.
         Returns the path to the final video file.
+        `language_tracks` ({language: {scene index: narration}}) adds one
+        audio track (or output file) per extra language; the video itself
+        is still rendered once. `run_id` goes into the file name.
         """
-        print("--- Iniciando Ensamblaje de Video ---")
+        print(f"--- Iniciando Ensamblaje de Video (backend: {self.backend}) ---")
+        if self.backend not in ("moviepy", "ffmpeg", "segments", "stream"):
+            raise ValueError(f"Unknown video backend '{self.backend}'")
+        output_path = self._output_path(script, run_id)
+        start = time.perf_counter()
+        timeline = self.build_timeline(script, visual_paths, audio_paths, language_tracks)
+        if self.backend == "moviepy":
+            self._assemble_with_moviepy(timeline, output_path)
+        else:
+            self._assemble_with_ffmpeg(timeline, output_path)
+        if language_tracks:
+            self._add_language_tracks(timeline, language_tracks, output_path)
+        self.write_subtitles(timeline, output_path)
+        self._record_render_metrics(output_path, time.perf_counter() - start)
+        return output_path
+
+    def write_subtitles(self, timeline: List[Dict], output_path: str) -> List[str]:
+        """SRT/VTT sidecars next to the video, from the cues already on the timeline."""
+        if not self.subtitle_formats:
+            return []
+        paths = write_sidecars(timeline, os.path.splitext(output_path)[0], self.subtitle_formats)
+        print(f"[SUBS] Subtítulos: {', '.join(os.path.basename(path) for path in paths)}")
+        return paths
+
+    def renderer(self, cls=FFmpegRenderer) -> FFmpegRenderer:
+        """Renderer (or subclass) configured with this assembler's profile and subtitle settings."""
+        return cls.from_profile(self.profile, burn_subtitles=self.burn_subtitles)
+
+    def _add_language_tracks(self, timeline: List[Dict], language_tracks: Dict[str, Dict[int, str]],
+                             output_path: str):
+        """Renders each language's soundtrack on the video's timing and stream-copies it in."""
+        renderer = self.renderer()
+        base, _ = os.path.splitext(output_path)
+        with ThreadPoolExecutor(max_workers=len(language_tracks)) as executor:
+            futures = [(language, executor.submit(renderer.render_audio_track, timeline, paths, f"{base}.{language}.m4a"))
+                       for language, paths in language_tracks.items()]
+            tracks = [(language, future.result()) for language, future in futures]
+        try:
+            if self.language_output == "files":
+                for language, track in tracks:
+                    path = renderer.mux_audio_tracks(output_path, [(language, track)], f"{base}.{language}.mp4")
+                    print(f"[LANG] Versión {language}: {path}")
+            else:
+                tmp_path = f"{base}.tracks.tmp.mp4"
+                renderer.mux_audio_tracks(output_path, tracks, tmp_path, keep_language=self.language)
+                os.replace(tmp_path, output_path)
+                print(f"[LANG] Pistas de audio: {', '.join([self.language] + [language for language, _ in tracks])}")
+        finally:
+            for _, track in tracks:
+                os.remove(track)
+
+    @property
+    def supports_incremental(self) -> bool:
+        """Only the "segments" backend can render scenes before all assets exist."""
+        return self.backend == "segments"
+
+    def start_incremental(self, script: Dict, run_id: Optional[str] = None) -> "IncrementalRender":
+        """
+        Starts a render that takes scenes as they become ready. Segments are
+        encoded on a process pool shared by every episode of this assembler.
+        """
+        with self._executor_lock:
+            if self._segment_executor is None:
+                self._segment_executor = ProcessPoolExecutor(max_workers=self.render_workers or os.cpu_count() or 1)
+        return IncrementalRender(self, script, self._segment_executor, run_id)
+
+    def close(self):
+        """Shuts down the segment process pool (if one was started); queued segments are dropped."""
+        with self._executor_lock:
+            executor, self._segment_executor = self._segment_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _record_render_metrics(self, output_path: str, elapsed: float):
+        metrics = current_metrics()
+        video_seconds = probe_duration(output_path) or 0.0
+        metrics.set_gauge("render_seconds", round(elapsed, 3))
+        metrics.set_gauge("video_seconds", video_seconds)
+        metrics.set_gauge("render_fps", round(video_seconds * self.profile["fps"] / elapsed, 2) if elapsed > 0 else 0.0)
+        metrics.set_gauge("output_bytes", os.path.getsize(output_path))
+
+    def _output_path(self, script: Dict, run_id: Optional[str] = None) -> str:
+        episode_title = script.get('title', 'Untitled').replace(' ', '_')
+        # The run id keeps episodes with the same title apart
+        run_id = run_id or uuid.uuid4().hex[:6]
+        # Other profiles get their own file, so a preview never replaces the final video
+        suffix = "" if self.profile["name"] == DEFAULT_RENDER_PROFILE else f".{self.profile['name']}"
+        output_filename = f"{episode_title}_{run_id}{suffix}.mp4"
+        return os.path.join(self.output_dir, output_filename)
+
+    def build_timeline(self, script: Dict, visual_paths: List[str], audio_paths: Dict[int, str],
+                       language_tracks: Optional[Dict[str, Dict[int, str]]] = None) -> List[Dict]:
+        """
+        Per-scene image, audio and duration, using the same timing rule as the
+        MoviePy path: narration length plus padding, or the script estimate.
+        With extra languages, LANGUAGE_DURATION_POLICY decides whether their
+        narration can lengthen a scene.
+        """
+        tracks = list((language_tracks or {}).values())
+        return [self.timeline_entry(scene, visual_paths[i], audio_paths.get(i), [t.get(i) for t in tracks])
+                for i, scene in enumerate(script['scenes'])]
+
+    def timeline_entry(self, scene: Dict, image_path: str, audio_path: Optional[str],
+                       extra_audio: Sequence[Optional[str]] = ()) -> Dict:
+        """
+        Timeline item of a single scene (see build_timeline). Its subtitle
+        cues split the narration text over the narration's length (or the
+        whole scene when there is no audio).
+        """
+        narration = audio_duration(audio_path)
+        if narration is None:
+            audio_path = None
+        longest = narration
+        if self.language_policy == "longest":
+            for path in extra_audio:
+                extra = audio_duration(path)
+                if extra is not None and (longest is None or extra > longest):
+                    longest = extra
+        duration = longest + SCENE_AUDIO_PADDING if longest is not None else scene.get('duration_est', 5)
+        cues = scene_cues(scene.get('audio_text', ''), narration if narration is not None else duration)
+        return {"image": image_path, "audio": audio_path, "narration": narration, "duration": duration,
+                "camera": scene.get("camera"), "cues": cues}
+
+    def _assemble_with_ffmpeg(self, timeline: List[Dict], output_path: str) -> str:
+        for i, scene in enumerate(timeline):
+            print(f"Clip {i+1} preparado: {scene['duration']:.2f}s (con efecto Ken Burns)")
+        print(f"Renderizando video final en: {output_path}...")
+        if self.backend == "stream":
+            from src.engines.stream_renderer import StreamingRenderer
+            return self.renderer(StreamingRenderer).render(timeline, output_path)
+        renderer = self.renderer()
+        if self.backend == "segments":
+            return renderer.render_segments(timeline, output_path, workers=self.render_workers)
+        return renderer.render(timeline, output_path)
+
+    def _assemble_with_moviepy(self, timeline: List[Dict], output_path: str) -> str:
+        from moviepy.editor import concatenate_videoclips
+        from src.engines.moviepy_clips import LazyAudioFileClip, ken_burns_clip
+
+        # Durations come from the header probe, so no audio is opened here
+        renderer = self.renderer()
+        if renderer.two_pass:
+            print("[WARN] El backend moviepy no admite dos pasadas: se codifica en una (CRF).")
         clips = []
         
-        for i, scene in enumerate(script['scenes']):
-            image_path = visual_paths[i]
-            audio_path = audio_paths.get(i)
-            
-            # Create Image Clip with Ken Burns Effect (Zoom In)
-            # Duration will be determined by audio length or default estimate
-            if audio_path and os.path.exists(audio_path):
-                audio_clip = AudioFileClip(audio_path)
-                duration = audio_clip.duration + 0.5 # Add padding
-            else:
-                audio_clip = None
-                duration = scene.get('duration_est', 5)
+        for i, scene in enumerate(timeline):
+            duration = scene['duration']
             
-            # Load image and resize to standard 720p to ensure consistency
-            clip = ImageClip(image_path).set_duration(duration).resize(height=720)
+            # Ken Burns (zoom in, optional pan/easing from the scene's "camera"):
+            # the image is prescaled once and each frame is a NumPy crop into a reused buffer
+            clip = ken_burns_clip(scene, renderer)
             
-            # Apply Ken Burns (Simple Zoom In)
-            # We crop the center and slowly zoom in by resizing from 1.0 to 1.1x
-            w, h = clip.size
-            clip = clip.resize(lambda t: 1 + 0.05 * t)  # Zoom logic: 5% zoom per second aprox
-            # Center crop to keep aspect ratio fixed (1280x720)
-            clip = clip.set_position(('center', 'center')).set_duration(duration)
-            # To make it work with CompositeVideoClip or write_videofile we usually need to composite it over a background 
-            # or ensure the resize doesn't change canvas size weirdly. 
-            # Simpler approach for MoviePy 1.x:
-            # Just resize the clip dynamically. Note: This can be slow.
-            
-            if audio_clip:
-                clip = clip.set_audio(audio_clip)
+            if scene['audio']:
+                clip = clip.set_audio(LazyAudioFileClip(scene['audio'], scene['narration']))
                 
             clips.append(clip)
             print(f"Clip {i+1} preparado: {duration:.2f}s (con efecto Ken Burns)")
 
         # Concatenate all clips
         final_video = concatenate_videoclips(clips, method="compose")
-        
-        # Output filename
-        episode_title = script.get('title', 'Untitled').replace(' ', '_')
-        output_filename = f"{episode_title}.mp4"
-        output_path = os.path.join(self.output_dir, output_filename)
+        if final_video.audio is not None:
+            # The composite audio ends with the last narration; the final scene's
+            # padding is silence, so the audio track lasts as long as the video
+            final_video = final_video.set_audio(final_video.audio.set_duration(final_video.duration))
         
         # Write file
         print(f"Renderizando video final en: {output_path}...")
-        # Low fps for testing speed, codec for compatibility
-        final_video.write_videofile(output_path, fps=VIDEO_FPS, codec=VIDEO_CODEC, audio_codec=AUDIO_CODEC)
+        enc = renderer.encoding
+        ffmpeg_params = ["-crf", str(enc["crf"])] if enc["crf"] is not None else None
+        final_video.write_videofile(output_path, fps=renderer.fps, codec=enc["codec"], audio_codec=enc["audio_codec"],
+                                    audio_bitrate=enc["audio_bitrate"], preset=enc["preset"] or "medium",
+                                    threads=enc["threads"] or None, ffmpeg_params=ffmpeg_params)
         
         return output_path
 
+class IncrementalRender:
+    """
+    A "segments" render that overlaps asset generation. `scene_ready` is
+    called as soon as a scene's image and narration both exist: it probes
+    the narration and queues that scene's segment right away. `finish`
+    queues anything that was never announced, waits for every segment and
+    joins them.
+
+    The frame is the same as a full render's (the profile's width, or the
+    widest scene scaled to the video height). Until every image exists,
+    segments are queued on the widest scene seen so far; `finish` renders
+    again any segment whose canvas turned out narrower than the final one,
+    which only happens when scene images differ in aspect ratio.
+    """
+
+    def __init__(self, assembler: VideoAssembler, script: Dict, executor: ProcessPoolExecutor,
+                 run_id: Optional[str] = None):
+        self.assembler = assembler
+        self.script = script
+        self.run_id = run_id
+        self.executor = executor
+        self.renderer = assembler.renderer()
+        self.segments: Dict[int, Tuple[Dict, str, Optional[Future], Tuple[int, int]]] = {}
+        self._widest = 0
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+
+    def _canvas(self, image_path: str) -> Tuple[int, int]:
+        """Canvas for a segment queued before every image exists (see the class docstring)."""
+        if self.renderer.width:
+            return self.renderer.width, self.renderer.height
+        width = self.renderer.scaled_width(image_path)
+        with self._lock:
+            self._widest = max(self._widest, width)
+            return self._widest, self.renderer.height
+
+    def scene_ready(self, index: int, image_path: str, audio_path: Optional[str]):
+        try:
+            self._submit(index, image_path, audio_path, self._canvas(image_path))
+        except Exception as e:
+            # Not fatal here: finish() submits the scene again
+            print(f"[WARN] No se pudo adelantar el segmento {index+1} ({e}). Se renderizará al final.")
+
+    def _submit(self, index: int, image_path: str, audio_path: Optional[str], canvas: Tuple[int, int]):
+        scene = self.assembler.timeline_entry(self.script['scenes'][index], image_path, audio_path)
+        path, future = self.renderer.submit_segment(self.executor, index, scene, canvas)
+        with self._lock:
+            self.segments[index] = (scene, path, future, canvas)
+        if future:
+            print(f"[SEGMENT] Escena {index+1} en cola ({scene['duration']:.2f}s)")
+
+    def finish(self, visual_paths: List[str], audio_paths: Dict[int, str]) -> str:
+        output_path = self.assembler._output_path(self.script, self.run_id)
+        canvas = self.renderer.canvas_size([{"image": path} for path in visual_paths])
+        for i in range(len(self.script['scenes'])):
+            submitted = self.segments.get(i)
+            if submitted is not None and submitted[0]["image"] == visual_paths[i] and submitted[3] == canvas:
+                continue
+            if submitted is not None:
+                if submitted[2]:
+                    submitted[2].cancel()
+                if submitted[3] != canvas:
+                    print(f"[SEGMENT] Escena {i+1} se renderiza de nuevo con el lienzo final {canvas[0]}x{canvas[1]}")
+            self._submit(i, visual_paths[i], audio_paths.get(i), canvas)
+
+        print(f"Renderizando video final en: {output_path}...")
+        for i in sorted(self.segments):
+            future = self.segments[i][2]
+            if future:
+                future.result()
+        self.renderer.concat_segments([self.segments[i][1] for i in sorted(self.segments)], output_path)
+        self.assembler.write_subtitles([self.segments[i][0] for i in sorted(self.segments)], output_path)
+        self.assembler._record_render_metrics(output_path, time.perf_counter() - self.started)
+        return output_path
+
+    def cancel(self):
+        """Drops segments that have not started (e.g. asset generation failed)."""
+        with self._lock:
+            for _, _, future, _ in self.segments.values():
+                if future:
+                    future.cancel()
+
+
 if __name__ == "__main__":
     # Test execution
     assembler = VideoAssembler("pods/kids_story/config.json")
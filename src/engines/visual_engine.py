@@ -1,109 +1,199 @@
 import os
 import json
+import shutil
 import time
-import requests
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 
-from src.variables import MOCK_VISUALS_ENABLED
+from src.variables import (
+    MOCK_VISUALS_ENABLED,
+    GEMINI_MOCK_IMAGES,
+    VISUAL_MAX_WORKERS,
+    IMAGEN_MODEL_NAME,
+    IMAGEN_ASPECT_RATIO,
+    GOOGLE_API_BASE,
+    VISUAL_STYLE_PROMPT,
+    LIBRARY_ENABLED,
+    LIBRARY_PROMPT_SIMILARITY
+)
+from src.utils.asset_cache import get_asset_cache, make_cache_key
+from src.utils.asset_library import AssetLibrary
+from src.utils.metrics import current_metrics
+from src.utils.concurrency import map_ordered, provider_limits, provider_slot
+from src.utils.placeholders import imagen_size, placeholder_image
+from src.utils import http_client
 
 class VisualGenerator:
-    def __init__(self, pod_config_path: str):
-        self.config = self._load_config(pod_config_path)
+    def __init__(self, pod_config_path: str, config: Optional[dict] = None):
+        self.config = config if config is not None else self._load_config(pod_config_path)
         self.api_key = os.getenv("SJINN_API_KEY")
         # Use centralized config override OR missing key
         self.mock_mode = MOCK_VISUALS_ENABLED or (not self.api_key or self.api_key == "your_sjinn_api_key_here")
         
+        self.limits = provider_limits(self.config)
+        self.max_workers = self.config.get("performance", {}).get("visual_workers", VISUAL_MAX_WORKERS)
+
         # Ensure assets directory exists
         self.assets_dir = os.path.join(os.path.dirname(pod_config_path), "assets")
         os.makedirs(self.assets_dir, exist_ok=True)
 
+        # Images reused across episodes
+        library = self.config.get("library", {})
+        self.library: Optional[AssetLibrary] = None
+        if library.get("enabled", LIBRARY_ENABLED):
+            self.library = AssetLibrary(os.path.join(os.path.dirname(pod_config_path), "library"),
+                                        prompt_similarity=library.get("prompt_similarity", LIBRARY_PROMPT_SIMILARITY))
+        self.style_prompt = self._style_prompt()
+        self.character_descriptions = {c["name"]: c["visual_description"]
+                                       for c in self.config.get("characters", []) if c.get("visual_description")}
+
     def _load_config(self, path: str) -> dict:
         with open(path, 'r', encoding='utf-8') as f:
             return json.load(f)
 
-    def generate_visuals(self, script: Dict) -> List[str]:
+    def _style_prompt(self) -> str:
+        consistency = self.config.get("consistency", {})
+        if consistency.get("style_prompt"):
+            return consistency["style_prompt"]
+        if consistency.get("art_style_lora"):
+            return consistency["art_style_lora"].replace("_", " ")
+        return VISUAL_STYLE_PROMPT
+
+    def scene_prompt(self, scene: Dict) -> str:
+        """
+        Full image prompt of a scene: the pod's style, the canonical
+        description of the scene's character (from the pod config) and the
+        scene prompt. Every image of a character is requested with the same
+        style and description text; no seed or reference image is sent,
+        since the Gemini API's Imagen endpoint takes neither.
+        """
+        character = scene.get('character')
+        parts = [self.style_prompt.rstrip(". ")]
+        description = self.character_descriptions.get(character)
+        if description:
+            parts.append(f"{character}: {description.rstrip('. ')}")
+        parts.append(scene['visual_prompt'])
+        return ". ".join(parts)
+
+    def generate_visuals(self, script: Dict, completed: Optional[Dict[int, str]] = None,
+                         on_scene_ready: Optional[Callable[[int, str], None]] = None,
+                         assets_dir: Optional[str] = None) -> List[str]:
         """
         Generates images/videos for each scene in the script.
         Returns a list of local file paths to the generated assets.
+        Scenes in `completed` (index -> path) are reused as-is, and
+        `on_scene_ready(index, path)` is called as each new scene finishes.
+        Files go to `assets_dir` (default: the pod's assets folder).
         """
-        generated_paths = []
         print(f"--- Iniciando Generación Visual ({'ODO MOCK' if self.mock_mode else 'MODO API REAL'}) ---")
+        completed = completed or {}
+        assets_dir = assets_dir or self.assets_dir
+        os.makedirs(assets_dir, exist_ok=True)
 
-        for i, scene in enumerate(script['scenes']):
-            prompt = scene['visual_prompt']
-            character = scene.get('character', 'Environment')
-            
-            output_filename = f"scene_{i+1:03d}_{character}.png" # In real mode might be .mp4
-            output_path = os.path.join(self.assets_dir, output_filename)
-            
-            if self.mock_mode:
-                self._generate_mock_asset(prompt, output_path, i)
-            else:
-                self._generate_real_asset(prompt, output_path)
-            
-            generated_paths.append(output_path)
-        
-        return generated_paths
+        def run_scene(i: int, scene: Dict) -> str:
+            if i in completed:
+                print(f"[RESUME] Escena {i+1} ya generada: {completed[i]}")
+                return completed[i]
+            with current_metrics().scene("visuals", i):
+                path = self._generate_scene(i, scene, assets_dir)
+            if on_scene_ready:
+                on_scene_ready(i, path)
+            return path
+
+        return map_ordered(run_scene, script['scenes'], self.max_workers)
+
+    def _generate_scene(self, i: int, scene: Dict, assets_dir: str) -> str:
+        character = scene.get('character', 'Environment')
+
+        output_filename = f"scene_{i+1:03d}_{character}.png" # In real mode might be .mp4
+        output_path = os.path.join(assets_dir, output_filename)
 
-    def _generate_mock_asset(self, prompt: str, path: str, index: int):
+        if self.library:
+            shot = self.library.find_shot(scene['visual_prompt'], character, self.style_prompt)
+            if shot:
+                print(f"[LIBRARY] Escena {i+1} reutiliza la imagen: {os.path.basename(shot)}")
+                tmp_path = f"{output_path}.tmp"
+                shutil.copyfile(shot, tmp_path)
+                os.replace(tmp_path, output_path)
+                return output_path
+
+        prompt = self.scene_prompt(scene)
+        if self.mock_mode:
+            engine = self._generate_mock_asset(prompt, output_path, i)
+        else:
+            engine = self._generate_real_asset(prompt, output_path)
+
+        # Pillow placeholders are never reused
+        if self.library and engine != "pillow":
+            self.library.add_shot(scene['visual_prompt'], character, self.style_prompt, output_path)
+        return output_path
+
+    def _generate_mock_asset(self, prompt: str, path: str, index: int) -> str:
         """
         Creates a dummy image. If GEMINI_MOCK_IMAGES is True, attempts to use Google Imagen API.
-        Otherwise uses Pillow.
+        Otherwise uses Pillow. Returns the engine that made the image.
         """
-        from src.variables import GEMINI_MOCK_IMAGES, GEMINI_MODEL_NAME
-        
         if GEMINI_MOCK_IMAGES:
             try:
                 print(f"[MOCK-GEMINI] Intentando generar imagen con API de Google para escena {index+1}...")
-                self._generate_google_image(prompt, path)
-                return
+                with provider_slot("imagen", self.limits):
+                    self._generate_google_image(prompt, path)
+                return "imagen"
+            except http_client.CircuitOpenError:
+                print(f"[WARN] Google no disponible (circuito abierto). Usando Pillow.")
             except Exception as e:
                 print(f"[WARN] Falló generación con Google ({e}). Usando Pillow.")
 
         # ... Fallback to Pillow logic ...
         print(f"[MOCK] Generando asset para escena {index+1}: {prompt[:30]}...")
-        try:
-            from PIL import Image, ImageDraw, ImageFont
-            # Create a colored image based on index to differentiate scenes
-            color = ((index * 50) % 255, (index * 80) % 255, (index * 110) % 255)
-            img = Image.new('RGB', (1280, 720), color=color)
-            d = ImageDraw.Draw(img)
-            # Try to load a font, otherwise default
-            try:
-                # MacOS standard font
-                font = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 40)
-            except:
-                font = None
-                
-            d.text((50, 300), f"ESCENA {index+1}\n{prompt[:60]}...", fill=(255, 255, 255), font=font)
-            img.save(path)
-        except ImportError:
-            with open(path, 'w') as f:
-                f.write("Mock Image Content")
+        with provider_slot("mock", self.limits):
+            self._generate_pillow_image(prompt, path, index)
+        return "pillow"
+
+    def _generate_pillow_image(self, prompt: str, path: str, index: int):
+        """Local placeholder of the size Imagen returns, labelled with the scene and its prompt."""
+        width, height = imagen_size(IMAGEN_ASPECT_RATIO)
+        placeholder_image(width, height, f"ESCENA {index+1}: {prompt[:240]}", index).save(path)
 
     def _generate_google_image(self, prompt: str, path: str):
         """
         Uses REST API to call Imagen 3 (or 2) since capabilities check was ambiguous.
+        `prompt` is the full prompt from scene_prompt (style included).
+        Identical prompts are served from the shared asset cache.
         """
+        cache_key = make_cache_key(
+            engine="imagen",
+            model=IMAGEN_MODEL_NAME,
+            prompt=prompt,
+            aspect_ratio=IMAGEN_ASPECT_RATIO
+        )
+        get_asset_cache().get_or_create(
+            cache_key,
+            path,
+            lambda: self._request_google_image(prompt, path),
+            meta={"engine": "imagen", "prompt": prompt[:80]}
+        )
+
+    def _request_google_image(self, full_prompt: str, path: str):
         api_key = os.getenv("GOOGLE_API_KEY")
         if not api_key:
             raise Exception("No Google API Key")
             
         # Try Imagen 2 endpoint (widely available in v1beta)
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/imagen-3.0-generate-001:predict?key={api_key}"
+        url = f"{GOOGLE_API_BASE}/v1beta/models/{IMAGEN_MODEL_NAME}:predict?key={api_key}"
         
         headers = {'Content-Type': 'application/json'}
         data = {
             "instances": [
-                {"prompt": f"Cartoon style, 3d pixar style. {prompt}"}
+                {"prompt": full_prompt}
             ],
             "parameters": {
                 "sampleCount": 1,
-                "aspectRatio": "16:9"
+                "aspectRatio": IMAGEN_ASPECT_RATIO
             }
         }
+        # No "seed"/"addWatermark": only Vertex AI's Imagen accepts them, the Gemini API rejects the request
         
-        response = requests.post(url, headers=headers, json=data)
+        response = http_client.request("imagen", "POST", url, limits=self.limits, headers=headers, json=data)
         
         if response.status_code != 200:
             # Try fallback to 'gemini-pro-vision'? No, that's input.
@@ -126,26 +216,27 @@ class VisualGenerator:
         else:
             raise Exception("No image data found in response")
 
-    def _generate_real_asset(self, prompt: str, path: str):
+    def _generate_real_asset(self, prompt: str, path: str) -> str:
         """
-        Calls SJinn API to generate the asset.
+        Calls SJinn API to generate the asset. Returns the engine that made the image.
         """
         # TODO: Implement actual SJinn API call format once documentation is verified
         # This is a placeholder structure based on typical Agent APIs
-        print(f"[API] Solicitando a SJinn: {prompt[:30]}...")
-        
-        # Pseudo-code for API call
-        # response = requests.post("https://api.sjinn.ai/v1/generate", json={...}, headers={...})
-        # if response.status_code == 200:
-        #     with open(path, 'wb') as f:
-        #         f.write(response.content)
-        # else:
-        #     raise Exception(f"SJinn API Error: {response.text}")
-        
+        with provider_slot("sjinn", self.limits):
+            print(f"[API] Solicitando a SJinn: {prompt[:30]}...")
+
+            # Pseudo-code for API call
+            # response = http_client.request("sjinn", "POST", f"{SJINN_API_BASE}/v1/generate", json={...}, headers={...})
+            # if response.status_code == 200:
+            #     with open(path, 'wb') as f:
+            #         f.write(response.content)
+            # else:
+            #     raise Exception(f"SJinn API Error: {response.text}")
+
         # For now, since we track the task ID but don't have the polling endpoint docs, 
         # we will fallback to Mock to let the user see the rest of the pipeline working (Audio/Script).
         print(f"[WARN] SJinn API Key detectada, pero falta documentación del endpoint de 'polling'. Usando MOCK por ahora.")
-        self._generate_mock_asset(prompt, path, 999)
+        return self._generate_mock_asset(prompt, path, 999)
         # raise NotImplementedError("La implementación del cliente API real se hará cuando confirmes la API Key.")
 
 if __name__ == "__main__":
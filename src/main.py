@@ -1,76 +1,150 @@
-import os
 import argparse
 from dotenv import load_dotenv
 
-# --- MONKEY PATCH FOR MOVIEPY COMPATIBILITY WITH NEW PILLOW ---
-import PIL.Image
-if not hasattr(PIL.Image, 'ANTIALIAS'):
-    PIL.Image.ANTIALIAS = PIL.Image.LANCZOS
-# ----------------------------------------------------------------
-
-from src.engines.script_engine import ScriptGenerator
-from src.engines.visual_engine import VisualGenerator
-from src.engines.audio_engine import AudioGenerator
-from src.engines.video_engine import VideoAssembler
-from src.utils.memory_manager import MemoryManager
+from src.pipeline import PodPipeline
+from src.utils.metrics import activate
+from src.utils.quality_control import QualityCheckError
+from src.variables import RENDER_PROFILES
 
 # Load env vars
 load_dotenv()
 
 def main():
+    # Options accepted both before and after the subcommand (subcommand copies default to SUPPRESS
+    # so they never overwrite a value given before it)
+    def add_common(p: argparse.ArgumentParser, suppress: bool):
+        default = (lambda value: argparse.SUPPRESS) if suppress else (lambda value: value)
+        p.add_argument("--topic", type=str, default=default(None), help="Topic for the video")
+        p.add_argument("--pod", type=str, default=default("kids_story"), help="Pod name (folder in pods/)")
+        p.add_argument("--resume", type=str, metavar="RUN_ID", default=default(None),
+                       help="Resume a previous run, skipping completed stages")
+        p.add_argument("--prometheus", action="store_true", default=default(False),
+                       help="Also write a Prometheus/OpenMetrics text dump of the run metrics")
+        p.add_argument("--profile", type=str, default=default(None),
+                       help=f"Render profile ({', '.join(RENDER_PROFILES)} or one defined by the pod; "
+                            f"default: the pod's)")
+
     parser = argparse.ArgumentParser(description="AI Video Creator Orchestrator")
-    parser.add_argument("--topic", type=str, help="Topic for the video", required=False)
-    parser.add_argument("--pod", type=str, default="kids_story", help="Pod name (folder in pods/)")
+    add_common(parser, suppress=False)
+    sub = parser.add_subparsers(dest="stage", metavar="{run,script,assets,render}")
+    for name, help_text in (("run", "Every stage (default)"),
+                            ("script", "Only generate the script (starts a run)"),
+                            ("assets", "Only generate images and narration of --resume RUN_ID"),
+                            ("render", "Only render and save to memory --resume RUN_ID")):
+        add_common(sub.add_parser(name, help=help_text), suppress=True)
     args = parser.parse_args()
+    stage = args.stage or "run"
+
+    try:
+        pipeline = PodPipeline(args.pod, render_profile=args.profile)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        return
+
+    if args.resume:
+        try:
+            manifest = pipeline.load_manifest(args.resume)
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            return
+        topic = manifest.data["topic"]
+        print(f"🔁 Reanudando ejecución {manifest.run_id} para Pod: {args.pod}")
+    elif stage in ("assets", "render"):
+        print(f"Error: '{stage}' necesita --resume RUN_ID (crea la ejecución con 'script' o 'run')")
+        return
+    else:
+        # If no topic provided, maybe get one from a list or ask (for now hardcoded default if missing)
+        topic = args.topic if args.topic else "Tico aprende a compartir sus juguetes"
+        manifest = pipeline.new_manifest(topic)
+        print(f"🚀 Iniciando Pipeline para Pod: {args.pod} (run_id: {manifest.run_id})")
 
-    # Paths
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(base_dir)
-    pod_config_path = os.path.join(project_root, "pods", args.pod, "config.json")
-    
-    if not os.path.exists(pod_config_path):
-        print(f"Error: No configuration found for pod '{args.pod}' at {pod_config_path}")
+    metrics = pipeline.new_metrics(manifest)
+    with pipeline, activate(metrics):
+        try:
+            if stage == "run":
+                final_video_path = run_stages(pipeline, manifest, topic)
+            else:
+                final_video_path = run_single_stage(pipeline, manifest, topic, stage)
+        except QualityCheckError as e:
+            print(f"\n❌ Control de calidad fallido: {e}")
+            print(f"➡️  Revisa el informe y reanuda con: --resume {manifest.run_id}")
+            raise SystemExit(1)
+    if not final_video_path:
         return
 
-    print(f"🚀 Iniciando Pipeline para Pod: {args.pod}")
+    report_path = metrics.write_reports(final_video_path, prometheus=args.prometheus)
+
+    print(f"\n✅ PROCESO COMPLETADO EXITOSAMENTE")
+    print(f"📺 Video final disponible en: {final_video_path}")
+    print(f"📊 Métricas de la ejecución: {report_path}")
+
+def run_single_stage(pipeline: PodPipeline, manifest, topic: str, stage: str):
+    """
+    Runs one stage of a run. Earlier stages must already be in the manifest;
+    only the engines that stage uses are loaded. Returns the final video path
+    for "render", None otherwise.
+    """
+    if stage == "script":
+        print("\n--- PASO 1: GUIÓN ---")
+        print(f"Tema: {topic}")
+        script = pipeline.produce_script(topic, manifest)
+        if not script:
+            print("Error generando guion. Abortando.")
+            return None
+        print(f"Guion generado: {script.get('title')}")
+        print(f"➡️  Siguiente paso: python -m src.main assets --pod {manifest.data['pod']} --resume {manifest.run_id}")
+        return None
+
+    if not manifest.is_done("script"):
+        print(f"Error: la ejecución {manifest.run_id} no tiene guion. Ejecuta primero 'script'.")
+        return None
+    script = manifest.get("script", "script")
 
+    if stage == "assets":
+        print("\n--- PASO 2/3: VISUALES + AUDIO ---")
+        pipeline.produce_assets(script, manifest)
+        print(f"➡️  Siguiente paso: python -m src.main render --pod {manifest.data['pod']} --resume {manifest.run_id}")
+        return None
+
+    visuals = manifest.completed_assets("visuals")
+    audio_paths = manifest.completed_assets("audio")
+    missing = [i + 1 for i, scene in enumerate(script["scenes"])
+               if i not in visuals or (scene.get("audio_text") and i not in audio_paths)]
+    if missing:
+        print(f"Error: faltan assets de las escenas {missing}. Ejecuta primero 'assets'.")
+        return None
+
+    print("\n--- PASO 4: ENSAMBLAJE ---")
+    visual_paths = [visuals[i] for i in range(len(script["scenes"]))]
+    final_video_path = pipeline.render(script, visual_paths, audio_paths, manifest)
+    print("\n--- PASO 5: MEMORIA ---")
+    pipeline.save_memory(script, manifest)
+    return final_video_path
+
+def run_stages(pipeline: PodPipeline, manifest, topic: str):
     # 1. Script Generation
     print("\n--- PASO 1: GUIÓN ---")
-    script_engine = ScriptGenerator(pod_config_path)
-    
-    # If no topic provided, maybe get one from a list or ask (for now hardcoded default if missing)
-    topic = args.topic if args.topic else "Tico aprende a compartir sus juguetes"
     print(f"Tema: {topic}")
-    
-    script = script_engine.generate_script(topic)
+    script = pipeline.produce_script(topic, manifest)
     if not script:
         print("Error generando guion. Abortando.")
-        return
-    
-    print(f"Guion generado: {script.get('title')}")
+        return None
 
-    # 2. Visual Generation
-    print("\n--- PASO 2: VISUALES ---")
-    visual_engine = VisualGenerator(pod_config_path)
-    visual_paths = visual_engine.generate_visuals(script)
+    print(f"Guion generado: {script.get('title')}")
 
-    # 3. Audio Generation
-    print("\n--- PASO 3: AUDIO ---")
-    audio_engine = AudioGenerator(pod_config_path)
-    audio_paths = audio_engine.generate_narration(script)
+    # 2 & 3. Visual + Audio Generation (concurrent)
+    print("\n--- PASO 2/3: VISUALES + AUDIO ---")
+    visual_paths, audio_paths = pipeline.produce_assets(script, manifest)
 
     # 4. Assembly
     print("\n--- PASO 4: ENSAMBLAJE ---")
-    video_engine = VideoAssembler(pod_config_path)
-    final_video_path = video_engine.assemble_video(script, visual_paths, audio_paths)
+    final_video_path = pipeline.render(script, visual_paths, audio_paths, manifest)
 
     # 5. Save Environment State (Memory)
     # Only save if everything succeeded
     print("\n--- PASO 5: MEMORIA ---")
-    script_engine.save_episode_to_memory(script)
-
-    print(f"\n✅ PROCESO COMPLETADO EXITOSAMENTE")
-    print(f"📺 Video final disponible en: {final_video_path}")
+    pipeline.save_memory(script, manifest)
+    return final_video_path
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,448 @@
+import os
+import json
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from src.utils.concurrency import submit_in_context
+from src.utils.metrics import RunMetrics, current_metrics
+from src.utils import quality_control
+from src.utils.asset_cache import get_asset_cache
+from src.utils.quality_control import QualityCheckError
+from src.utils.run_manifest import RunManifest, file_sha256
+from src.engines.render_profiles import resolve_render_profile
+from src.variables import DEFAULT_RENDER_PROFILE, QC_ENABLED, QC_GATE, RUN_ASSETS_KEEP
+
+if TYPE_CHECKING:
+    from src.engines.script_engine import ScriptGenerator
+    from src.engines.visual_engine import VisualGenerator
+    from src.engines.audio_engine import AudioGenerator
+    from src.engines.video_engine import IncrementalRender, VideoAssembler
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _timed_stage(stage: str, fn, *args, **kwargs):
+    with current_metrics().stage(stage):
+        return fn(*args, **kwargs)
+
+
+def localized_script(script: Dict, language: str) -> Dict:
+    """Copy of the script whose narration is the stored translation into `language`."""
+    texts = script["translations"][language]
+    scenes = [{**scene, "audio_text": texts[i] if i < len(texts) else ""}
+              for i, scene in enumerate(script["scenes"])]
+    return {**script, "scenes": scenes}
+
+
+class SceneReadiness:
+    """
+    Joins the per-scene events of both engines: `on_complete(index, image,
+    audio)` fires once per scene, as soon as its image and its narration
+    (when the scene has `audio_text`) both exist.
+    """
+
+    def __init__(self, script: Dict, on_complete: Callable[[int, str, Optional[str]], None]):
+        self.expects_audio = [bool(scene.get('audio_text')) for scene in script['scenes']]
+        self.on_complete = on_complete
+        self.images: Dict[int, str] = {}
+        self.audio: Dict[int, str] = {}
+        self._fired = set()
+        self._lock = threading.Lock()
+
+    def image_ready(self, index: int, path: str):
+        with self._lock:
+            self.images[index] = path
+        self._check(index)
+
+    def audio_ready(self, index: int, path: str):
+        with self._lock:
+            self.audio[index] = path
+        self._check(index)
+
+    def _check(self, index: int):
+        with self._lock:
+            if index in self._fired or index not in self.images:
+                return
+            if self.expects_audio[index] and index not in self.audio:
+                return
+            self._fired.add(index)
+            image, audio = self.images[index], self.audio.get(index)
+        self.on_complete(index, image, audio)
+
+
+def generate_assets(script: Dict, visual_engine: "VisualGenerator", audio_engine: "AudioGenerator",
+                    manifest: Optional[RunManifest] = None,
+                    on_scene_complete: Optional[Callable[[int, str, Optional[str]], None]] = None
+                    ) -> Tuple[List[str], Dict[int, str]]:
+    """
+    Runs visual and audio generation at the same time. Both engines only read
+    the script and write independent files, so the stage takes as long as the
+    slowest engine instead of the sum of both.
+    With a manifest, finished scenes are checkpointed and skipped on resume,
+    and files go to a per-run folder so overlapping episodes never collide.
+    `on_scene_complete(index, image, audio)` is called as soon as a scene has
+    both assets, while the rest are still being generated.
+    """
+    readiness = SceneReadiness(script, on_scene_complete) if on_scene_complete else None
+    visual_kwargs, audio_kwargs = {}, {}
+    if manifest:
+        run_assets_dir = os.path.join(visual_engine.assets_dir, manifest.run_id)
+        visual_kwargs = {"assets_dir": run_assets_dir, "completed": manifest.completed_assets("visuals")}
+        audio_kwargs = {"assets_dir": run_assets_dir, "completed": manifest.completed_assets("audio")}
+
+    def on_visual(i: int, path: str):
+        if manifest:
+            manifest.record_asset("visuals", i, path)
+        if readiness:
+            readiness.image_ready(i, path)
+
+    def on_audio(i: int, path: str):
+        if manifest:
+            manifest.record_asset("audio", i, path)
+        if readiness:
+            readiness.audio_ready(i, path)
+
+    if readiness:
+        # Scenes restored from the manifest never emit an event of their own
+        for i, path in visual_kwargs.get("completed", {}).items():
+            readiness.image_ready(i, path)
+        for i, path in audio_kwargs.get("completed", {}).items():
+            readiness.audio_ready(i, path)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        visual_future = submit_in_context(executor, _timed_stage, "visuals", visual_engine.generate_visuals,
+                                          script, on_scene_ready=on_visual, **visual_kwargs)
+        audio_future = submit_in_context(executor, _timed_stage, "audio", audio_engine.generate_narration,
+                                         script, on_scene_ready=on_audio, **audio_kwargs)
+        visual_paths, audio_paths = visual_future.result(), audio_future.result()
+
+    if manifest:
+        manifest.mark_done("visuals")
+        manifest.mark_done("audio")
+    return visual_paths, audio_paths
+
+
+class PodPipeline:
+    """
+    All engines of one pod, built once and reused for every episode. The
+    pod's config.json is read a single time and shared by the engines.
+    Each engine (and the libraries behind it: Gemini SDK, MoviePy...) is
+    only imported and built the first time a stage needs it, so a run that
+    does a single stage never pays for the others.
+    `render_profile` overrides the pod's render profile (see RENDER_PROFILES).
+    """
+
+    def __init__(self, pod: str, project_root: str = PROJECT_ROOT, render_profile: Optional[str] = None):
+        self.pod = pod
+        self.pod_dir = os.path.join(project_root, "pods", pod)
+        self.config_path = os.path.join(self.pod_dir, "config.json")
+        if not os.path.exists(self.config_path):
+            raise FileNotFoundError(f"No configuration found for pod '{pod}' at {self.config_path}")
+
+        with open(self.config_path, 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+
+        self._engines: Dict[str, Any] = {}
+        self._engines_lock = threading.Lock()
+
+        # Episodes whose script exists but are not in memory yet (batch mode)
+        self._pending_episodes: List[Dict] = []
+        self._pending_lock = threading.Lock()
+        # Renders started while their assets were still being generated, by run_id
+        self._incremental_renders: Dict[str, "IncrementalRender"] = {}
+        # Narration of the extra languages ({language: {scene: path}}), by run_id
+        self._language_tracks: Dict[str, Dict[str, Dict[int, str]]] = {}
+        self.extra_languages: List[str] = self.config.get("extra_languages", [])
+        # Resolved now so an unknown profile fails before any stage runs
+        self.render_profile: str = resolve_render_profile(self.config, render_profile)["name"]
+        qc = self.config.get("qc", {})
+        self.qc_enabled: bool = qc.get("enabled", QC_ENABLED)
+        self.qc_gate: bool = qc.get("gate", QC_GATE)
+
+    def __enter__(self) -> "PodPipeline":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Cancels renders that were started but never finished and shuts down
+        the engines' worker processes and database handles. Engines that were
+        never built are not built now.
+        """
+        for incremental in self._incremental_renders.values():
+            incremental.cancel()
+        self._incremental_renders.clear()
+        self._language_tracks.clear()
+        with self._engines_lock:
+            video = self._engines.get("video")
+            script = self._engines.get("script")
+        if video is not None:
+            video.close()
+        if script is not None:
+            script.memory_manager.close()
+
+    def _engine(self, name: str, factory: Callable[[], Any]) -> Any:
+        with self._engines_lock:
+            if name not in self._engines:
+                self._engines[name] = factory()
+            return self._engines[name]
+
+    @property
+    def script_engine(self) -> "ScriptGenerator":
+        from src.engines.script_engine import ScriptGenerator
+        return self._engine("script", lambda: ScriptGenerator(self.config_path, config=self.config))
+
+    @property
+    def visual_engine(self) -> "VisualGenerator":
+        from src.engines.visual_engine import VisualGenerator
+        return self._engine("visual", lambda: VisualGenerator(self.config_path, config=self.config))
+
+    @property
+    def audio_engine(self) -> "AudioGenerator":
+        from src.engines.audio_engine import AudioGenerator
+        return self._engine("audio", lambda: AudioGenerator(self.config_path, config=self.config))
+
+    @property
+    def video_engine(self) -> "VideoAssembler":
+        from src.engines.video_engine import VideoAssembler
+        return self._engine("video", lambda: VideoAssembler(self.config_path, config=self.config,
+                                                            profile=self.render_profile))
+
+    @property
+    def assembly_stage(self) -> str:
+        """Manifest stage of the render: each profile keeps its own output, so a run can have a preview and a final."""
+        if self.render_profile == DEFAULT_RENDER_PROFILE:
+            return "assembly"
+        return f"assembly_{self.render_profile}"
+
+    def new_manifest(self, topic: str) -> RunManifest:
+        return RunManifest.create(self.pod_dir, topic)
+
+    def new_metrics(self, manifest: RunManifest) -> RunMetrics:
+        return RunMetrics(run_id=manifest.run_id, pod=self.pod)
+
+    def load_manifest(self, run_id: str) -> RunManifest:
+        return RunManifest.load(self.pod_dir, run_id)
+
+    def produce_script(self, topic: str, manifest: RunManifest) -> Optional[Dict]:
+        if manifest.is_done("script"):
+            print("[RESUME] Guion recuperado del manifiesto.")
+            script = manifest.get("script", "script")
+        else:
+            with self._pending_lock:
+                pending = list(self._pending_episodes)
+            with current_metrics().stage("script"):
+                script = self.script_engine.generate_script(topic, pending_episodes=pending)
+                if script and self.extra_languages:
+                    translations = self.script_engine.translate_narration(script, self.extra_languages)
+                    if translations:
+                        script["translations"] = translations
+                    else:
+                        print("⚠️ Traducción fallida: el video solo tendrá el idioma principal.")
+            if not script:
+                return None
+            manifest.mark_done("script", script=script)
+
+        with self._pending_lock:
+            self._pending_episodes.append({"run_id": manifest.run_id, "title": script.get("title"),
+                                           "summary": script.get("summary")})
+        return script
+
+    def produce_assets(self, script: Dict, manifest: RunManifest) -> Tuple[List[str], Dict[int, str]]:
+        languages = list(script.get("translations", {}))
+        incremental = None
+        if self.video_engine.supports_incremental and not languages and not manifest.verified_output(self.assembly_stage):
+            # Segments start encoding as soon as each scene's image and audio exist.
+            # Not with extra languages: their narration can change the scene lengths
+            incremental = self.video_engine.start_incremental(script, run_id=manifest.run_id)
+        try:
+            with current_metrics().stage("assets"), ThreadPoolExecutor(max_workers=len(languages) or 1) as executor:
+                # Extra narrations only need the translated text, so they run alongside the rest
+                futures = {language: submit_in_context(executor, self._produce_language_audio, script, language,
+                                                       manifest)
+                           for language in languages}
+                paths = generate_assets(script, self.visual_engine, self.audio_engine, manifest,
+                                        on_scene_complete=incremental.scene_ready if incremental else None)
+                tracks = {language: future.result() for language, future in futures.items()}
+        except Exception:
+            if incremental:
+                incremental.cancel()
+            raise
+        if incremental:
+            self._incremental_renders[manifest.run_id] = incremental
+        if tracks:
+            self._language_tracks[manifest.run_id] = tracks
+        return paths
+
+    def _produce_language_audio(self, script: Dict, language: str, manifest: RunManifest) -> Dict[int, str]:
+        stage = f"audio_{language}"
+        assets_dir = os.path.join(self.audio_engine.assets_dir, manifest.run_id, language)
+        with current_metrics().stage(stage):
+            paths = self.audio_engine.generate_narration(
+                localized_script(script, language), assets_dir=assets_dir,
+                completed=manifest.completed_assets(stage),
+                on_scene_ready=lambda i, path: manifest.record_asset(stage, i, path))
+        manifest.mark_done(stage)
+        return paths
+
+    def language_tracks(self, script: Dict, manifest: RunManifest) -> Dict[str, Dict[int, str]]:
+        """Extra-language narration of a run: from produce_assets, or from the manifest when resuming."""
+        tracks = self._language_tracks.pop(manifest.run_id, None)
+        if tracks is None:
+            tracks = {language: manifest.completed_assets(f"audio_{language}")
+                      for language in script.get("translations", {})}
+        return tracks
+
+    def render(self, script: Dict, visual_paths: List[str], audio_paths: Dict[int, str],
+               manifest: RunManifest) -> str:
+        # Whatever produce_assets left for this run is taken now, so nothing outlives the render
+        incremental = self._incremental_renders.pop(manifest.run_id, None)
+        language_tracks = self.language_tracks(script, manifest)
+        final_video_path = manifest.verified_output(self.assembly_stage)
+        if final_video_path:
+            # Only videos that went through the post-render QC are recorded, so it is not repeated
+            print(f"[RESUME] Video ya renderizado: {final_video_path}")
+            if incremental:
+                incremental.cancel()
+        else:
+            try:
+                self.check_assets(script, visual_paths, audio_paths, language_tracks, manifest)
+                with current_metrics().stage("assembly"):
+                    if incremental:
+                        final_video_path = incremental.finish(visual_paths, audio_paths)
+                    else:
+                        final_video_path = self.video_engine.assemble_video(script, visual_paths, audio_paths,
+                                                                            language_tracks=language_tracks,
+                                                                            run_id=manifest.run_id)
+            except Exception:
+                if incremental:
+                    incremental.cancel()
+                raise
+            self.check_video(final_video_path, manifest)
+            manifest.mark_done(self.assembly_stage, path=final_video_path, sha256=file_sha256(final_video_path),
+                               profile=self.render_profile)
+        return final_video_path
+
+    def check_assets(self, script: Dict, visual_paths: List[str], audio_paths: Dict[int, str],
+                     language_tracks: Dict[str, Dict[int, str]], manifest: RunManifest):
+        """
+        Pre-render QC of every scene image and narration. When it fails and
+        the pod gates on QC, the rejected assets are dropped from the manifest
+        and the asset cache, so resuming the run generates them again.
+        """
+        if not self.qc_enabled:
+            return
+        with current_metrics().stage("qc"):
+            report = quality_control.check_assets(script, visual_paths, audio_paths, language_tracks)
+        self._record_qc(report, "qc_assets", manifest)
+        if report["passed"] or not self.qc_gate:
+            return
+        owners = {path: ("visuals", i) for i, path in enumerate(visual_paths)}
+        owners.update({path: ("audio", i) for i, path in audio_paths.items()})
+        for language, paths in language_tracks.items():
+            owners.update({path: (f"audio_{language}", i) for i, path in paths.items()})
+        for issue in report["issues"]:
+            if issue["severity"] == "error" and issue["path"] in owners:
+                stage, index = owners[issue["path"]]
+                manifest.discard_asset(stage, index)
+                get_asset_cache().discard_content(issue["path"])
+                if stage == "visuals" and self.visual_engine.library:
+                    self.visual_engine.library.discard_content(issue["path"])
+        raise QualityCheckError(report)
+
+    def check_video(self, video_path: str, manifest: RunManifest):
+        """
+        Post-render QC of the video, before the render is recorded as done.
+        When it fails and the pod gates on QC, the video is moved out of the
+        output folder into the run's folder, so it is never published and
+        resuming the run renders it again.
+        """
+        if not self.qc_enabled:
+            return
+        with current_metrics().stage("qc"):
+            report = quality_control.check_video(video_path)
+        self._record_qc(report, self.assembly_stage.replace("assembly", "qc_video"), manifest)
+        if not report["passed"] and self.qc_gate:
+            rejected = os.path.join(os.path.dirname(manifest.path), f"rejected_{os.path.basename(video_path)}")
+            os.replace(video_path, rejected)
+            print(f"[QC] Video rechazado, movido a: {rejected}")
+            raise QualityCheckError(report)
+
+    def _record_qc(self, report: Dict, stage: str, manifest: RunManifest):
+        """Adds a report to the run's qc.json and its outcome to the manifest and metrics."""
+        qc_path = os.path.join(os.path.dirname(manifest.path), "qc.json")
+        reports = {}
+        if os.path.exists(qc_path):
+            with open(qc_path, 'r', encoding='utf-8') as f:
+                reports = json.load(f)
+        reports[stage] = report
+        with open(qc_path, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=4, ensure_ascii=False)
+
+        for issue in report["issues"]:
+            current_metrics().incr("qc_issues", check=issue["check"], severity=issue["severity"])
+        errors = sum(issue["severity"] == "error" for issue in report["issues"])
+        manifest.mark_done(stage, passed=report["passed"], errors=errors,
+                           warnings=len(report["issues"]) - errors, report=qc_path)
+        if report["passed"]:
+            print(f"🔎 Control de calidad ({report['stage']}): OK ({len(report['issues'])} avisos)")
+        else:
+            print(f"🔎 Control de calidad ({report['stage']}): {errors} errores. Informe: {qc_path}")
+
+    def save_memory(self, script: Dict, manifest: RunManifest):
+        if manifest.is_done("memory"):
+            print("[RESUME] Episodio ya guardado en memoria.")
+        else:
+            with current_metrics().stage("memory"):
+                self.script_engine.save_episode_to_memory(script)
+            manifest.mark_done("memory")
+        self.release_pending(manifest.run_id)
+        self.prune_run_assets()
+
+    def release_pending(self, run_id: str):
+        """Drops a run's episode from the pending list (saved to memory or failed)."""
+        with self._pending_lock:
+            self._pending_episodes = [ep for ep in self._pending_episodes if ep["run_id"] != run_id]
+
+    def abandon_run(self, run_id: str):
+        """
+        Releases what the pipeline holds for a run that failed before being
+        saved: its pending episode and any render started for it.
+        """
+        self.release_pending(run_id)
+        incremental = self._incremental_renders.pop(run_id, None)
+        if incremental:
+            incremental.cancel()
+        self._language_tracks.pop(run_id, None)
+
+    def prune_run_assets(self, keep: Optional[int] = None) -> List[str]:
+        """
+        Deletes the asset folders (assets/<run_id>/) of finished runs, except
+        the newest `keep` (the pod's "keep_run_assets", or RUN_ASSETS_KEEP).
+        Runs that have not finished keep theirs for --resume. Returns the
+        removed run ids.
+        """
+        keep = self.config.get("keep_run_assets", RUN_ASSETS_KEEP) if keep is None else keep
+        assets_dir = os.path.join(self.pod_dir, "assets")
+        if not os.path.isdir(assets_dir):
+            return []
+        finished = []
+        # Run ids start with their creation time, so name order is age order
+        for run_id in sorted(os.listdir(assets_dir), reverse=True):
+            if not os.path.isdir(os.path.join(assets_dir, run_id)):
+                continue
+            try:
+                if self.load_manifest(run_id).is_done("memory"):
+                    finished.append(run_id)
+            except (FileNotFoundError, ValueError):
+                continue
+        removed = finished[keep:]
+        for run_id in removed:
+            shutil.rmtree(os.path.join(assets_dir, run_id), ignore_errors=True)
+        if removed:
+            print(f"[CLEANUP] Assets borrados de {len(removed)} ejecuciones terminadas")
+        return removed
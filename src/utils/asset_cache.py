@@ -0,0 +1,179 @@
+import contextlib
+import filecmp
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from src.utils.metrics import current_metrics
+from src.variables import ASSET_CACHE_DIR, ASSET_CACHE_MAX_BYTES
+
+
+def make_cache_key(**parts: Any) -> str:
+    """
+    Content address of a generated asset: sha256 over the canonical JSON of
+    every input that affects the output (engine, model, prompt, voice...).
+    """
+    canonical = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class AssetCache:
+    """
+    Persistent, size-bounded cache of generated images and narration.
+    Blobs live under `<cache_dir>/blobs/<key[:2]>/<key>` and an SQLite index
+    tracks size and last access for LRU eviction. The directory is shared by
+    every pod, and SQLite locking makes it safe to use from several processes.
+    """
+
+    def __init__(self, cache_dir: str = ASSET_CACHE_DIR, max_bytes: int = ASSET_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.blobs_dir = os.path.join(cache_dir, "blobs")
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        self.index_path = os.path.join(cache_dir, "index.sqlite")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS assets ("
+                "key TEXT PRIMARY KEY, size INTEGER NOT NULL, created REAL NOT NULL, "
+                "last_access REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0, meta TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_assets_last_access ON assets(last_access)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.index_path, timeout=30)
+
+    def _blob_path(self, key: str) -> str:
+        return os.path.join(self.blobs_dir, key[:2], key)
+
+    def fetch(self, key: str, dest_path: str) -> bool:
+        """Copies the cached blob to dest_path. Returns False on a miss."""
+        blob = self._blob_path(key)
+        with self._lock, contextlib.closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT size FROM assets WHERE key = ?", (key,)).fetchone()
+            copied = row is not None and self._copy_out(blob, dest_path)
+            if not copied:
+                if row is not None:
+                    conn.execute("DELETE FROM assets WHERE key = ?", (key,))
+                self.misses += 1
+                current_metrics().incr("cache_misses", cache="assets")
+                return False
+            conn.execute(
+                "UPDATE assets SET last_access = ?, hits = hits + 1 WHERE key = ?",
+                (time.time(), key),
+            )
+            self.hits += 1
+            current_metrics().incr("cache_hits", cache="assets")
+        return True
+
+    @staticmethod
+    def _copy_out(blob: str, dest_path: str) -> bool:
+        # Runs under the lock, so this process cannot evict the blob meanwhile.
+        # Another process can: a blob gone before it is opened is a miss, and
+        # once open it stays readable after an unlink.
+        try:
+            source = open(blob, 'rb')
+        except FileNotFoundError:
+            return False
+        tmp_path = f"{dest_path}.{uuid.uuid4().hex[:8]}.tmp"
+        with source, open(tmp_path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.replace(tmp_path, dest_path)
+        return True
+
+    def store(self, key: str, src_path: str, meta: Optional[Dict[str, Any]] = None):
+        """Adds a freshly generated file to the cache and evicts if over budget."""
+        blob = self._blob_path(key)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        tmp_path = f"{blob}.{uuid.uuid4().hex[:8]}.tmp"
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, blob)
+
+        size = os.path.getsize(blob)
+        now = time.time()
+        with self._lock, contextlib.closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO assets (key, size, created, last_access, hits, meta) "
+                "VALUES (?, ?, ?, ?, 0, ?)",
+                (key, size, now, now, json.dumps(meta or {}, ensure_ascii=False)),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM assets").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM assets ORDER BY last_access ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM assets WHERE key = ?", (key,))
+            try:
+                os.remove(self._blob_path(key))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def get_or_create(self, key: str, dest_path: str, create: Callable[[], None],
+                      meta: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Fills dest_path from the cache, or calls create() to generate it and
+        stores the result. Returns True on a cache hit.
+        """
+        if self.fetch(key, dest_path):
+            print(f"[CACHE] Hit: {os.path.basename(dest_path)}")
+            return True
+        create()
+        if os.path.exists(dest_path):
+            self.store(key, dest_path, meta)
+        return False
+
+    def discard_content(self, path: str) -> int:
+        """
+        Drops every cached blob identical to the file at `path`, so an asset
+        rejected by quality control is generated again instead of served from
+        the cache. Returns the number of entries removed.
+        """
+        size = os.path.getsize(path)
+        removed = 0
+        with self._lock, contextlib.closing(self._connect()) as conn, conn:
+            for (key,) in conn.execute("SELECT key FROM assets WHERE size = ?", (size,)).fetchall():
+                blob = self._blob_path(key)
+                if os.path.exists(blob) and filecmp.cmp(blob, path, shallow=False):
+                    conn.execute("DELETE FROM assets WHERE key = ?", (key,))
+                    os.remove(blob)
+                    removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with contextlib.closing(self._connect()) as conn, conn:
+            entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM assets").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": total,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_shared_cache: Optional[AssetCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_asset_cache() -> AssetCache:
+    """Process-wide cache instance shared by every engine and pod."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = AssetCache()
+        return _shared_cache
@@ -0,0 +1,139 @@
+import contextlib
+import filecmp
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import unicodedata
+import uuid
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from src.utils.metrics import current_metrics
+from src.variables import LIBRARY_PROMPT_SIMILARITY
+
+# Words that say nothing about what is on screen, dropped before comparing prompts
+_STOPWORDS = frozenset(
+    "con del las los para por una uno unos unas que sus muy mas como entre sobre desde hacia "
+    "the and with for from into onto its his her their this that very while".split()
+)
+
+
+def prompt_terms(prompt: str) -> FrozenSet[str]:
+    """Significant words of a prompt: lowercase, accents removed, short words and stopwords dropped."""
+    text = unicodedata.normalize("NFKD", prompt.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return frozenset(w for w in re.findall(r"\w+", text) if len(w) >= 3 and w not in _STOPWORDS)
+
+
+def prompt_similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard index of two term sets (1.0 = same words)."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class AssetLibrary:
+    """
+    Visual library of one pod, kept at `pods/<pod>/library/` and shared by
+    every episode: one image per generated shot, with every prompt that
+    produced it (or was served by it). Shots are keyed by character and
+    style, so an image is only reused under the pod's current art style.
+
+    A scene whose prompt is close enough to a stored one (same character and
+    style, word-set similarity >= LIBRARY_PROMPT_SIMILARITY) reuses that image
+    instead of generating a new one. Reuse is decided by prompt and character
+    only: images are never matched by how they look, so two different shots
+    that happen to look alike both stay in the library.
+    """
+
+    def __init__(self, library_dir: str, prompt_similarity: float = LIBRARY_PROMPT_SIMILARITY):
+        self.library_dir = library_dir
+        self.shots_dir = os.path.join(library_dir, "shots")
+        os.makedirs(self.shots_dir, exist_ok=True)
+        self.index_path = os.path.join(library_dir, "index.sqlite")
+        self.prompt_similarity = prompt_similarity
+        self._lock = threading.Lock()
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS shots ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, character TEXT NOT NULL, style TEXT NOT NULL, "
+                "size INTEGER NOT NULL, path TEXT NOT NULL, created REAL NOT NULL, "
+                "uses INTEGER NOT NULL DEFAULT 0, last_used REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS prompts ("
+                "shot_id INTEGER NOT NULL REFERENCES shots(id) ON DELETE CASCADE, prompt TEXT NOT NULL, "
+                "terms TEXT NOT NULL, PRIMARY KEY (shot_id, prompt))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_shots_lookup ON shots(character, style)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    # --- Shots ---
+
+    def find_shot(self, prompt: str, character: str, style: str) -> Optional[str]:
+        """Path of the stored image whose prompt is most similar to `prompt`, if similar enough."""
+        terms = prompt_terms(prompt)
+        best: Tuple[float, Optional[int], Optional[str]] = (0.0, None, None)
+        with self._lock, contextlib.closing(self._connect()) as conn, conn:
+            rows = conn.execute(
+                "SELECT s.id, s.path, p.terms FROM shots s JOIN prompts p ON p.shot_id = s.id "
+                "WHERE s.character = ? AND s.style = ?", (character, style)
+            ).fetchall()
+            for shot_id, path, stored in rows:
+                score = prompt_similarity(terms, frozenset(stored.split()))
+                if score > best[0] and os.path.exists(path):
+                    best = (score, shot_id, path)
+            score, shot_id, path = best
+            if shot_id is None or score < self.prompt_similarity:
+                current_metrics().incr("library_misses")
+                return None
+            conn.execute("UPDATE shots SET uses = uses + 1, last_used = ? WHERE id = ?", (time.time(), shot_id))
+            conn.execute("INSERT OR IGNORE INTO prompts (shot_id, prompt, terms) VALUES (?, ?, ?)",
+                         (shot_id, prompt, " ".join(sorted(terms))))
+        current_metrics().incr("library_hits")
+        return path
+
+    def add_shot(self, prompt: str, character: str, style: str, image_path: str) -> str:
+        """Stores a generated image under `prompt`. Returns the library path of the shot."""
+        terms = " ".join(sorted(prompt_terms(prompt)))
+        with self._lock, contextlib.closing(self._connect()) as conn, conn:
+            ext = os.path.splitext(image_path)[1] or ".png"
+            path = os.path.join(self.shots_dir, f"{uuid.uuid4().hex}{ext}")
+            tmp_path = f"{path}.tmp"
+            shutil.copyfile(image_path, tmp_path)
+            os.replace(tmp_path, path)
+            cursor = conn.execute(
+                "INSERT INTO shots (character, style, size, path, created) VALUES (?, ?, ?, ?, ?)",
+                (character, style, os.path.getsize(path), path, time.time()))
+            conn.execute("INSERT INTO prompts (shot_id, prompt, terms) VALUES (?, ?, ?)",
+                         (cursor.lastrowid, prompt, terms))
+        return path
+
+    def discard_content(self, image_path: str) -> int:
+        """
+        Drops the stored shot that `image_path` is a copy of (e.g. a scene
+        image rejected by quality control), so no later scene reuses it.
+        Only byte-identical files match; other shots are never touched.
+        Returns the number of shots removed.
+        """
+        size = os.path.getsize(image_path)
+        removed = 0
+        with self._lock, contextlib.closing(self._connect()) as conn, conn:
+            for shot_id, path in conn.execute("SELECT id, path FROM shots WHERE size = ?", (size,)).fetchall():
+                if os.path.exists(path) and filecmp.cmp(path, image_path, shallow=False):
+                    conn.execute("DELETE FROM shots WHERE id = ?", (shot_id,))
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+    def stats(self) -> Dict:
+        with contextlib.closing(self._connect()) as conn, conn:
+            shots, prompts = conn.execute(
+                "SELECT (SELECT COUNT(*) FROM shots), (SELECT COUNT(*) FROM prompts)").fetchone()
+        return {"shots": shots, "prompts": prompts}
@@ -0,0 +1,149 @@
+import os
+import struct
+import wave
+from typing import Optional, Tuple
+
+from src.utils.ffmpeg import probe_duration
+
+# Bitrates in kbps by [version is MPEG-1][layer]; index 0 is "free", 15 is invalid
+_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# Sample rates by the header's version bits (0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1)
+_SAMPLE_RATES = {0: [11025, 12000, 8000], 2: [22050, 24000, 16000], 3: [44100, 48000, 32000]}
+# Encoder strings of a LAME tag (written by LAME and by ffmpeg's libmp3lame wrapper)
+_LAME_TAG_ENCODERS = (b"LAME", b"Lavf", b"Lavc")
+
+
+def _parse_frame_header(data: bytes, offset: int) -> Optional[Tuple[int, int, int, bool, int]]:
+    """
+    Decodes the 4-byte MPEG audio frame header at `offset`.
+    Returns (frame_length, samples_per_frame, sample_rate, is_mpeg1, channel_mode)
+    or None if there is no valid header there.
+    """
+    if offset + 4 > len(data):
+        return None
+    header = struct.unpack(">I", data[offset:offset + 4])[0]
+    if header & 0xFFE00000 != 0xFFE00000:
+        return None
+    version_bits = (header >> 19) & 0x3
+    layer = 4 - ((header >> 17) & 0x3)
+    bitrate_index = (header >> 12) & 0xF
+    rate_index = (header >> 10) & 0x3
+    if version_bits == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    is_mpeg1 = version_bits == 3
+    bitrate = _BITRATES[(is_mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][rate_index]
+    padding = (header >> 9) & 0x1
+    channel_mode = (header >> 6) & 0x3
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate, is_mpeg1, channel_mode
+    samples = 1152 if layer == 2 or is_mpeg1 else 576
+    return samples // 8 * bitrate // sample_rate + padding, samples, sample_rate, is_mpeg1, channel_mode
+
+
+def _skip_id3v2(data: bytes) -> int:
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _vbr_header(data: bytes, offset: int, is_mpeg1: bool, channel_mode: int) -> Optional[Tuple[int, int]]:
+    """
+    (frame count, trimmed samples) from a Xing/Info or VBRI header in the
+    first frame, if present. Trimmed samples are the encoder delay and end
+    padding of a LAME tag, which decoders drop from the output.
+    """
+    mono = channel_mode == 3
+    xing = offset + 4 + ((17 if mono else 32) if is_mpeg1 else (9 if mono else 17))
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 0x1:
+            frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+            # The LAME tag follows the optional fields: frames, bytes, 100-byte TOC, quality
+            tag = xing + 8 + 4 * bool(flags & 0x1) + 4 * bool(flags & 0x2) + 100 * bool(flags & 0x4) \
+                + 4 * bool(flags & 0x8)
+            trimmed = 0
+            if data[tag:tag + 4] in _LAME_TAG_ENCODERS and len(data) >= tag + 24:
+                # 9-byte encoder string, 12 more bytes of tag, then delay and padding as 12 bits each
+                packed = int.from_bytes(data[tag + 21:tag + 24], "big")
+                trimmed = (packed >> 12) + (packed & 0xFFF)
+            return frames, trimmed
+    vbri = offset + 36
+    if data[vbri:vbri + 4] == b"VBRI":
+        return struct.unpack(">I", data[vbri + 14:vbri + 18])[0], 0
+    return None
+
+
+def mp3_duration(path: str) -> Optional[float]:
+    """
+    Duration of an MP3 read from its frame headers, without decoding audio:
+    the Xing/Info/VBRI frame count (less the LAME tag's delay and padding)
+    when the encoder wrote one, otherwise a walk over every frame header.
+    This is the length a decoder such as ffmpeg outputs. Returns None if
+    the file is not MPEG audio.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    offset = _skip_id3v2(data)
+    # Find the first sync word that is followed by a second valid frame
+    limit = min(len(data), offset + 64 * 1024)
+    first = None
+    while offset < limit:
+        first = _parse_frame_header(data, offset)
+        if first and first[0] > 0:
+            following = offset + first[0]
+            if following >= len(data) or _parse_frame_header(data, following):
+                break
+        first = None
+        offset += 1
+    if first is None:
+        return None
+
+    frame_length, samples, sample_rate, is_mpeg1, channel_mode = first
+    header = _vbr_header(data, offset, is_mpeg1, channel_mode)
+    if header is not None:
+        frames, trimmed = header
+        return max(0, frames * samples - trimmed) / sample_rate
+
+    total_samples = 0
+    while True:
+        frame = _parse_frame_header(data, offset)
+        if frame is None or frame[0] <= 0:
+            break
+        total_samples += frame[1]
+        offset += frame[0]
+    return total_samples / sample_rate if total_samples else None
+
+
+def wav_duration(path: str) -> Optional[float]:
+    try:
+        with wave.open(path, 'rb') as w:
+            return w.getnframes() / float(w.getframerate())
+    except (wave.Error, EOFError):
+        return None
+
+
+def audio_duration(path: str) -> Optional[float]:
+    """
+    Narration length for scene timing. MP3 and WAV are read from their
+    headers; anything else (e.g. system TTS output) falls back to ffmpeg.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        duration = wav_duration(path) if path.lower().endswith(".wav") else mp3_duration(path)
+    except (OSError, struct.error):
+        duration = None
+    return duration if duration is not None else probe_duration(path)
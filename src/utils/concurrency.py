@@ -0,0 +1,114 @@
+import contextvars
+import json
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+
+from src.variables import PROVIDER_CONCURRENCY, PROVIDER_RATE_LIMITS
+from src.utils.rate_limiter import TokenBucket
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+class ProviderLimits:
+    """
+    In-flight and rate limits of every provider: one semaphore and one token
+    bucket per provider, created on first use from `concurrency` and `rates`
+    (PROVIDER_CONCURRENCY / PROVIDER_RATE_LIMITS shape). Every engine holding
+    the same instance shares them, so visuals and audio running at the same
+    time never exceed a limit together.
+    """
+
+    def __init__(self, concurrency: Optional[Dict[str, int]] = None,
+                 rates: Optional[Dict[str, Dict]] = None):
+        self.concurrency = dict(PROVIDER_CONCURRENCY, **(concurrency or {}))
+        self.rates = dict(PROVIDER_RATE_LIMITS, **(rates or {}))
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    def semaphore(self, provider: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if provider not in self._semaphores:
+                limit = max(1, int(self.concurrency.get(provider, self.concurrency.get("default", 4))))
+                self._semaphores[provider] = threading.BoundedSemaphore(limit)
+            return self._semaphores[provider]
+
+    def bucket(self, provider: str) -> Optional[TokenBucket]:
+        """The provider's token bucket, or None if it is not rate limited."""
+        with self._lock:
+            if provider not in self._buckets:
+                settings = self.rates.get(provider)
+                self._buckets[provider] = (
+                    TokenBucket(settings["rate"], settings.get("burst", 1)) if settings else None
+                )
+            return self._buckets[provider]
+
+
+_limits: Dict[str, ProviderLimits] = {}
+_limits_lock = threading.Lock()
+
+
+def provider_limits(config: Optional[Dict[str, Any]] = None) -> ProviderLimits:
+    """
+    Limits for a pod config's optional "performance" section:
+
+        "performance": {
+            "visual_workers": 4,
+            "audio_workers": 3,
+            "providers": {
+                "imagen": {"concurrency": 4, "rate": 0.5, "burst": 2}
+            }
+        }
+
+    Configs with the same provider settings (e.g. every pod without the
+    section) get the same instance, so pipelines of different pods running
+    in one process never change each other's limits.
+    """
+    providers = (config or {}).get("performance", {}).get("providers", {})
+    concurrency = {name: int(settings["concurrency"])
+                   for name, settings in providers.items() if "concurrency" in settings}
+    rates = {name: {"rate": float(settings["rate"]), "burst": int(settings.get("burst", 1))}
+             for name, settings in providers.items() if "rate" in settings}
+    key = json.dumps([concurrency, rates], sort_keys=True)
+    with _limits_lock:
+        if key not in _limits:
+            _limits[key] = ProviderLimits(concurrency, rates)
+        return _limits[key]
+
+
+@contextmanager
+def provider_slot(provider: str, limits: Optional[ProviderLimits] = None):
+    """
+    Blocks until the provider has a free slot in `limits` (the default
+    limits when omitted).
+    """
+    semaphore = (limits or provider_limits()).semaphore(provider)
+    semaphore.acquire()
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+def submit_in_context(executor: Executor, fn: Callable[..., R], *args, **kwargs) -> Future:
+    """
+    Submits fn to a thread pool inside a copy of the caller's context, so
+    context-local state (such as the active run metrics) follows the work.
+    """
+    context = contextvars.copy_context()
+    return executor.submit(context.run, fn, *args, **kwargs)
+
+
+def map_ordered(fn: Callable[[int, T], R], items: Sequence[T], max_workers: int) -> List[R]:
+    """
+    Runs fn(index, item) for every item on a thread pool and returns the
+    results in the original order. The first exception is re-raised.
+    """
+    if max_workers <= 1 or len(items) <= 1:
+        return [fn(i, item) for i, item in enumerate(items)]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = [submit_in_context(executor, fn, i, item) for i, item in enumerate(items)]
+        return [future.result() for future in futures]
@@ -0,0 +1,48 @@
+import os
+import re
+import subprocess
+from typing import List, Optional
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def get_ffmpeg_binary() -> str:
+    """
+    ffmpeg executable: FFMPEG_BINARY env var, then the binary bundled with
+    imageio-ffmpeg (the one MoviePy already uses), then whatever is on PATH.
+    """
+    binary = os.getenv("FFMPEG_BINARY")
+    if binary:
+        return binary
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+
+def run_ffmpeg(args: List[str], quiet: bool = True) -> subprocess.CompletedProcess:
+    """Runs ffmpeg with the given arguments and raises with its stderr on failure."""
+    cmd = [get_ffmpeg_binary(), "-y", "-hide_banner"]
+    if quiet:
+        cmd += ["-loglevel", "error"]
+    result = subprocess.run(cmd + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise Exception(f"ffmpeg failed ({result.returncode}): {result.stderr.decode(errors='replace')[-2000:]}")
+    return result
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """
+    Reads the container duration from `ffmpeg -i` without decoding the
+    stream. Returns None if ffmpeg cannot tell.
+    """
+    result = subprocess.run(
+        [get_ffmpeg_binary(), "-hide_banner", "-i", path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    match = _DURATION_RE.search(result.stderr.decode(errors="replace"))
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
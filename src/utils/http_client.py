@@ -0,0 +1,224 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import (
+    RetryCallState,
+    Retrying,
+    retry_if_exception,
+    retry_if_result,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+from tenacity.wait import wait_base
+
+from src.utils.metrics import current_metrics
+from src.utils.concurrency import ProviderLimits, provider_limits
+from src.utils.rate_limiter import TokenBucket, parse_retry_after
+from src.variables import (
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_MAX_ATTEMPTS,
+    HTTP_BACKOFF_BASE,
+    HTTP_BACKOFF_MAX,
+    HTTP_POOL_PER_HOST,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SECONDS,
+)
+
+T = TypeVar("T")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed calls and rejects
+    every call for `reset_timeout` seconds. After that a single trial call
+    is let through; success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half_open" and self._trial_in_flight):
+                raise CircuitOpenError(f"Circuit for '{self.name}' is open")
+            if state == "half_open":
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.state != "open":
+                    print(f"[CIRCUIT] '{self.name}' abierto durante {self.reset_timeout:.0f}s tras {self.failures} fallos")
+                self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider)
+        return _breakers[provider]
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    # pool_block caps the open connections per host; extra threads wait for one
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=HTTP_POOL_PER_HOST, pool_block=True, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# One keep-alive session for every engine, so connections are reused across scenes and episodes
+_session = _build_session()
+
+
+def _retryable_exception(error: BaseException) -> bool:
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def _retryable_response(response: Any) -> bool:
+    return isinstance(response, requests.Response) and response.status_code in RETRY_STATUSES
+
+
+class _wait_retry_after(wait_base):
+    """Uses the server's Retry-After when present, otherwise the fallback wait."""
+
+    def __init__(self, fallback: wait_base):
+        self.fallback = fallback
+
+    def __call__(self, retry_state: RetryCallState) -> float:
+        outcome = retry_state.outcome
+        if outcome is not None and not outcome.failed:
+            response = outcome.result()
+            header = response.headers.get("Retry-After") if isinstance(response, requests.Response) else None
+            if header:
+                return min(parse_retry_after(header), HTTP_BACKOFF_MAX)
+        return self.fallback(retry_state)
+
+
+def _retrying(provider: str, bucket: Optional[TokenBucket], retry_on_result: Callable[[Any], bool],
+              retry_on_exception: Callable[[BaseException], bool]) -> Retrying:
+    metrics = current_metrics()
+
+    def before_sleep(retry_state: RetryCallState):
+        wait = retry_state.next_action.sleep if retry_state.next_action else 0
+        outcome = retry_state.outcome
+        reason = outcome.exception() if outcome.failed else f"HTTP {outcome.result().status_code}"
+        print(f"[RETRY] {provider}: {reason}. Reintento {retry_state.attempt_number}/{HTTP_MAX_ATTEMPTS - 1} en {wait:.1f}s...")
+        metrics.incr("retries", provider=provider)
+        if bucket and not outcome.failed and getattr(outcome.result(), "status_code", None) == 429:
+            # Every thread using the provider backs off, not only this one
+            bucket.pause(wait)
+        if not outcome.failed and isinstance(outcome.result(), requests.Response):
+            # A streamed response holds its pooled connection until closed
+            outcome.result().close()
+
+    return Retrying(
+        stop=stop_after_attempt(HTTP_MAX_ATTEMPTS),
+        wait=_wait_retry_after(wait_random_exponential(multiplier=HTTP_BACKOFF_BASE, max=HTTP_BACKOFF_MAX)),
+        retry=retry_if_exception(retry_on_exception) | retry_if_result(retry_on_result),
+        before_sleep=before_sleep,
+        retry_error_callback=lambda state: state.outcome.result(),
+        reraise=True,
+    )
+
+
+def request(provider: str, method: str, url: str, limits: Optional[ProviderLimits] = None,
+            **kwargs) -> requests.Response:
+    """
+    Sends a request through the shared pooled session:
+    - waits for the provider's rate-limit token before every attempt;
+    - applies default connect/read timeouts;
+    - retries connection errors, 429 and 5xx with exponential backoff and
+      jitter, honouring Retry-After;
+    - goes through the provider's circuit breaker, raising CircuitOpenError
+      without calling out while the provider keeps failing.
+    The last response is returned once retries run out, like requests does.
+    `limits` are the caller's provider limits (the default ones if omitted).
+    """
+    breaker = get_breaker(provider)
+    breaker.before_call()
+    bucket = (limits or provider_limits()).bucket(provider)
+    metrics = current_metrics()
+    kwargs.setdefault("timeout", (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+
+    def attempt() -> requests.Response:
+        if bucket:
+            bucket.acquire()
+        response = _session.request(method, url, **kwargs)
+        metrics.incr("api_calls", provider=provider, status=response.status_code)
+        if not kwargs.get("stream"):
+            try:
+                metrics.incr("bytes_downloaded", len(response.content), provider=provider)
+            except Exception:
+                response.close()
+                raise
+        return response
+
+    try:
+        response = _retrying(provider, bucket, _retryable_response, _retryable_exception)(attempt)
+    except Exception:
+        breaker.record_failure()
+        raise
+
+    if response.status_code in RETRY_STATUSES:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+def call_with_retries(provider: str, fn: Callable[[], T], retry_on: Callable[[BaseException], bool],
+                      limits: Optional[ProviderLimits] = None) -> T:
+    """
+    Same backoff and circuit breaker for SDK calls that do not go through
+    `request` (e.g. the Gemini client). `retry_on` picks retryable errors.
+    """
+    breaker = get_breaker(provider)
+    breaker.before_call()
+    bucket = (limits or provider_limits()).bucket(provider)
+    try:
+        result = _retrying(provider, bucket, lambda _: False, retry_on)(fn)
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return result
@@ -0,0 +1,175 @@
+import contextlib
+import json
+import os
+import re
+import sqlite3
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from src.variables import JOB_QUEUE_PATH, JOB_MAX_ATTEMPTS, JOB_STALE_SECONDS, WORKER_POD_CONCURRENCY
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+# Pods are folders under pods/, so a name is a single path component
+_POD_NAME = re.compile(r"[A-Za-z0-9_-]+")
+
+
+class JobQueue:
+    """
+    Persistent queue of episode jobs (pod, topic, options) shared by every
+    worker process on the machine. Claims run in IMMEDIATE transactions, so
+    SQLite's file lock makes them atomic across processes, and a job is only
+    handed out while its pod has fewer than `pod_concurrency` running jobs.
+
+    A failed job goes back to the queue until it has used `max_attempts`,
+    keeping its run_id so the retry resumes from the manifest and only
+    repeats the stages that did not finish. Running jobs whose worker stopped
+    sending heartbeats for `stale_seconds` are requeued the same way.
+    Heartbeats, completions and failures only apply while the job is still
+    running for the worker that reports them, so a worker whose job was
+    requeued and claimed by another cannot overwrite the new attempt.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, pod_concurrency: int = WORKER_POD_CONCURRENCY,
+                 max_attempts: int = JOB_MAX_ATTEMPTS, stale_seconds: float = JOB_STALE_SECONDS):
+        self.path = path
+        self.pod_concurrency = pod_concurrency
+        self.max_attempts = max_attempts
+        self.stale_seconds = stale_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, pod TEXT NOT NULL, topic TEXT NOT NULL, options TEXT NOT NULL, "
+                "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, "
+                "run_id TEXT, output TEXT, error TEXT, worker TEXT, "
+                "created REAL NOT NULL, started REAL, finished REAL, heartbeat REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["options"] = json.loads(job["options"])
+        return job
+
+    def enqueue(self, pod: str, topic: str, options: Optional[Dict[str, Any]] = None) -> str:
+        """Adds a job; raises ValueError unless `pod` is a plain folder name and `options` a dict."""
+        if not isinstance(pod, str) or not _POD_NAME.fullmatch(pod):
+            raise ValueError(f"invalid pod name: {pod!r}")
+        if not isinstance(topic, str) or not topic.strip():
+            raise ValueError("topic must be a non-empty string")
+        if options is not None and not isinstance(options, dict):
+            raise ValueError("options must be an object")
+        job_id = uuid.uuid4().hex[:12]
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, pod, topic, options, status, max_attempts, created) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, pod, topic, json.dumps(options or {}, ensure_ascii=False), self.max_attempts, time.time()),
+            )
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Marks the oldest runnable job as running for `worker` and returns it (None if nothing can run)."""
+        now = time.time()
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_stale(conn, now)
+                row = conn.execute(
+                    "SELECT * FROM jobs j WHERE status = 'queued' AND "
+                    "(SELECT COUNT(*) FROM jobs r WHERE r.pod = j.pod AND r.status = 'running') < ? "
+                    "ORDER BY created LIMIT 1",
+                    (self.pod_concurrency,),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, "
+                    "started = ?, heartbeat = ?, error = NULL WHERE id = ?",
+                    (worker, now, now, row["id"]),
+                )
+                job = self._to_dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return job
+
+    def _requeue_stale(self, conn: sqlite3.Connection, now: float):
+        stale = conn.execute(
+            "SELECT id, attempts, max_attempts FROM jobs WHERE status = 'running' AND heartbeat < ?",
+            (now - self.stale_seconds,),
+        ).fetchall()
+        for row in stale:
+            status = "queued" if row["attempts"] < row["max_attempts"] else "failed"
+            conn.execute("UPDATE jobs SET status = ?, error = 'worker stopped responding', finished = ? "
+                         "WHERE id = ?", (status, now if status == "failed" else None, row["id"]))
+
+    def heartbeat(self, job_id: str, worker: str):
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("UPDATE jobs SET heartbeat = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                         (time.time(), job_id, worker))
+
+    def set_run_id(self, job_id: str, run_id: str):
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("UPDATE jobs SET run_id = ? WHERE id = ?", (run_id, job_id))
+
+    def complete(self, job_id: str, worker: str, output: str) -> bool:
+        """Marks the job done; False if it is no longer running for `worker`."""
+        with contextlib.closing(self._connect()) as conn:
+            cursor = conn.execute("UPDATE jobs SET status = 'done', output = ?, finished = ? "
+                                  "WHERE id = ? AND worker = ? AND status = 'running'",
+                                  (output, time.time(), job_id, worker))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker: str, error: str, retry: bool = True) -> Optional[str]:
+        """
+        Requeues the job while it has attempts left (and `retry` is set);
+        returns the new status, or None if it is no longer running for `worker`.
+        """
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT attempts, max_attempts FROM jobs "
+                                   "WHERE id = ? AND worker = ? AND status = 'running'",
+                                   (job_id, worker)).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                status = "queued" if retry and row["attempts"] < row["max_attempts"] else "failed"
+                conn.execute("UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ?",
+                             (status, error, time.time() if status == "failed" else None, job_id))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return status
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with contextlib.closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        with contextlib.closing(self._connect()) as conn:
+            if status:
+                rows = conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY created DESC LIMIT ?",
+                                    (status, limit)).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with contextlib.closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        counts.update({status: n for status, n in rows})
+        return counts
@@ -1,45 +1,353 @@
+import contextlib
 import json
 import os
-from typing import List, Dict, Any
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import List, Dict, Any, Optional, Tuple
+
+from src.utils.metrics import current_metrics
+from src.variables import MEMORY_CONTEXT_EPISODES, MEMORY_RELEVANT_EPISODES, MEMORY_CONTEXT_TOKEN_BUDGET
+
+_EPISODES_FTS_SQL = [
+    "CREATE VIRTUAL TABLE episodes_fts USING fts5(title, summary, content='episodes', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER episodes_fts_insert AFTER INSERT ON episodes BEGIN "
+    "INSERT INTO episodes_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary); END",
+    "CREATE TRIGGER episodes_fts_delete AFTER DELETE ON episodes BEGIN "
+    "INSERT INTO episodes_fts (episodes_fts, rowid, title, summary) "
+    "VALUES ('delete', old.id, old.title, old.summary); END",
+    "INSERT INTO episodes_fts (episodes_fts) VALUES ('rebuild')",
+]
+
+# Spanish function words (accents stripped): they match nearly every episode and would
+# drown the topic's own words in BM25
+_STOPWORDS = frozenset("""
+    algo ante antes aqui asi aun cada como con contra cual cuando de del desde donde durante el ella ellas ellos
+    en entre era eran es esa esas ese eso esos esta estaba estan estar estas este esto estos fue fueron ha han
+    hasta hay la las le les lo los mas me mi mientras muy nada ni no nos o otra otras otro otros para pero poco
+    por porque que quien se sea ser si sin sobre son su sus tambien tan tanto te tiene tienen todo todos tras tu
+    un una unas uno unos y ya
+""".split())
+
+# Tries at creating the FTS5 indexes while another process holds the write lock
+_INDEX_ATTEMPTS = 3
+
+def _fold(word: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", word) if not unicodedata.combining(c))
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def _match_query(text: str) -> Optional[str]:
+    """FTS5 query matching any significant word of `text` (quoted, so no operators leak in)."""
+    words = dict.fromkeys(w for w in re.findall(r"\w+", text.lower()) if len(w) >= 3 and _fold(w) not in _STOPWORDS)
+    return " OR ".join(f'"{w}"' for w in words) or None
 
 class MemoryManager:
+    """
+    Episode memory of one pod, stored in `universe_memory.sqlite`. Episodes
+    are appended as rows (no rewrite of the history) and "last N" is a
+    primary-key range query. Writes run in IMMEDIATE transactions, so SQLite's
+    file locks serialize concurrent runs on the same pod without losing
+    episodes. Reads are cached in-process and invalidated by SQLite's
+    `PRAGMA data_version`, which changes on every commit from any other
+    connection or process (file mtimes can miss commits within one tick).
+
+    Episode titles/summaries and character states are also kept in FTS5
+    indexes (updated by triggers on every write), so the prompt context can
+    add the older episodes most relevant to a new topic, ranked by BM25,
+    without sending the whole history. Everything runs locally; if the
+    SQLite build lacks FTS5, context falls back to the latest episodes.
+
+    A pod that still has the old `universe_memory.json` is imported on first
+    use; the JSON file is left untouched.
+    """
+
     def __init__(self, pod_path: str):
-        self.memory_file = os.path.join(pod_path, "universe_memory.json")
+        self.legacy_file = os.path.join(pod_path, "universe_memory.json")
+        self.memory_file = os.path.join(pod_path, "universe_memory.sqlite")
+        self._lock = threading.Lock()
+        self._cache: Dict[Any, Any] = {}
+        self._cache_version: Optional[int] = None
+        self._watch: Optional[sqlite3.Connection] = None
+        self._fts = True
         self._ensure_memory_exists()
 
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        return sqlite3.connect(self.memory_file, timeout=30, isolation_level=None)
+
+    def _data_version(self) -> int:
+        """Changes whenever any other connection commits; the watcher itself never writes. Needs `_lock`."""
+        if self._watch is None:
+            self._watch = sqlite3.connect(self.memory_file, timeout=30, isolation_level=None,
+                                          check_same_thread=False)
+        return self._watch.execute("PRAGMA data_version").fetchone()[0]
+
+    def __enter__(self) -> "MemoryManager":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Closes the `data_version` watcher; the next read opens it again."""
+        with self._lock:
+            if self._watch is not None:
+                self._watch.close()
+                self._watch = None
+            self._cache_version = None
+
     def _ensure_memory_exists(self):
-        if not os.path.exists(self.memory_file):
-            initial_state = {
-                "episodes": [],
-                "current_state": {
-                    "characters": {}
-                }
-            }
-            self.save_memory(initial_state)
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS episodes ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, summary TEXT, "
+                "data TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._create_search_index(conn)
+            self._migrate_legacy(conn)
+
+    def _create_search_index(self, conn: sqlite3.Connection):
+        for attempt in range(1, _INDEX_ATTEMPTS + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'episodes_fts'").fetchone()
+                if not exists:
+                    for sql in _EPISODES_FTS_SQL:
+                        conn.execute(sql)
+                    conn.execute("CREATE VIRTUAL TABLE characters_fts USING fts5(name, state, "
+                                 "tokenize='unicode61 remove_diacritics 2')")
+                    self._index_characters(conn, self._read_state(conn))
+                conn.execute("COMMIT")
+                return
+            except sqlite3.OperationalError as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                message = str(e).lower()
+                if "no such module: fts5" in message:
+                    print(f"[MEMORY] Búsqueda FTS5 no disponible, se usan solo los últimos episodios: {e}")
+                    self._fts = False
+                    return
+                # Another process holding the write lock past the busy timeout: try again
+                if ("locked" not in message and "busy" not in message) or attempt == _INDEX_ATTEMPTS:
+                    raise
+                print(f"[MEMORY] Base de datos bloqueada al crear el índice FTS5, reintentando ({attempt}/{_INDEX_ATTEMPTS})")
+                time.sleep(attempt)
+
+    def _migrate_legacy(self, conn: sqlite3.Connection):
+        if not os.path.exists(self.legacy_file):
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the lock
+            if conn.execute("SELECT 1 FROM state WHERE key = 'migrated_from_json'").fetchone():
+                conn.execute("COMMIT")
+                return
+            with open(self.legacy_file, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+            episodes = legacy.get("episodes", [])
+            self._insert_episodes(conn, episodes)
+            self._write_state(conn, legacy.get("current_state", {"characters": {}}))
+            conn.execute("INSERT INTO state (key, value) VALUES ('migrated_from_json', ?)",
+                         (json.dumps(time.time()),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        print(f"[MEMORY] {len(episodes)} episodios migrados de {os.path.basename(self.legacy_file)}")
+
+    @staticmethod
+    def _insert_episodes(conn: sqlite3.Connection, episodes: List[Dict[str, Any]]):
+        now = time.time()
+        conn.executemany(
+            "INSERT INTO episodes (title, summary, data, created) VALUES (?, ?, ?, ?)",
+            [(ep.get("title"), ep.get("summary"), json.dumps(ep, ensure_ascii=False), now) for ep in episodes],
+        )
+
+    @staticmethod
+    def _read_state(conn: sqlite3.Connection) -> Dict[str, Any]:
+        row = conn.execute("SELECT value FROM state WHERE key = 'current_state'").fetchone()
+        return json.loads(row[0]) if row else {"characters": {}}
+
+    def _write_state(self, conn: sqlite3.Connection, current_state: Dict[str, Any],
+                     changed: Optional[List[str]] = None):
+        conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('current_state', ?)",
+                     (json.dumps(current_state, ensure_ascii=False),))
+        if self._fts:
+            self._index_characters(conn, current_state, changed)
+
+    @staticmethod
+    def _index_characters(conn: sqlite3.Connection, current_state: Dict[str, Any],
+                          names: Optional[List[str]] = None):
+        """Rewrites the FTS rows of `names` (default: every character) from `current_state`."""
+        characters = current_state.get("characters", {})
+        if names is None:
+            conn.execute("DELETE FROM characters_fts")
+        else:
+            conn.executemany("DELETE FROM characters_fts WHERE name = ?", [(name,) for name in names])
+        conn.executemany(
+            "INSERT INTO characters_fts (name, state) VALUES (?, ?)",
+            [(name, json.dumps(characters[name], ensure_ascii=False))
+             for name in (characters if names is None else names) if name in characters],
+        )
+
+    def _cached(self, key: Any, read):
+        """Returns read(conn), reusing the last result until the database changes."""
+        with self._lock:
+            version = self._data_version()
+            if version != self._cache_version:
+                self._cache = {}
+                self._cache_version = version
+            if key in self._cache:
+                return self._cache[key]
+        with contextlib.closing(self._connect()) as conn:
+            value = read(conn)
+        with self._lock:
+            # Not cached if a commit landed while reading
+            if version == self._cache_version == self._data_version():
+                self._cache[key] = value
+        return value
+
+    def _invalidate(self):
+        with self._lock:
+            self._cache = {}
+            self._cache_version = None
+
+    def _recent_rows(self, n: int) -> List[Tuple[int, Dict[str, Any]]]:
+        def read(conn):
+            rows = conn.execute("SELECT id, data FROM episodes ORDER BY id DESC LIMIT ?", (n,)).fetchall()
+            return [(episode_id, json.loads(data)) for episode_id, data in reversed(rows)]
+        return self._cached(("recent", n), read)
+
+    def recent_episodes(self, n: int) -> List[Dict[str, Any]]:
+        """The last `n` episodes, oldest first."""
+        return [ep for _, ep in self._recent_rows(n)]
+
+    def search_episodes(self, text: str, k: int, exclude: Tuple[int, ...] = ()) -> List[Tuple[int, Dict[str, Any]]]:
+        """Up to `k` (episode number, episode) pairs most relevant to `text`, best first (BM25)."""
+        query = _match_query(text)
+        if not self._fts or not query:
+            return []
+        def read(conn):
+            rows = conn.execute(
+                "SELECT e.id, e.data FROM episodes_fts JOIN episodes e ON e.id = episodes_fts.rowid "
+                "WHERE episodes_fts MATCH ? ORDER BY bm25(episodes_fts) LIMIT ?",
+                (query, k + len(exclude)),
+            ).fetchall()
+            return [(episode_id, json.loads(data)) for episode_id, data in rows]
+        found = self._cached(("search", query, k + len(exclude)), read)
+        return [row for row in found if row[0] not in exclude][:k]
+
+    def search_characters(self, text: str) -> Dict[str, Any]:
+        """Character states whose name or state matches `text`, best first."""
+        query = _match_query(text)
+        if not self._fts or not query:
+            return {}
+        def read(conn):
+            rows = conn.execute(
+                "SELECT name, state FROM characters_fts WHERE characters_fts MATCH ? ORDER BY bm25(characters_fts)",
+                (query,),
+            ).fetchall()
+            return {name: json.loads(state) for name, state in rows}
+        return self._cached(("characters", query), read)
+
+    def episode_count(self) -> int:
+        return self._cached("count", lambda conn: conn.execute("SELECT COUNT(*) FROM episodes").fetchone()[0])
+
+    def current_state(self) -> Dict[str, Any]:
+        return self._cached("state", self._read_state)
 
     def load_memory(self) -> Dict[str, Any]:
-        with open(self.memory_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """The whole memory in the original JSON layout."""
+        def read(conn):
+            rows = conn.execute("SELECT data FROM episodes ORDER BY id").fetchall()
+            return [json.loads(data) for (data,) in rows]
+        return {"episodes": self._cached("all", read), "current_state": self.current_state()}
 
     def save_memory(self, data: Dict[str, Any]):
-        with open(self.memory_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        """Replaces the whole memory (episodes and state) with `data`."""
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM episodes")
+                # Episode numbers restart from 1 for the new history
+                conn.execute("DELETE FROM sqlite_sequence WHERE name = 'episodes'")
+                self._insert_episodes(conn, data.get("episodes", []))
+                self._write_state(conn, data.get("current_state", {"characters": {}}))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        self._invalidate()
 
     def add_episode(self, episode_summary: Dict[str, Any]):
-        memory = self.load_memory()
-        memory["episodes"].append(episode_summary)
-        # Keep only last 10 episodes in full detail to save context window if needed, 
-        # though Gemini 3 Pro has a huge window.
-        self.save_memory(memory)
-
-    def get_context_summary(self) -> str:
-        memory = self.load_memory()
-        episodes = memory.get("episodes", [])
-        if not episodes:
+        """
+        Appends an episode. Its optional "characters" ({name: {field: value}})
+        are merged into the current character states in the same transaction,
+        and only those characters' search rows are rewritten.
+        """
+        current_metrics().incr("memory_writes")
+        updates = episode_summary.get("characters") or {}
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._insert_episodes(conn, [episode_summary])
+                if updates:
+                    current_state = self._read_state(conn)
+                    characters = current_state.setdefault("characters", {})
+                    for name, changes in updates.items():
+                        characters[name] = {**characters.get(name, {}), **changes}
+                    self._write_state(conn, current_state, changed=list(updates))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        self._invalidate()
+
+    def get_context_summary(self, topic: Optional[str] = None) -> str:
+        """
+        Prompt context for a new episode, within MEMORY_CONTEXT_TOKEN_BUDGET:
+        the latest episodes for continuity, then the older episodes and the
+        character states that best match `topic`. Episodes are listed in
+        chronological order with their number in the series.
+        """
+        recent = self._recent_rows(MEMORY_CONTEXT_EPISODES)
+        if not recent:
             return "Este es el primer episodio. No hay historia previa."
-        
+
+        # Candidates in priority order: newest first, then best BM25 match first
+        candidates = list(reversed(recent))
+        characters: Dict[str, Any] = {}
+        if topic:
+            candidates += self.search_episodes(topic, MEMORY_RELEVANT_EPISODES,
+                                               exclude=tuple(episode_id for episode_id, _ in recent))
+            characters = self.search_characters(topic)
+
+        budget = MEMORY_CONTEXT_TOKEN_BUDGET
+        selected = {}
+        for episode_id, ep in candidates:
+            line = f"- Episodio {episode_id}: {ep.get('summary', 'Sin resumen')}\n"
+            if _estimate_tokens(line) > budget:
+                break
+            budget -= _estimate_tokens(line)
+            selected[episode_id] = line
+
         context = "Resumen de episodios anteriores:\n"
-        for i, ep in enumerate(episodes[-5:]): # Last 5 episodes context
-            context += f"- Episodio {i+1}: {ep.get('summary', 'Sin resumen')}\n"
-        
+        context += "".join(selected[episode_id] for episode_id in sorted(selected))
+
+        character_lines = []
+        for name, state in characters.items():
+            line = f"- {name}: {json.dumps(state, ensure_ascii=False)}\n"
+            if _estimate_tokens(line) > budget:
+                break
+            budget -= _estimate_tokens(line)
+            character_lines.append(line)
+        if character_lines:
+            context += "Estado de los personajes:\n" + "".join(character_lines)
+
         return context
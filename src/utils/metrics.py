@@ -0,0 +1,162 @@
+import contextvars
+import json
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape_label(value: Any) -> str:
+    """Label value escaped for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RunMetrics:
+    """
+    Thread-safe metrics of one pipeline run: wall time per stage and per
+    scene, counters (API calls, retries, bytes downloaded, cache hits...)
+    with optional labels, and gauges (render fps, durations...).
+    """
+
+    def __init__(self, run_id: Optional[str] = None, pod: Optional[str] = None):
+        self.run_id = run_id
+        self.pod = pod
+        self.started = time.time()
+        self.stages: Dict[str, float] = {}
+        self.scenes: Dict[str, Dict[int, float]] = {}
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    @contextmanager
+    def scene(self, stage: str, index: int):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.scenes.setdefault(stage, {})[index] = elapsed
+
+    def incr(self, name: str, value: float = 1, **labels: Any):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def counter_total(self, name: str) -> float:
+        with self._lock:
+            return sum(self.counters.get(name, {}).values())
+
+    @staticmethod
+    def process_peak_memory_mb() -> float:
+        """
+        Peak RSS of this process and of finished children (ffmpeg) since the
+        process started. In batch and worker mode it covers every earlier
+        run as well, so it is reported as a process figure, not a run one.
+        """
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        return round(max(own, children) / 1024, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "pod": self.pod,
+                "started": self.started,
+                "wall_time_seconds": round(time.time() - self.started, 3),
+                "stages": {k: round(v, 3) for k, v in self.stages.items()},
+                "scenes": {
+                    stage: {str(i): round(t, 3) for i, t in sorted(times.items())}
+                    for stage, times in self.scenes.items()
+                },
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self.counters.items()
+                },
+                "gauges": dict(self.gauges),
+                "process_peak_memory_mb": self.process_peak_memory_mb(),
+            }
+
+    def write_json(self, path: str) -> str:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=4, ensure_ascii=False)
+        return path
+
+    def to_prometheus(self, prefix: str = "videocreator") -> str:
+        """Prometheus text exposition format (also valid OpenMetrics without the EOF marker)."""
+        base = {"pod": self.pod or "", "run_id": self.run_id or ""}
+
+        def fmt(labels: Dict[str, str]) -> str:
+            inner = ",".join(f'{k}="{_escape_label(v)}"' for k, v in sorted(labels.items()))
+            return "{" + inner + "}"
+
+        data = self.to_dict()
+        lines = [f"# TYPE {prefix}_stage_seconds gauge"]
+        for stage, seconds in data["stages"].items():
+            lines.append(f"{prefix}_stage_seconds{fmt(dict(base, stage=stage))} {seconds}")
+        lines.append(f"# TYPE {prefix}_scene_seconds gauge")
+        for stage, times in data["scenes"].items():
+            for index, seconds in times.items():
+                lines.append(f"{prefix}_scene_seconds{fmt(dict(base, stage=stage, scene=index))} {seconds}")
+        for name, series in data["counters"].items():
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for entry in series:
+                lines.append(f"{prefix}_{name}_total{fmt(dict(base, **entry['labels']))} {entry['value']}")
+        for name, value in data["gauges"].items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name}{fmt(base)} {value}")
+        lines.append(f"# TYPE {prefix}_process_peak_memory_mb gauge")
+        lines.append(f"{prefix}_process_peak_memory_mb{fmt(base)} {data['process_peak_memory_mb']}")
+        return "\n".join(lines) + "\n"
+
+    def write_reports(self, video_path: str, prometheus: bool = False) -> str:
+        """Writes `<video>.metrics.json` (and `.prom`) next to the output video."""
+        base, _ = os.path.splitext(video_path)
+        json_path = self.write_json(f"{base}.metrics.json")
+        if prometheus:
+            with open(f"{base}.prom", 'w', encoding='utf-8') as f:
+                f.write(self.to_prometheus())
+        return json_path
+
+
+# Metrics of code running outside any run (engine __main__ blocks, scripts)
+_default_metrics = RunMetrics()
+_current: contextvars.ContextVar = contextvars.ContextVar("current_metrics", default=None)
+
+
+def current_metrics() -> RunMetrics:
+    """Metrics of the run active in this context (thread pools copy it along)."""
+    return _current.get() or _default_metrics
+
+
+@contextmanager
+def activate(metrics: RunMetrics):
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
@@ -0,0 +1,97 @@
+"""
+Placeholder payloads of the size a real provider returns: images of
+Imagen's pixel size for the aspect ratio and narration as long as the text
+takes to say. The engines' mock modes write these instead of calling a
+provider, and the HTTP stand-ins in src.utils.standins answer with them.
+"""
+import hashlib
+import io
+import subprocess
+from functools import lru_cache
+from typing import Dict, Tuple
+
+from src.utils.ffmpeg import get_ffmpeg_binary
+from src.variables import MOCK_SPEECH_CHARS_PER_SECOND
+
+# Output size of Imagen 3 for each aspect ratio it accepts
+IMAGEN_SIZES: Dict[str, Tuple[int, int]] = {
+    "1:1": (1024, 1024),
+    "16:9": (1408, 768),
+    "9:16": (768, 1408),
+    "4:3": (1280, 896),
+    "3:4": (896, 1280),
+}
+
+
+def imagen_size(aspect_ratio: str) -> Tuple[int, int]:
+    return IMAGEN_SIZES.get(aspect_ratio, IMAGEN_SIZES["16:9"])
+
+
+def speech_seconds(text: str) -> float:
+    """How long a narrator takes to say `text` (at least one second)."""
+    return round(max(1.0, len(text) / MOCK_SPEECH_CHARS_PER_SECOND), 1)
+
+
+@lru_cache(maxsize=4)
+def _label_font(size: int):
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype("DejaVuSans-Bold.ttf", size)
+    except OSError:
+        return ImageFont.load_default(size)
+
+
+def placeholder_image(width: int, height: int, label: str = "", index: int = 0):
+    """
+    Gradient with a grid on it, tinted by `index`: like a real image, it
+    visibly moves under the Ken Burns zoom and compresses like one.
+    `label` is written on it (wrapped to the width).
+    """
+    from PIL import Image, ImageDraw
+    tint = (90 + index * 50 % 120, 140 - index * 30 % 80, 60 + index * 70 % 150)
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    img = Image.blend(img, Image.new('RGB', (width, height), color=tint), 0.6)
+    draw = ImageDraw.Draw(img)
+    for x in range(0, width, 64):
+        draw.line([(x, 0), (x, height)], fill=(40, 70, 30), width=3)
+    for y in range(0, height, 64):
+        draw.line([(0, y), (width, y)], fill=(40, 70, 30), width=3)
+    if label:
+        size = max(12, height // 18)
+        font = _label_font(size)
+        lines, line = [], ""
+        for word in label.split():
+            if line and draw.textlength(f"{line} {word}", font=font) > width * 0.85:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}".strip()
+        lines.append(line)
+        draw.multiline_text((width * 0.075, height * 0.3), "\n".join(lines[:6]), font=font, fill=(255, 255, 255),
+                            stroke_width=max(1, size // 12), stroke_fill=(0, 0, 0))
+    return img
+
+
+def placeholder_png(width: int, height: int, label: str = "", index: int = 0) -> bytes:
+    buffer = io.BytesIO()
+    placeholder_image(width, height, label, index).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=64)
+def placeholder_mp3(seconds: float, voice: str = "") -> bytes:
+    """
+    MP3 of a tone pulsing at a syllable-like rate, encoded by the bundled
+    ffmpeg (no system TTS needed). The pitch depends on `voice`, so each
+    character sounds different.
+    """
+    pitch = 160 + int(hashlib.sha256(voice.encode()).hexdigest(), 16) % 120
+    result = subprocess.run(
+        [get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-f", "lavfi",
+         "-i", f"sine=frequency={pitch}:duration={seconds}:sample_rate=44100",
+         "-af", "tremolo=f=4:d=0.7,volume=3", "-ac", "1", "-q:a", "6", "-f", "mp3", "pipe:1"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    if result.returncode != 0:
+        raise Exception(f"ffmpeg failed ({result.returncode}): {result.stderr.decode(errors='replace')[-500:]}")
+    return result.stdout
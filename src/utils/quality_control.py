@@ -0,0 +1,265 @@
+import re
+import subprocess
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from src.utils.audio_probe import audio_duration
+from src.utils.ffmpeg import get_ffmpeg_binary, probe_duration, run_ffmpeg
+from src.variables import (
+    QC_MIN_AUDIO_SECONDS,
+    QC_SILENCE_DBFS,
+    QC_BLACK_LUMA,
+    QC_VIDEO_SAMPLES,
+    QC_FROZEN_OFFSET,
+    QC_FROZEN_DIFF,
+    QC_MAX_BLACK_FRACTION,
+    QC_MAX_FROZEN_FRACTION,
+    QC_MAX_AV_DRIFT
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Nothing here decodes a whole video: images are checked on a reduced copy,
+# narration is decoded once at 8 kHz mono, and the rendered video is only
+# sampled at a few seeked positions (plus a stream-copy pass for durations).
+# NumPy and Pillow are imported by the checks themselves, so the pipeline can
+# import QualityCheckError without loading them.
+
+_IMAGE_SIGNATURES = {b"\x89PNG\r\n\x1a\n": "png", b"\xff\xd8\xff": "jpeg", b"GIF8": "gif"}
+_TIME_RE = re.compile(r"time=\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+_AUDIO_RATE = 8000
+_THUMB_SIZE = (160, 90)
+
+
+class QualityCheckError(Exception):
+    """Raised when a QC report has errors and the pod gates on QC."""
+
+    def __init__(self, report: Dict[str, Any]):
+        self.report = report
+        errors = [issue for issue in report["issues"] if issue["severity"] == "error"]
+        super().__init__(f"QC '{report['stage']}' failed: " + "; ".join(_describe(issue) for issue in errors[:5]))
+
+
+def _describe(issue: Dict[str, Any]) -> str:
+    scene = f"scene {issue['scene'] + 1}: " if issue.get("scene") is not None else ""
+    return f"{scene}{issue['check']} ({issue['detail']})"
+
+
+def _issue(check: str, detail: str, severity: str = "error", scene: Optional[int] = None,
+           path: Optional[str] = None) -> Dict[str, Any]:
+    return {"check": check, "severity": severity, "scene": scene, "path": path, "detail": detail}
+
+
+def sniff_format(path: str) -> Optional[str]:
+    """Container/codec family from the file's first bytes (None if unrecognized)."""
+    with open(path, 'rb') as f:
+        head = f.read(16)
+    for signature, name in _IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return name
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"FORM" and head[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if head[:4] in (b"OggS", b"fLaC"):
+        return "ogg" if head[:4] == b"OggS" else "flac"
+    return None
+
+
+def check_image(path: str, scene: Optional[int] = None) -> Tuple[List[Dict], Dict[str, Any]]:
+    """Magic bytes, decodability and a black/blank test on a reduced copy."""
+    from PIL import Image, ImageStat
+    fmt = sniff_format(path)
+    if fmt not in ("png", "jpeg", "webp", "gif"):
+        return [_issue("magic_bytes", f"not an image ({fmt or 'unknown'})", scene=scene, path=path)], {}
+    try:
+        with Image.open(path) as img:
+            size = img.size
+            # JPEG decodes straight at 1/8 scale; other formats are reduced after loading
+            img.draft("RGB", (size[0] // 8, size[1] // 8))
+            thumb = img.convert("L")
+            thumb.thumbnail(_THUMB_SIZE)
+    except Exception as e:
+        return [_issue("decode", str(e), scene=scene, path=path)], {}
+
+    stat = ImageStat.Stat(thumb)
+    stats = {"format": fmt, "size": list(size), "luma": round(stat.mean[0], 1), "contrast": round(stat.stddev[0], 1)}
+    issues = []
+    if stat.mean[0] < QC_BLACK_LUMA:
+        issues.append(_issue("black_image", f"mean luma {stat.mean[0]:.1f}", scene=scene, path=path))
+    elif stat.stddev[0] < 2:
+        issues.append(_issue("blank_image", f"uniform colour (stddev {stat.stddev[0]:.1f})", "warning", scene, path))
+    return issues, stats
+
+
+def decode_audio(path: str, rate: int = _AUDIO_RATE, stream: str = "0:a:0") -> "np.ndarray":
+    """Mono float samples in [-1, 1] at `rate` Hz, decoded by ffmpeg in one pass."""
+    import numpy as np
+    result = run_ffmpeg(["-i", path, "-map", stream, "-ac", "1", "-ar", str(rate), "-f", "s16le", "pipe:1"])
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768
+
+
+def loudness(samples: "np.ndarray", rate: int = _AUDIO_RATE, window: float = 0.05) -> Dict[str, float]:
+    """Overall RMS level (dBFS), peak and the share of 50 ms windows above QC_SILENCE_DBFS."""
+    import numpy as np
+    if samples.size == 0:
+        return {"rms_dbfs": -120.0, "peak": 0.0, "active": 0.0}
+    size = max(1, int(rate * window))
+    windows = samples[:samples.size // size * size].reshape(-1, size) if samples.size >= size else samples[None, :]
+    window_rms = np.sqrt(np.mean(windows ** 2, axis=1))
+    rms = float(np.sqrt(np.mean(samples ** 2)))
+    threshold = 10 ** (QC_SILENCE_DBFS / 20)
+    return {
+        "rms_dbfs": round(20 * np.log10(max(rms, 1e-6)), 1),
+        "peak": round(float(np.max(np.abs(samples))), 3),
+        "active": round(float(np.mean(window_rms > threshold)), 3),
+    }
+
+
+def check_audio(path: str, scene: Optional[int] = None) -> Tuple[List[Dict], Dict[str, Any]]:
+    """Magic bytes, header duration, decodability and loudness of a narration file."""
+    fmt = sniff_format(path)
+    if fmt not in ("mp3", "wav", "aiff", "ogg", "flac"):
+        return [_issue("magic_bytes", f"not audio ({fmt or 'unknown'})", scene=scene, path=path)], {}
+    duration = audio_duration(path)
+    if duration is None or duration < QC_MIN_AUDIO_SECONDS:
+        return [_issue("duration", f"{duration or 0:.2f}s < {QC_MIN_AUDIO_SECONDS}s", scene=scene, path=path)], {}
+    try:
+        level = loudness(decode_audio(path))
+    except Exception as e:
+        return [_issue("decode", str(e)[-200:], scene=scene, path=path)], {}
+
+    stats = {"format": fmt, "duration": round(duration, 3), **level}
+    issues = []
+    if level["rms_dbfs"] < QC_SILENCE_DBFS:
+        issues.append(_issue("silence", f"{level['rms_dbfs']} dBFS", scene=scene, path=path))
+    elif level["peak"] >= 0.999:
+        issues.append(_issue("clipping", f"peak {level['peak']}", "warning", scene, path))
+    return issues, stats
+
+
+def check_assets(script: Dict, visual_paths: List[str], audio_paths: Dict[int, str],
+                 language_tracks: Optional[Dict[str, Dict[int, str]]] = None) -> Dict[str, Any]:
+    """Pre-render report over every scene image and narration (extra languages included)."""
+    issues, scenes = [], []
+    for i, scene in enumerate(script["scenes"]):
+        image_issues, image_stats = check_image(visual_paths[i], i)
+        issues += image_issues
+        entry = {"image": image_stats}
+        if scene.get("audio_text"):
+            if i not in audio_paths:
+                issues.append(_issue("missing_audio", "scene has audio_text but no narration", scene=i))
+            else:
+                audio_issues, entry["audio"] = check_audio(audio_paths[i], i)
+                issues += audio_issues
+        for language, paths in (language_tracks or {}).items():
+            if i in paths:
+                audio_issues, entry[f"audio_{language}"] = check_audio(paths[i], i)
+                issues += [{**issue, "language": language} for issue in audio_issues]
+        scenes.append(entry)
+    return _report("assets", issues, {"scenes": scenes})
+
+
+def stream_durations(path: str) -> Dict[str, Optional[float]]:
+    """End time of the first video and audio streams, read by stream-copying them (no decode)."""
+    durations = {}
+    for kind, drop in (("video", ["-an"]), ("audio", ["-vn"])):
+        proc = subprocess.run([get_ffmpeg_binary(), "-hide_banner", "-nostdin", "-i", path, *drop, "-sn", "-dn",
+                               "-c", "copy", "-f", "null", "-"], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        matches = _TIME_RE.findall(proc.stderr.decode(errors="replace")) if proc.returncode == 0 else []
+        durations[kind] = (int(matches[-1][0]) * 3600 + int(matches[-1][1]) * 60 + float(matches[-1][2])
+                           if matches else None)
+    return durations
+
+
+def sample_frame_pairs(path: str, starts: List[float], offset: float,
+                       size: Tuple[int, int] = _THUMB_SIZE) -> "np.ndarray":
+    """
+    Grayscale thumbnails of the frame at each start time and of the first
+    frame `offset` seconds later, from a single ffmpeg call. Every sample is
+    its own seeked input, so only the stretch from the nearest keyframe to
+    the second frame is decoded (without loop filter or non-reference frames,
+    which is plenty for luma statistics). Returns shape (pairs, 2, height, width).
+    """
+    import numpy as np
+    args, filters = [], []
+    for n, t in enumerate(starts):
+        args += ["-skip_loop_filter", "all", "-skip_frame", "noref", "-ss", f"{t:.3f}", "-i", path]
+        filters.append(f"[{n}:v]setpts=PTS-STARTPTS,select='eq(n\\,0)+gte(t\\,{offset})',trim=end_frame=2,"
+                       f"scale={size[0]}:{size[1]},format=gray[f{n}]")
+    filters.append(f"{''.join(f'[f{n}]' for n in range(len(starts)))}concat=n={len(starts)}:v=1:a=0[out]")
+    result = run_ffmpeg(args + ["-filter_complex", ";".join(filters), "-map", "[out]", "-fps_mode", "passthrough",
+                                "-f", "rawvideo", "-pix_fmt", "gray", "pipe:1"])
+    pair_bytes = 2 * size[0] * size[1]
+    count = len(result.stdout) // pair_bytes
+    return np.frombuffer(result.stdout[:count * pair_bytes], dtype=np.uint8).reshape(count, 2, size[1], size[0])
+
+
+def check_video(path: str, samples: int = QC_VIDEO_SAMPLES) -> Dict[str, Any]:
+    """
+    Post-render report: container magic, sampled black and frozen frames
+    (frame pairs QC_FROZEN_OFFSET apart), A/V drift between the streams and
+    the loudness of the soundtrack.
+    """
+    import numpy as np
+    if sniff_format(path) != "mp4":
+        return _report("video", [_issue("magic_bytes", "not an MP4 file", path=path)], {})
+    duration = probe_duration(path)
+    if not duration:
+        return _report("video", [_issue("decode", "no duration in container", path=path)], {})
+
+    issues = []
+    # Spread evenly, keeping every second frame of a pair inside the video
+    starts = [min(duration * (n + 0.5) / samples, max(0.0, duration - QC_FROZEN_OFFSET - 0.2))
+              for n in range(samples)]
+    try:
+        pairs = sample_frame_pairs(path, starts, QC_FROZEN_OFFSET).astype(np.int16)
+    except Exception as e:
+        return _report("video", [_issue("decode", str(e)[-200:], path=path)], {"duration": duration})
+    if len(pairs) < samples:
+        issues.append(_issue("decode", f"only {len(pairs)}/{samples} sampled frames decoded", path=path))
+    luma = pairs[:, 0].mean(axis=(1, 2))
+    change = np.abs(pairs[:, 0] - pairs[:, 1]).mean(axis=(1, 2))
+    black = float(np.mean(luma < QC_BLACK_LUMA)) if len(pairs) else 0.0
+    frozen = float(np.mean(change < QC_FROZEN_DIFF)) if len(pairs) else 0.0
+    if black > QC_MAX_BLACK_FRACTION:
+        issues.append(_issue("black_frames", f"{black:.0%} of samples are black", path=path))
+    if frozen > QC_MAX_FROZEN_FRACTION:
+        issues.append(_issue("frozen_frames", f"{frozen:.0%} of samples do not move", path=path))
+
+    streams = stream_durations(path)
+    drift = None
+    if streams["audio"] is None:
+        issues.append(_issue("audio_stream", "video has no audio track", path=path))
+    elif streams["video"] is not None:
+        drift = round(abs(streams["video"] - streams["audio"]), 3)
+        if drift > QC_MAX_AV_DRIFT:
+            issues.append(_issue("av_drift", f"audio and video differ by {drift:.2f}s", path=path))
+
+    level = None
+    if streams["audio"] is not None:
+        level = loudness(decode_audio(path))
+        if level["rms_dbfs"] < QC_SILENCE_DBFS:
+            issues.append(_issue("silence", f"soundtrack at {level['rms_dbfs']} dBFS", path=path))
+
+    return _report("video", issues, {
+        "duration": duration,
+        "streams": streams,
+        "av_drift": drift,
+        "black_fraction": round(black, 3),
+        "frozen_fraction": round(frozen, 3),
+        "sample_luma": [round(float(v), 1) for v in luma],
+        "sample_motion": [round(float(v), 2) for v in change],
+        "audio": level,
+    })
+
+
+def _report(stage: str, issues: List[Dict], stats: Dict[str, Any]) -> Dict[str, Any]:
+    return {"stage": stage, "passed": not any(issue["severity"] == "error" for issue in issues),
+            "issues": issues, "stats": stats}
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+STAGES = ("script", "visuals", "audio", "assembly", "memory")
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RunManifest:
+    """
+    Checkpoint file of a single pipeline run, stored at
+    `pods/<pod>/runs/<run_id>/manifest.json`. Every stage records its output
+    (script JSON, asset paths and checksums) so `--resume <run_id>` can skip
+    the stages and scenes that already finished.
+    """
+
+    def __init__(self, path: str, data: Dict[str, Any]):
+        self.path = path
+        self.data = data
+        self._lock = threading.Lock()
+
+    @property
+    def run_id(self) -> str:
+        return self.data["run_id"]
+
+    @staticmethod
+    def _manifest_path(pod_dir: str, run_id: str) -> str:
+        return os.path.join(pod_dir, "runs", run_id, "manifest.json")
+
+    @classmethod
+    def create(cls, pod_dir: str, topic: str) -> "RunManifest":
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        manifest = cls(cls._manifest_path(pod_dir, run_id), {
+            "run_id": run_id,
+            "pod": os.path.basename(os.path.normpath(pod_dir)),
+            "topic": topic,
+            "created": time.time(),
+            "stages": {}
+        })
+        manifest.save()
+        return manifest
+
+    @classmethod
+    def load(cls, pod_dir: str, run_id: str) -> "RunManifest":
+        path = cls._manifest_path(pod_dir, run_id)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No manifest found for run '{run_id}' at {path}")
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(path, json.load(f))
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _stage(self, stage: str) -> Dict[str, Any]:
+        return self.data["stages"].setdefault(stage, {"status": "pending"})
+
+    def is_done(self, stage: str) -> bool:
+        return self.data["stages"].get(stage, {}).get("status") == "done"
+
+    def mark_done(self, stage: str, **outputs: Any):
+        with self._lock:
+            entry = self._stage(stage)
+            entry.update(outputs)
+            entry["status"] = "done"
+            entry["finished"] = time.time()
+            self.save()
+
+    def get(self, stage: str, key: str, default: Any = None) -> Any:
+        return self.data["stages"].get(stage, {}).get(key, default)
+
+    def record_asset(self, stage: str, index: int, path: str):
+        """Checkpoints one finished scene asset together with its checksum."""
+        checksum = file_sha256(path)
+        with self._lock:
+            self._stage(stage).setdefault("assets", {})[str(index)] = {"path": path, "sha256": checksum}
+            self.save()
+
+    def discard_asset(self, stage: str, index: int):
+        """Forgets one scene asset so the next run of the stage generates it again."""
+        with self._lock:
+            entry = self._stage(stage)
+            entry.get("assets", {}).pop(str(index), None)
+            entry["status"] = "pending"
+            self.save()
+
+    def completed_assets(self, stage: str) -> Dict[int, str]:
+        """
+        Scene assets of a stage that still exist on disk with the recorded
+        checksum. Anything missing or modified is regenerated.
+        """
+        completed = {}
+        for index, entry in self.data["stages"].get(stage, {}).get("assets", {}).items():
+            path = entry["path"]
+            if os.path.exists(path) and file_sha256(path) == entry["sha256"]:
+                completed[int(index)] = path
+        return completed
+
+    def verified_output(self, stage: str) -> Optional[str]:
+        """Output file of a finished stage, if it is unchanged on disk."""
+        if not self.is_done(stage):
+            return None
+        path = self.get(stage, "path")
+        if path and os.path.exists(path) and file_sha256(path) == self.get(stage, "sha256"):
+            return path
+        return None
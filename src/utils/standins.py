@@ -0,0 +1,252 @@
+"""
+Local, Linux-native stand-ins for the content providers: an HTTP server
+answering like Gemini, Imagen, SJinn and ElevenLabs with the payloads of
+src.utils.placeholders. The engines are pointed at it through
+GEMINI_API_ENDPOINT, GOOGLE_API_BASE, ELEVENLABS_API_BASE and SJINN_API_BASE,
+so load tests and benchmarks go through the same SDK/HTTP/decode code as
+production, with no network. Each provider has a configurable latency,
+jitter and error rate.
+
+    python -m src.utils.standins --port 8780 --latency-scale 0.1
+"""
+import base64
+import json
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+import zlib
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from src.utils.placeholders import imagen_size, placeholder_mp3, placeholder_png, speech_seconds
+
+DEFAULT_PROFILE: Dict[str, Any] = {
+    "scenes": 10,
+    # Pixel size of every image; None answers with the size Imagen gives the requested aspect ratio
+    "image_size": None,
+    # Length of every narration; None makes it as long as the text takes to say
+    "audio_seconds": None,
+    "providers": {
+        "gemini": {"latency": 2.0, "jitter": 0.5, "error_rate": 0.0},
+        "imagen": {"latency": 3.0, "jitter": 1.0, "error_rate": 0.0},
+        "sjinn": {"latency": 5.0, "jitter": 2.0, "error_rate": 0.0},
+        "elevenlabs": {"latency": 1.0, "jitter": 0.3, "error_rate": 0.0},
+    },
+    # Status returned on a simulated error (429 exercises the Retry-After path)
+    "error_status": 429,
+    "retry_after": 0.2,
+}
+
+
+def merge_profile(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    profile = json.loads(json.dumps(DEFAULT_PROFILE))
+    for key, value in (overrides or {}).items():
+        if key == "providers":
+            for provider, settings in value.items():
+                profile["providers"].setdefault(provider, {}).update(settings)
+        else:
+            profile[key] = value
+    return profile
+
+
+@lru_cache(maxsize=8)
+def _placeholder_png_cached(width: int, height: int) -> bytes:
+    return placeholder_png(width, height)
+
+
+def _with_png_nonce(png: bytes, nonce: str) -> bytes:
+    """Inserts a tEXt chunk before IEND so every response has a unique hash."""
+    data = b"nonce\x00" + nonce.encode()
+    chunk = struct.pack(">I", len(data)) + b"tEXt" + data + struct.pack(">I", zlib.crc32(b"tEXt" + data) & 0xffffffff)
+    return png[:-12] + chunk + png[-12:]
+
+
+def _with_mp3_nonce(mp3: bytes, nonce: str) -> bytes:
+    """Appends an ID3v1 tag carrying the nonce (ignored by decoders)."""
+    tag = b"TAG" + nonce.encode()[:30].ljust(30, b"\x00") + b"\x00" * 94 + b"\xff"
+    return mp3 + tag
+
+
+class StandInServer:
+    """Threaded HTTP server answering like the real providers."""
+
+    def __init__(self, profile: Optional[Dict[str, Any]] = None, host: str = "127.0.0.1", port: int = 0):
+        self.profile = merge_profile(profile)
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def env(self) -> Dict[str, str]:
+        """Environment variables that route every engine to this server."""
+        return {
+            "GOOGLE_API_KEY": "standin",
+            "ELEVENLABS_API_KEY": "standin",
+            "SJINN_API_KEY": "standin",
+            "GEMINI_API_ENDPOINT": self.url,
+            "GOOGLE_API_BASE": self.url,
+            "ELEVENLABS_API_BASE": self.url,
+            "SJINN_API_BASE": self.url,
+        }
+
+    # --- responses ---
+
+    def _image(self, aspect_ratio: str = "16:9") -> bytes:
+        """PNG of the profile's size, or of Imagen's size for the aspect ratio."""
+        width, height = self.profile["image_size"] or imagen_size(aspect_ratio)
+        return _placeholder_png_cached(width, height)
+
+    def _narration(self, request_body: bytes, voice: str) -> bytes:
+        try:
+            text = json.loads(request_body or b"{}").get("text", "")
+        except ValueError:
+            text = ""
+        return placeholder_mp3(self.profile["audio_seconds"] or speech_seconds(text), voice)
+
+    def _script(self) -> Dict[str, Any]:
+        token = uuid.uuid4().hex[:8]
+        characters = ["Tico", "Narrator"]
+        return {
+            "title": f"Episodio de prueba {token}",
+            "summary": f"Tico vive una aventura de prueba ({token}).",
+            "scenes": [
+                {
+                    "visual_prompt": f"Tico en el bosque, escena {i+1}, variante {token}",
+                    "audio_text": f"Esta es la escena {i+1} del episodio {token}.",
+                    "character": characters[i % len(characters)],
+                    "duration_est": self.profile["audio_seconds"] or speech_seconds(
+                        f"Esta es la escena {i+1} del episodio {token}."),
+                }
+                for i in range(self.profile["scenes"])
+            ],
+        }
+
+    @staticmethod
+    def _translation(request_body: bytes) -> Optional[Dict[str, Any]]:
+        """Answer to a narration translation prompt (see ScriptGenerator.translate_narration), else None."""
+        try:
+            contents = json.loads(request_body or b"{}").get("contents", [])
+            prompt = contents[0]["parts"][0]["text"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            return None
+        if '"translations"' not in prompt:
+            return None
+        languages = re.findall(r'"([\w-]+)": \["\.\.\."\]', prompt)
+        texts = re.search(r"TEXTOS \(JSON\):\s*(\[.*?\])\s*FORMATO", prompt, re.S)
+        texts = json.loads(texts.group(1)) if texts else []
+        return {"translations": {lang: [f"[{lang}] {text}" for text in texts] for lang in languages}}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _simulate(self, provider: str) -> bool:
+                """Sleeps for the provider latency; returns False after sending a simulated error."""
+                settings = server.profile["providers"].get(provider, {})
+                with server._lock:
+                    server.requests[provider] = server.requests.get(provider, 0) + 1
+                delay = settings.get("latency", 0) + random.uniform(-1, 1) * settings.get("jitter", 0)
+                time.sleep(max(0.0, delay))
+                if random.random() < settings.get("error_rate", 0):
+                    status = server.profile["error_status"]
+                    body = json.dumps({"error": {"code": status, "message": "simulated error"}}).encode()
+                    self._send(status, body, "application/json", {"Retry-After": str(server.profile["retry_after"])})
+                    return False
+                return True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request_body = self.rfile.read(length)
+                path = self.path.split("?")[0]
+                nonce = uuid.uuid4().hex
+
+                if path.endswith(":generateContent"):
+                    if self._simulate("gemini"):
+                        translation = server._translation(request_body)
+                        text = json.dumps(translation or server._script(), ensure_ascii=False)
+                        body = {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}]}
+                        self._send(200, json.dumps(body).encode(), "application/json")
+                elif path.endswith(":predict"):
+                    if self._simulate("imagen"):
+                        try:
+                            aspect_ratio = json.loads(request_body)["parameters"]["aspectRatio"]
+                        except (ValueError, KeyError, TypeError):
+                            aspect_ratio = "1:1"
+                        png = base64.b64encode(_with_png_nonce(server._image(aspect_ratio), nonce)).decode()
+                        body = {"predictions": [{"bytesBase64Encoded": png, "mimeType": "image/png"}]}
+                        self._send(200, json.dumps(body).encode(), "application/json")
+                elif path.startswith("/v1/text-to-speech/"):
+                    if self._simulate("elevenlabs"):
+                        voice = path[len("/v1/text-to-speech/"):].split("/")[0]
+                        self._send(200, _with_mp3_nonce(server._narration(request_body, voice), nonce), "audio/mpeg")
+                elif path.startswith("/v1/generate"):
+                    if self._simulate("sjinn"):
+                        self._send(200, _with_png_nonce(server._image(), nonce), "image/png")
+                else:
+                    self._send(404, b'{"error": "not found"}', "application/json")
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the provider stand-ins until Ctrl+C")
+    parser.add_argument("--port", type=int, default=8780)
+    parser.add_argument("--profile", type=str, help="JSON file overriding DEFAULT_PROFILE")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplies every provider latency")
+    parser.add_argument("--error-rate", type=float, help="Error rate applied to every provider")
+    args = parser.parse_args()
+
+    overrides = None
+    if args.profile:
+        with open(args.profile, 'r', encoding='utf-8') as f:
+            overrides = json.load(f)
+    server = StandInServer(overrides, port=args.port)
+    for settings in server.profile["providers"].values():
+        settings["latency"] *= args.latency_scale
+        settings["jitter"] *= args.latency_scale
+        if args.error_rate is not None:
+            settings["error_rate"] = args.error_rate
+    server.start()
+    print(f"Stand-ins escuchando en {server.url}. Exporta:")
+    for key, value in server.env().items():
+        print(f"  export {key}={value}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
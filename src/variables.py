@@ -4,6 +4,17 @@ import os
 # Model to use for script generation. 
 # Options: 'gemini-1.5-pro', 'gemini-3-pro-preview', 'gemini-pro'
 GEMINI_MODEL_NAME = "gemini-3-pro-preview"
+# Extra Gemini calls allowed to repair a script that is not valid JSON or misses required fields
+SCRIPT_REPAIR_ATTEMPTS = 2
+# The static per-pod prompt (system prompt, characters, output format) is sent as the
+# system instruction; when it is at least this long (estimated tokens) it is also stored
+# with Gemini context caching, which rejects smaller prefixes. Short pods stay below it
+# (kids_story is ~300 tokens) and pay no cache storage; long system prompts or
+# character bibles get the cached-token discount
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = 4096
+GEMINI_CONTEXT_CACHE_TTL_SECONDS = 3600
+# After a failed cache creation the full prompt is sent for this long before trying again
+GEMINI_CONTEXT_CACHE_RETRY_SECONDS = 600
 
 # --- AUDIO / TTS ---
 # Default Voice ID (Adam) if none is specified in character config
@@ -17,16 +28,214 @@ ELEVENLABS_MODEL_ID = "eleven_multilingual_v2"
 # Voice settings
 ELEVENLABS_STABILITY = 0.5
 ELEVENLABS_SIMILARITY_BOOST = 0.75
+ELEVENLABS_STYLE = 0.0
+# Narration is streamed to disk in chunks of this size while ElevenLabs is still sending it
+AUDIO_STREAM_CHUNK_BYTES = 64 * 1024
+# Extra narration languages are set per pod: "extra_languages": ["en-US", "pt-BR"].
+# Scene length when narrations differ: "longest" (every track fits; shorter ones end in
+# silence) or "primary" (follows the pod's own language; other tracks are cut to it)
+LANGUAGE_DURATION_POLICY = "longest"
+# "tracks": one MP4 with an audio track per language; "files": one extra MP4 per language.
+# The video stream is encoded once and stream-copied either way
+LANGUAGE_OUTPUT = "tracks"
+
+# Speaking rate of mock narration: mock MP3s last as long as their text takes to say
+MOCK_SPEECH_CHARS_PER_SECOND = 15
 
 # --- VISUALS ---
 # Fallback mock mode if API Key is missing or for testing
 MOCK_VISUALS_ENABLED = True 
 # Set to True to attempt using Gemini/Imagen for mock images (if available)
 GEMINI_MOCK_IMAGES = True 
+# Imagen model used by the Google image path
+IMAGEN_MODEL_NAME = "imagen-3.0-generate-001"
+IMAGEN_ASPECT_RATIO = "16:9"
 # Image Generation Model (when we implement real API)
 SJINN_MODEL_QUALITY = "quality"
+# Art style put in front of every image prompt, unless the pod sets "consistency":
+# {"style_prompt": "..."} (or an "art_style_lora" name, which is used as the style text)
+VISUAL_STYLE_PROMPT = "Cartoon style, 3d pixar style"
+
+# --- VISUAL LIBRARY ---
+# Per-pod library of generated images (pods/<pod>/library/), reused across episodes.
+# Pods can override with "library": {"enabled": false, "prompt_similarity": 0.9}
+LIBRARY_ENABLED = True
+# A scene reuses a stored image when its prompt shares this fraction of significant
+# words (Jaccard index) with the prompt of that image, for the same character and style
+LIBRARY_PROMPT_SIMILARITY = 0.8
+
+# --- PROVIDER ENDPOINTS ---
+# Overridable through env vars so benchmarks/CI can point the engines at local stand-ins
+GOOGLE_API_BASE = os.getenv("GOOGLE_API_BASE", "https://generativelanguage.googleapis.com")
+# When set, Gemini is called over REST at this endpoint instead of the SDK default
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+ELEVENLABS_API_BASE = os.getenv("ELEVENLABS_API_BASE", "https://api.elevenlabs.io")
+SJINN_API_BASE = os.getenv("SJINN_API_BASE", "https://api.sjinn.ai")
+
+# --- HTTP ---
+# (connect, read) timeouts in seconds for every provider request
+HTTP_CONNECT_TIMEOUT = 10
+HTTP_READ_TIMEOUT = 120
+# Attempts per request (first try included) on connection errors, 429 and 5xx
+HTTP_MAX_ATTEMPTS = 4
+# Exponential backoff with full jitter: up to HTTP_BACKOFF_BASE * 2^n seconds, capped
+HTTP_BACKOFF_BASE = 1.0
+HTTP_BACKOFF_MAX = 30.0
+# Keep-alive connections kept open per host
+HTTP_POOL_PER_HOST = 16
+# Consecutive failed requests that open a provider's circuit, and how long it stays open
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_SECONDS = 60
+
+# --- CONCURRENCY ---
+# Max in-flight requests per provider, shared by every engine in the process.
+# A pod's "performance" section overrides them for that pod's engines only.
+PROVIDER_CONCURRENCY = {
+    "imagen": 4,
+    "sjinn": 2,
+    "elevenlabs": 3,
+    "mock": 8,
+    "default": 4,
+}
+# Token-bucket rate per provider: `rate` requests/second with bursts of `burst`.
+# Providers missing here are not rate limited.
+PROVIDER_RATE_LIMITS = {
+    "imagen": {"rate": 0.5, "burst": 2},
+    "sjinn": {"rate": 0.5, "burst": 1},
+    "elevenlabs": {"rate": 2.0, "burst": 3},
+}
+# Worker threads used by each engine to fan out scenes
+VISUAL_MAX_WORKERS = 4
+AUDIO_MAX_WORKERS = 4
+
+# --- MEMORY ---
+# Latest episodes always included in the script prompt, for continuity
+MEMORY_CONTEXT_EPISODES = 5
+# Older episodes added when they match the new topic (BM25 over titles and summaries)
+MEMORY_RELEVANT_EPISODES = 5
+# Upper bound (estimated tokens) for the memory part of the prompt
+MEMORY_CONTEXT_TOKEN_BUDGET = 1000
+
+# --- CACHE ---
+# Content-addressed cache of generated images/narration, shared by all pods
+ASSET_CACHE_DIR = os.getenv(
+    "ASSET_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "assets"),
+)
+# Least recently used assets are evicted above this size
+ASSET_CACHE_MAX_BYTES = 2 * 1024 ** 3
+# Rendered per-scene segments of the "segments" video backend, keyed by input hash
+SEGMENT_CACHE_DIR = os.getenv("SEGMENT_CACHE_DIR", os.path.join(os.path.dirname(ASSET_CACHE_DIR), "segments"))
+# Least recently used segments are deleted above this size, after each episode is joined
+SEGMENT_CACHE_MAX_BYTES = 4 * 1024 ** 3
+# Finished runs whose images and narration (pods/<pod>/assets/<run_id>/) are kept, newest first,
+# so they can still be re-rendered with another profile. Older finished runs lose their assets.
+RUN_ASSETS_KEEP = 3
+
+# Validated scripts keyed by pod config, memory context, topic and model, so a retried or
+# re-rendered episode does not call Gemini again
+SCRIPT_CACHE_DIR = os.getenv("SCRIPT_CACHE_DIR", os.path.join(os.path.dirname(ASSET_CACHE_DIR), "scripts"))
+# Rasterized caption images used to burn subtitles in, keyed by text and style
+SUBTITLE_CACHE_DIR = os.getenv("SUBTITLE_CACHE_DIR", os.path.join(os.path.dirname(ASSET_CACHE_DIR), "subtitles"))
+
+# --- WORKERS ---
+# Job queue shared by every worker process (python -m src.worker)
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join(os.path.dirname(ASSET_CACHE_DIR), "jobs.sqlite"))
+# Worker processes started by `python -m src.worker work`
+WORKER_PROCESSES = 2
+# Jobs of the same pod running at once (1 keeps episodes and memory in order)
+WORKER_POD_CONCURRENCY = 1
+# Attempts per job; retries resume the run and only repeat unfinished stages
+JOB_MAX_ATTEMPTS = 3
+# Idle workers check the queue this often
+WORKER_POLL_SECONDS = 2.0
+# Running jobs without a heartbeat for this long are requeued (crashed worker)
+JOB_STALE_SECONDS = 600
+# Port of the HTTP job endpoint (`python -m src.worker serve`), e.g. for n8n webhooks
+JOB_SERVER_PORT = 8765
 
 # --- VIDEO ---
+# Render backend: "moviepy" (per-frame Python), "ffmpeg" (single filter-graph render),
+# "segments" (one ffmpeg process per scene, joined by stream copy) or "stream"
+# (frames generated one scene at a time and piped to ffmpeg; memory independent of length)
+VIDEO_BACKEND = "moviepy"
 VIDEO_FPS = 24
+# Every scene image is scaled to this height before the Ken Burns zoom
+VIDEO_HEIGHT = 720
+# Frame width that caption size and margin are designed for (they scale with the frame)
+VIDEO_WIDTH = 1280
+# Ken Burns zoom-in speed (fraction of the frame per second)
+KEN_BURNS_ZOOM_PER_SECOND = 0.05
+# Per-frame resampling of the Python Ken Burns engine ("stream" and "moviepy" backends).
+# benchmarks/ken_burns_fps.py at 1280x720, speed and mean pixel difference (0-255) from
+# MoviePy's per-frame LANCZOS resize: "bilinear" 1.7x, 0.92; "nearest" 4x, 1.09 (fine
+# detail shimmers slightly while zooming); "lanczos" 1.0x, 0.88
+KEN_BURNS_RESAMPLE = "bilinear"
+# Worker processes of the "segments" backend (None = one per core)
+RENDER_WORKERS = None
+# Silence added after each scene's narration
+SCENE_AUDIO_PADDING = 0.5
 VIDEO_CODEC = "libx264"
 AUDIO_CODEC = "aac"
+
+# --- RENDER PROFILES ---
+# Encode settings by name. A pod picks one with "render": {"profile": "preview"} (or
+# `--profile` on the CLI) and can override single values per profile:
+# "render": {"profiles": {"final": {"crf": 18}}}. "width": None keeps the frame as wide as
+# the widest scene; a fixed width center-crops every scene to it (vertical Shorts).
+# "two_pass" encodes twice with x264 at "video_bitrate" instead of constant quality (CRF);
+# the "stream" backend generates its frames twice, "moviepy" ignores it.
+RENDER_PROFILES = {
+    # Quick look for QC: a quarter of the pixels, half the frames, fastest x264 preset
+    "preview": {"height": 360, "width": None, "fps": 12, "preset": "ultrafast", "crf": 32,
+                "audio_bitrate": "64k", "two_pass": False, "video_bitrate": None},
+    "final": {"height": VIDEO_HEIGHT, "width": None, "fps": VIDEO_FPS, "preset": "medium", "crf": 20,
+              "audio_bitrate": "160k", "two_pass": False, "video_bitrate": "2500k"},
+    # 9:16 for YouTube Shorts / Reels / TikTok
+    "shorts": {"height": 1920, "width": 1080, "fps": 30, "preset": "medium", "crf": 21,
+               "audio_bitrate": "160k", "two_pass": False, "video_bitrate": "6M"},
+}
+DEFAULT_RENDER_PROFILE = "final"
+# x264 threads per encoder (0 = x264 decides). The "segments" backend runs one encoder per scene,
+# so a low value there avoids oversubscribing the cores
+RENDER_THREADS = 0
+
+# --- SUBTITLES ---
+# Sidecar files written next to every video. Pods can override these with
+# "subtitles": {"formats": ["srt"], "burn": true}
+SUBTITLE_FORMATS = ["srt", "vtt"]
+# Also draw the captions into the video, during the same encode
+SUBTITLES_BURN_IN = False
+# A cue never holds more than this many words or characters (one line on screen)
+SUBTITLE_MAX_WORDS = 8
+SUBTITLE_MAX_CHARS = 42
+# Font file or name (looked up in the system font folders) and size in pixels
+SUBTITLE_FONT = os.getenv("SUBTITLE_FONT", "DejaVuSans-Bold.ttf")
+SUBTITLE_FONT_SIZE = 40
+# Distance from the bottom of the frame to the captions, in pixels
+SUBTITLE_MARGIN = 48
+
+# --- QUALITY CONTROL ---
+# Cheap checks on every scene asset before the render and on the rendered video after it
+# (see src/utils/quality_control.py). Reports are written to pods/<pod>/runs/<run_id>/qc.json.
+# Pods can override with "qc": {"enabled": false} or "qc": {"gate": true}
+QC_ENABLED = True
+# False only reports failures (qc.json, metrics and a console line). True stops the run:
+# rejected assets are regenerated on resume, and a rejected video is moved to
+# runs/<run_id>/rejected_<name>.mp4 and rendered again on resume
+QC_GATE = False
+# Narration shorter than this, or quieter than QC_SILENCE_DBFS (RMS), is rejected
+QC_MIN_AUDIO_SECONDS = 0.3
+QC_SILENCE_DBFS = -50.0
+# Frames sampled from the rendered video, spread evenly over its length
+QC_VIDEO_SAMPLES = 12
+# Mean luma (0-255) under which an image or a sampled frame counts as black
+QC_BLACK_LUMA = 16
+QC_MAX_BLACK_FRACTION = 0.25
+# A sample is frozen when the frame QC_FROZEN_OFFSET seconds later differs by less than
+# QC_FROZEN_DIFF (mean absolute luma difference on a 160x90 thumbnail)
+QC_FROZEN_OFFSET = 0.5
+QC_FROZEN_DIFF = 0.15
+QC_MAX_FROZEN_FRACTION = 0.5
+# Largest accepted difference between the audio and video stream lengths, in seconds
+QC_MAX_AV_DRIFT = 0.2
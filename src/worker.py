@@ -0,0 +1,276 @@
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Process
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from dotenv import load_dotenv
+
+from src.utils.job_queue import JobQueue, JOB_STATUSES
+from src.utils.quality_control import QualityCheckError
+from src.variables import WORKER_PROCESSES, WORKER_POLL_SECONDS, JOB_STALE_SECONDS, JOB_SERVER_PORT
+
+# Load env vars
+load_dotenv()
+
+
+class Worker:
+    """
+    Long-running consumer of the job queue. A pod's pipeline (config,
+    engines, model clients) is built on its first job and reused for every
+    later one, so interpreter startup and heavy imports are paid once per
+    worker process instead of once per video.
+    """
+
+    def __init__(self, queue: JobQueue, name: Optional[str] = None, project_root: Optional[str] = None):
+        self.queue = queue
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.project_root = project_root
+        self.pipelines: Dict[str, Any] = {}
+
+    def _pipeline(self, pod: str, profile: Optional[str] = None):
+        key = f"{pod}:{profile}" if profile else pod
+        if key not in self.pipelines:
+            # Imported here so enqueue/status/serve never load the engines
+            from src.pipeline import PodPipeline
+            self.pipelines[key] = PodPipeline(pod, render_profile=profile,
+                                              **({"project_root": self.project_root} if self.project_root else {}))
+        return self.pipelines[key]
+
+    def run_job(self, job: Dict[str, Any]) -> str:
+        from src.main import run_stages
+        from src.utils.metrics import activate
+
+        pipeline = self._pipeline(job["pod"], job["options"].get("profile"))
+        if job["run_id"]:
+            manifest = pipeline.load_manifest(job["run_id"])
+            print(f"🔁 [{self.name}] Reintento {job['attempts']}/{job['max_attempts']} de {job['id']} "
+                  f"(run_id: {manifest.run_id})")
+        else:
+            manifest = pipeline.new_manifest(job["topic"])
+            self.queue.set_run_id(job["id"], manifest.run_id)
+            print(f"🚀 [{self.name}] Job {job['id']} | Pod: {job['pod']} | Tema: {job['topic']}")
+
+        metrics = pipeline.new_metrics(manifest)
+        try:
+            with activate(metrics):
+                final_video_path = run_stages(pipeline, manifest, job["topic"])
+        except Exception:
+            pipeline.abandon_run(manifest.run_id)
+            raise
+        if not final_video_path:
+            raise Exception("Script generation returned no script")
+        metrics.write_reports(final_video_path, prometheus=job["options"].get("prometheus", False))
+        return final_video_path
+
+    def _heartbeat(self, job_id: str, stop: threading.Event):
+        while not stop.wait(JOB_STALE_SECONDS / 4):
+            self.queue.heartbeat(job_id, self.name)
+
+    def process_one(self) -> bool:
+        """Runs the next runnable job, if any. Returns False when nothing could be claimed."""
+        job = self.queue.claim(self.name)
+        if job is None:
+            return False
+
+        stop = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job["id"], stop), daemon=True).start()
+        try:
+            try:
+                self._pipeline(job["pod"], job["options"].get("profile"))
+            except (FileNotFoundError, ValueError) as e:
+                # Unknown pod or render profile: retrying cannot help
+                self.queue.fail(job["id"], self.name, str(e), retry=False)
+                print(f"❌ [{self.name}] Job {job['id']}: {e}")
+                return True
+            output = self.run_job(job)
+            if self.queue.complete(job["id"], self.name, output):
+                print(f"✅ [{self.name}] Job {job['id']} completado: {output}")
+            else:
+                print(f"⚠️ [{self.name}] Job {job['id']} terminado, pero ya lo había retomado otro worker: {output}")
+        except QualityCheckError as e:
+            # Rejected assets were dropped and are generated again on retry; a rejected render is not
+            retry = e.report["stage"] == "assets"
+            status = self.queue.fail(job["id"], self.name, str(e), retry=retry)
+            print(f"❌ [{self.name}] Job {job['id']} {self._fail_action(status)}: {e}")
+        except Exception as e:
+            status = self.queue.fail(job["id"], self.name, str(e))
+            print(f"❌ [{self.name}] Job {job['id']} {self._fail_action(status)}: {e}")
+            traceback.print_exc()
+        finally:
+            stop.set()
+        return True
+
+    @staticmethod
+    def _fail_action(status: Optional[str]) -> str:
+        if status is None:
+            return "ya retomado por otro worker"
+        return "reencolado" if status == "queued" else "fallido"
+
+    def serve_forever(self, drain: bool = False):
+        """Consumes jobs until interrupted (or, with `drain`, until nothing is runnable)."""
+        print(f"👷 Worker {self.name} esperando jobs en {self.queue.path}")
+        try:
+            while True:
+                if not self.process_one():
+                    if drain:
+                        return
+                    time.sleep(WORKER_POLL_SECONDS)
+        finally:
+            self.close()
+
+    def close(self):
+        for pipeline in self.pipelines.values():
+            pipeline.close()
+
+
+def _worker_main(queue_path: str, drain: bool):
+    Worker(JobQueue(queue_path)).serve_forever(drain=drain)
+
+
+def start_workers(queue_path: str, processes: int, drain: bool = False) -> List[Process]:
+    workers = [Process(target=_worker_main, args=(queue_path, drain), daemon=False) for _ in range(processes)]
+    for proc in workers:
+        proc.start()
+    return workers
+
+
+def make_job_server(queue: JobQueue, host: str = "127.0.0.1", port: int = JOB_SERVER_PORT) -> ThreadingHTTPServer:
+    """
+    Small JSON endpoint so n8n (or any webhook) can submit and poll jobs:
+      POST /jobs {"pod", "topic", "options"} -> 201 {"id": ...}
+      GET  /jobs[?status=queued]  GET /jobs/<id>  GET /health
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, payload: Any):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/jobs":
+                return self._send(404, {"error": "not found"})
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                pod, topic = payload["pod"], payload["topic"]
+            except (ValueError, KeyError, TypeError):
+                return self._send(400, {"error": "expected JSON with 'pod' and 'topic'"})
+            try:
+                job_id = queue.enqueue(pod, topic, payload.get("options"))
+            except ValueError as e:
+                return self._send(400, {"error": str(e)})
+            self._send(201, {"id": job_id, "status": "queued"})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            if parts == ["health"]:
+                return self._send(200, queue.counts())
+            if parts == ["jobs"]:
+                status = parse_qs(url.query).get("status", [None])[0]
+                return self._send(200, queue.list(status))
+            if len(parts) == 2 and parts[0] == "jobs":
+                job = queue.get(parts[1])
+                return self._send(200, job) if job else self._send(404, {"error": "unknown job"})
+            self._send(404, {"error": "not found"})
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def print_jobs(jobs: List[Dict[str, Any]]):
+    print(f"{'id':<14}{'pod':<14}{'estado':<9}{'intentos':>9}  tema / resultado")
+    for job in jobs:
+        detail = job["output"] or job["error"] or job["topic"]
+        print(f"{job['id']:<14}{job['pod']:<14}{job['status']:<9}{job['attempts']:>5}/{job['max_attempts']:<3}  {detail}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI Video Creator - Job queue and workers")
+    parser.add_argument("--queue", type=str, help="Queue database (default: JOB_QUEUE_PATH)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = sub.add_parser("enqueue", help="Add jobs to the queue")
+    enqueue.add_argument("--pod", type=str, default="kids_story", help="Pod name (folder in pods/)")
+    enqueue.add_argument("--topic", type=str, help="Topic for the video")
+    enqueue.add_argument("--topics", type=str, help="Topics file (.txt or .jsonl, same format as src.batch)")
+    enqueue.add_argument("--prometheus", action="store_true", help="Also write a Prometheus dump of each run")
+    enqueue.add_argument("--profile", type=str, help="Render profile (default: the pod's)")
+
+    status = sub.add_parser("status", help="Show jobs")
+    status.add_argument("job_id", nargs="?", help="Show a single job")
+    status.add_argument("--status", choices=JOB_STATUSES, help="Only jobs in this state")
+
+    work = sub.add_parser("work", help="Run worker processes")
+    work.add_argument("--workers", type=int, default=WORKER_PROCESSES, help="Worker processes")
+    work.add_argument("--drain", action="store_true", help="Exit once no job can be claimed")
+
+    serve = sub.add_parser("serve", help="HTTP endpoint for job submission (n8n webhooks)")
+    serve.add_argument("--host", type=str, default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=JOB_SERVER_PORT)
+    serve.add_argument("--workers", type=int, default=0, help="Also start this many worker processes")
+    args = parser.parse_args()
+
+    queue = JobQueue(args.queue) if args.queue else JobQueue()
+
+    if args.command == "enqueue":
+        if args.topics:
+            from src.batch import load_jobs
+            jobs = load_jobs(args.topics, [args.pod])
+        else:
+            jobs = [{"pod": args.pod, "topic": args.topic or "Tico aprende a compartir sus juguetes"}]
+        options = {"prometheus": True} if args.prometheus else {}
+        if args.profile:
+            options["profile"] = args.profile
+        for job in jobs:
+            job_id = queue.enqueue(job["pod"], job["topic"], options)
+            print(f"📥 {job_id}  {job['pod']}: {job['topic']}")
+
+    elif args.command == "status":
+        if args.job_id:
+            job = queue.get(args.job_id)
+            print(json.dumps(job, indent=2, ensure_ascii=False) if job else f"Job desconocido: {args.job_id}")
+        else:
+            print_jobs(queue.list(args.status))
+            print("\n" + "  ".join(f"{k}: {v}" for k, v in queue.counts().items()))
+
+    elif args.command == "work":
+        if args.workers <= 1:
+            Worker(queue).serve_forever(drain=args.drain)
+        else:
+            procs = start_workers(queue.path, args.workers, drain=args.drain)
+            try:
+                for proc in procs:
+                    proc.join()
+            except KeyboardInterrupt:
+                for proc in procs:
+                    proc.terminate()
+
+    elif args.command == "serve":
+        procs = start_workers(queue.path, args.workers) if args.workers else []
+        server = make_job_server(queue, args.host, args.port)
+        print(f"🌐 Endpoint de jobs en http://{args.host}:{args.port}/jobs ({len(procs)} workers)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            for proc in procs:
+                proc.terminate()
+
+
+if __name__ == "__main__":
+    main()
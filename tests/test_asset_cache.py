@@ -0,0 +1,90 @@
+import os
+import threading
+
+from src.utils.asset_cache import AssetCache, make_cache_key
+
+
+def _write(path, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_make_cache_key_ignores_argument_order():
+    assert make_cache_key(engine="imagen", prompt="a") == make_cache_key(prompt="a", engine="imagen")
+    assert make_cache_key(engine="imagen", prompt="a") != make_cache_key(engine="imagen", prompt="b")
+
+
+def test_store_then_fetch(tmp_path):
+    cache = AssetCache(str(tmp_path / "cache"), max_bytes=1 << 20)
+    src = _write(tmp_path / "img.png", b"png-bytes")
+    dest = tmp_path / "out.png"
+
+    assert not cache.fetch("k1", str(dest))
+    cache.store("k1", str(src))
+    assert cache.fetch("k1", str(dest))
+    assert dest.read_bytes() == b"png-bytes"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = AssetCache(str(tmp_path / "cache"), max_bytes=25)
+    for key in ("a", "b"):
+        cache.store(key, _write(tmp_path / key, b"x" * 10))
+    # Touch "a" so "b" is the oldest when "c" overflows the budget
+    assert cache.fetch("a", str(tmp_path / "a.out"))
+    cache.store("c", _write(tmp_path / "c", b"x" * 10))
+
+    assert cache.fetch("a", str(tmp_path / "a.out"))
+    assert not cache.fetch("b", str(tmp_path / "b.out"))
+    assert cache.fetch("c", str(tmp_path / "c.out"))
+    assert cache.stats()["size_bytes"] <= 25
+
+
+def test_get_or_create_only_creates_once(tmp_path):
+    cache = AssetCache(str(tmp_path / "cache"))
+    dest = str(tmp_path / "narration.mp3")
+    calls = []
+
+    def create():
+        calls.append(1)
+        _write(dest, b"mp3")
+
+    assert cache.get_or_create("k", dest, create) is False
+    os.remove(dest)
+    assert cache.get_or_create("k", dest, create) is True
+    assert len(calls) == 1 and os.path.exists(dest)
+
+
+def test_missing_blob_is_a_miss(tmp_path):
+    cache = AssetCache(str(tmp_path / "cache"))
+    cache.store("k", _write(tmp_path / "f", b"data"))
+    os.remove(cache._blob_path("k"))
+    assert not cache.fetch("k", str(tmp_path / "out"))
+    assert cache.stats()["entries"] == 0
+
+
+def test_concurrent_fetch_and_evict(tmp_path):
+    cache = AssetCache(str(tmp_path / "cache"), max_bytes=4096)
+    errors = []
+
+    def writer():
+        for i in range(60):
+            cache.store(f"k{i}", _write(tmp_path / f"src{i}", bytes([i]) * 1024))
+
+    def reader(n):
+        try:
+            for i in range(60):
+                dest = tmp_path / f"dest{n}"
+                if cache.fetch(f"k{i}", str(dest)):
+                    assert dest.read_bytes() == bytes([i]) * 1024
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader, args=(n,)) for n in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert not [p for p in os.listdir(tmp_path) if p.endswith(".tmp")]
@@ -0,0 +1,40 @@
+import shutil
+
+from PIL import Image
+
+from src.utils.asset_library import AssetLibrary
+
+
+def _image(path, color):
+    Image.new("RGB", (64, 36), color).save(path)
+    return str(path)
+
+
+def test_shots_are_reused_by_prompt_and_character(tmp_path):
+    library = AssetLibrary(str(tmp_path / "library"))
+    stored = library.add_shot("Tico salta en un árbol del bosque", "Tico", "cartoon", _image(tmp_path / "a.png", "red"))
+
+    assert library.find_shot("Tico salta en un árbol del bosque", "Tico", "cartoon") == stored
+    assert library.find_shot("Tico salta en un árbol del bosque", "Lola", "cartoon") is None
+    assert library.find_shot("Lola duerme junto al río", "Tico", "cartoon") is None
+
+
+def test_lookalike_images_are_stored_as_separate_shots(tmp_path):
+    library = AssetLibrary(str(tmp_path / "library"))
+    first = library.add_shot("Tico en el bosque", "Tico", "cartoon", _image(tmp_path / "a.png", "red"))
+    second = library.add_shot("Tico en la playa", "Tico", "cartoon", _image(tmp_path / "b.png", "red"))
+    assert first != second
+    assert library.stats()["shots"] == 2
+    assert library.find_shot("Tico en la playa", "Tico", "cartoon") == second
+
+
+def test_discard_removes_only_the_exact_shot(tmp_path):
+    library = AssetLibrary(str(tmp_path / "library"))
+    kept = library.add_shot("Tico en el bosque", "Tico", "cartoon", _image(tmp_path / "a.png", (200, 10, 10)))
+    rejected = library.add_shot("Tico en la playa", "Tico", "cartoon", _image(tmp_path / "b.png", (201, 10, 10)))
+    scene_copy = tmp_path / "scene_002_Tico.png"
+    shutil.copyfile(rejected, scene_copy)
+
+    assert library.discard_content(str(scene_copy)) == 1
+    assert library.find_shot("Tico en la playa", "Tico", "cartoon") is None
+    assert library.find_shot("Tico en el bosque", "Tico", "cartoon") == kept
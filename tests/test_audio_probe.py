@@ -0,0 +1,44 @@
+import wave
+
+import pytest
+
+from src.utils.audio_probe import audio_duration, mp3_duration
+from src.utils.ffmpeg import run_ffmpeg
+
+TONE = ["-f", "lavfi", "-i", "sine=frequency=440:duration=2.8:sample_rate=44100"]
+
+
+def _decoded_seconds(path):
+    """Length of the audio ffmpeg actually decodes from `path`."""
+    pcm = run_ffmpeg(["-i", str(path), "-f", "s16le", "-ac", "1", "-ar", "44100", "pipe:1"]).stdout
+    return len(pcm) / 2 / 44100
+
+
+def test_vbr_lame_tag_matches_decoded_length(tmp_path):
+    # Written to a seekable file, libmp3lame adds a Xing header with a LAME tag (delay and padding)
+    path = tmp_path / "vbr.mp3"
+    run_ffmpeg(TONE + ["-c:a", "libmp3lame", "-q:a", "4", str(path)])
+    assert b"Xing" in path.read_bytes()[:2048]
+    assert mp3_duration(str(path)) == pytest.approx(_decoded_seconds(path), abs=0.001)
+
+
+def test_mp3_without_vbr_header_walks_frames(tmp_path):
+    # Piped output cannot be seeked back to, so no Xing header is written
+    path = tmp_path / "piped.mp3"
+    path.write_bytes(run_ffmpeg(TONE + ["-c:a", "libmp3lame", "-q:a", "4", "-f", "mp3", "pipe:1"]).stdout)
+    assert b"Xing" not in path.read_bytes()[:2048]
+    # Without the tag the encoder delay stays in, i.e. at most a couple of frames over
+    assert mp3_duration(str(path)) == pytest.approx(2.8, abs=0.06)
+
+
+def test_wav_and_non_audio(tmp_path):
+    path = tmp_path / "tone.wav"
+    with wave.open(str(path), 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(22050)
+        w.writeframes(b"\0\0" * 22050 * 3)
+    assert audio_duration(str(path)) == pytest.approx(3.0)
+    (tmp_path / "notes.mp3").write_bytes(b"not audio at all")
+    assert mp3_duration(str(tmp_path / "notes.mp3")) is None
+    assert audio_duration(str(tmp_path / "missing.mp3")) is None
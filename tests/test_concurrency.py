@@ -0,0 +1,73 @@
+import threading
+import time
+
+from src.utils.concurrency import ProviderLimits, map_ordered, provider_limits, provider_slot
+from src.utils.rate_limiter import TokenBucket, parse_retry_after
+
+
+def test_provider_slot_bounds_in_flight_requests():
+    limits = ProviderLimits({"test-slot": 2})
+    in_flight, peak = 0, 0
+    lock = threading.Lock()
+
+    def call(_, __):
+        nonlocal in_flight, peak
+        with provider_slot("test-slot", limits):
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+
+    map_ordered(call, range(8), max_workers=8)
+    assert peak == 2
+
+
+def test_provider_limits_are_per_settings():
+    tuned = {"performance": {"providers": {"imagen": {"concurrency": 1, "rate": 5, "burst": 1}}}}
+    assert provider_limits({}) is provider_limits({"performance": {"visual_workers": 2}})
+    assert provider_limits(tuned) is provider_limits(tuned)
+    assert provider_limits(tuned) is not provider_limits({})
+    # A pod's overrides never leak into the defaults other pods use
+    assert provider_limits(tuned).bucket("imagen").rate == 5
+    assert provider_limits({}).bucket("imagen").rate != 5
+    assert provider_limits({}).bucket("not-limited") is None
+
+
+def test_map_ordered_keeps_order_and_reraises():
+    assert map_ordered(lambda i, x: x * 2, [3, 1, 2], max_workers=3) == [6, 2, 4]
+
+    def boom(i, x):
+        raise ValueError(x)
+
+    try:
+        map_ordered(boom, [1, 2], max_workers=2)
+    except ValueError as e:
+        assert e.args == (1,)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_token_bucket_paces_after_burst():
+    bucket = TokenBucket(rate=20, burst=2)
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    # Two tokens are free, the other two take 1/20 s each
+    assert 0.08 <= time.monotonic() - start < 0.5
+
+
+def test_token_bucket_pause_blocks_until_deadline():
+    bucket = TokenBucket(rate=1000, burst=5)
+    bucket.pause(0.1)
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None, default=2.0) == 2.0
+    assert parse_retry_after("garbage", default=1.5) == 1.5
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
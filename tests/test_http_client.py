@@ -0,0 +1,44 @@
+import io
+
+import requests
+
+from src.utils import http_client
+from src.utils.concurrency import ProviderLimits
+
+
+def _response(status: int) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.headers["Retry-After"] = "0"
+    response.raw = io.BytesIO(b"body")
+    response.closed = False
+
+    def close():
+        response.closed = True
+    response.close = close
+    return response
+
+
+def test_retried_streamed_responses_are_closed(monkeypatch):
+    responses = [_response(503), _response(429), _response(200)]
+    calls = iter(responses)
+    monkeypatch.setattr(http_client._session, "request", lambda *args, **kwargs: next(calls))
+
+    result = http_client.request("test-retry-close", "POST", "http://stand-in/tts", limits=ProviderLimits(),
+                                 stream=True)
+
+    assert result is responses[2] and not result.closed
+    assert responses[0].closed and responses[1].closed
+
+
+def test_last_response_is_returned_when_retries_run_out(monkeypatch):
+    monkeypatch.setattr(http_client, "HTTP_MAX_ATTEMPTS", 2)
+    responses = [_response(503), _response(503)]
+    calls = iter(responses)
+    monkeypatch.setattr(http_client._session, "request", lambda *args, **kwargs: next(calls))
+
+    result = http_client.request("test-retry-exhausted", "GET", "http://stand-in/", limits=ProviderLimits(),
+                                 stream=True)
+
+    assert result is responses[1] and result.status_code == 503
+    assert responses[0].closed
@@ -0,0 +1,45 @@
+import numpy as np
+from PIL import Image
+
+from src.engines.ffmpeg_renderer import FFmpegRenderer
+from src.engines.video_engine import VideoAssembler
+from src.utils.ffmpeg import run_ffmpeg
+
+SCRIPT = {"title": "Prueba", "scenes": [{"visual_prompt": "bosque", "audio_text": "", "duration_est": 1},
+                                        {"visual_prompt": "playa", "audio_text": "", "duration_est": 1}]}
+
+
+def _frame(path, t):
+    return run_ffmpeg(["-ss", str(t), "-i", str(path), "-frames:v", "1",
+                       "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"]).stdout
+
+
+def test_incremental_frames_match_a_full_render(tmp_path, monkeypatch):
+    pod_dir = tmp_path / "pod"
+    pod_dir.mkdir()
+    config = {"render": {"backend": "segments", "profile": "preview",
+                         "profiles": {"preview": {"height": 90, "fps": 6}}},
+              "subtitles": {"formats": []}}
+    assembler = VideoAssembler(str(pod_dir / "config.json"), config=config)
+    images = []
+    for n, size in enumerate([(160, 90), (240, 90)]):
+        path = tmp_path / f"scene_{n}.png"
+        Image.effect_mandelbrot(size, (-2.2, -1.2, 1.0, 1.2), 40).convert("RGB").save(path)
+        images.append(str(path))
+
+    # Separate segment caches, so the full render cannot reuse the incremental segments
+    monkeypatch.setattr(FFmpegRenderer.submit_segment, "__defaults__", (str(tmp_path / "incremental"),))
+    monkeypatch.setattr(FFmpegRenderer.render_segments, "__defaults__", (None, str(tmp_path / "full")))
+    try:
+        incremental = assembler.start_incremental(SCRIPT, run_id="inc")
+        # The first scene is queued before the wider second image exists
+        incremental.scene_ready(0, images[0], None)
+        incremental_path = incremental.finish(images, {})
+    finally:
+        assembler.close()
+    full_path = assembler.assemble_video(SCRIPT, images, {}, run_id="full")
+
+    for t in (0.5, 1.5):
+        frame = _frame(incremental_path, t)
+        assert len(frame) == 240 * 90 * 3
+        assert np.array_equal(np.frombuffer(frame, np.uint8), np.frombuffer(_frame(full_path, t), np.uint8))
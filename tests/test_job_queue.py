@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.utils.job_queue import JobQueue
+from src.worker import make_job_server
+
+
+def _queue(tmp_path, **kwargs):
+    kwargs.setdefault("pod_concurrency", 1)
+    kwargs.setdefault("max_attempts", 2)
+    kwargs.setdefault("stale_seconds", 60)
+    return JobQueue(str(tmp_path / "jobs.sqlite"), **kwargs)
+
+
+def test_claims_in_fifo_order_with_per_pod_limit(tmp_path):
+    queue = _queue(tmp_path)
+    first = queue.enqueue("kids_story", "uno")
+    queue.enqueue("kids_story", "dos")
+    other = queue.enqueue("science", "tres", {"profile": "preview"})
+
+    job = queue.claim("w1")
+    assert job["id"] == first and job["status"] == "running" and job["attempts"] == 1
+    # kids_story already has one running job, so the next claim skips to the other pod
+    job = queue.claim("w2")
+    assert job["id"] == other and job["options"] == {"profile": "preview"}
+    assert queue.claim("w3") is None
+
+    queue.complete(first, "w1", "out.mp4")
+    assert queue.claim("w3")["topic"] == "dos"
+    assert queue.counts() == {"queued": 0, "running": 2, "done": 1, "failed": 0}
+
+
+def test_fail_requeues_until_attempts_run_out(tmp_path):
+    queue = _queue(tmp_path)
+    job_id = queue.enqueue("kids_story", "uno")
+
+    queue.claim("w1")
+    assert queue.fail(job_id, "w1", "boom") == "queued"
+    queue.claim("w1")
+    assert queue.fail(job_id, "w1", "boom") == "failed"
+    assert queue.get(job_id)["error"] == "boom"
+    assert queue.claim("w1") is None
+
+
+def test_fail_without_retry_is_final(tmp_path):
+    queue = _queue(tmp_path)
+    job_id = queue.enqueue("kids_story", "uno")
+    queue.claim("w1")
+    assert queue.fail(job_id, "w1", "bad config", retry=False) == "failed"
+
+
+def test_stale_running_job_is_requeued(tmp_path):
+    queue = _queue(tmp_path, stale_seconds=0.05)
+    job_id = queue.enqueue("kids_story", "uno")
+    queue.claim("w1")
+    time.sleep(0.1)
+
+    job = queue.claim("w2")
+    assert job["id"] == job_id and job["worker"] == "w2" and job["attempts"] == 2
+
+
+def test_requeued_job_ignores_its_previous_worker(tmp_path):
+    queue = _queue(tmp_path, stale_seconds=0.05)
+    job_id = queue.enqueue("kids_story", "uno")
+    queue.claim("w1")
+    time.sleep(0.1)
+    queue.claim("w2")
+
+    # w1 finishes late: neither its result nor its failure touches w2's attempt
+    assert queue.complete(job_id, "w1", "late.mp4") is False
+    assert queue.fail(job_id, "w1", "boom") is None
+    job = queue.get(job_id)
+    assert job["status"] == "running" and job["worker"] == "w2" and job["output"] is None
+    assert queue.complete(job_id, "w2", "out.mp4") is True
+
+
+@pytest.mark.parametrize("pod, options", [("../x", None), ("kids/story", None), ("", None),
+                                          ("kids_story", ["profile"]), ("kids_story", "preview")])
+def test_enqueue_rejects_bad_pod_or_options(tmp_path, pod, options):
+    with pytest.raises(ValueError):
+        _queue(tmp_path).enqueue(pod, "uno", options)
+
+
+def test_job_server_answers_400_on_invalid_jobs(tmp_path):
+    queue = _queue(tmp_path)
+    server = make_job_server(queue, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/jobs"
+
+    def post(payload):
+        request = urllib.request.Request(url, data=json.dumps(payload).encode(), method="POST")
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    try:
+        assert post({"pod": "../x", "topic": "uno"}) == 400
+        assert post({"pod": "kids_story", "topic": "uno", "options": "preview"}) == 400
+        assert post({"pod": "kids_story", "topic": "uno", "options": {"profile": "preview"}}) == 201
+        assert queue.counts()["queued"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.engines.ken_burns import KenBurns, RESAMPLE_MODES
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    path = tmp_path / "scene.png"
+    Image.effect_mandelbrot((320, 180), (-2.2, -1.2, 1.0, 1.2), 60).convert("RGB").save(path)
+    return str(path)
+
+
+def test_default_resample_is_prescaled(image_path):
+    assert KenBurns(image_path, (320, 180), 320, 2.0).resample == "bilinear"
+
+
+@pytest.mark.parametrize("resample", ["bilinear", "nearest"])
+def test_frames_are_written_into_the_buffer(image_path, resample):
+    engine = KenBurns(image_path, (320, 180), 300, 2.0, resample=resample)
+    buffer = np.zeros((180, 300, 3), dtype=np.uint8)
+    first = engine.render(0.0, buffer).copy()
+    assert engine.render(2.0, buffer) is buffer
+    assert buffer.any() and not np.array_equal(first, buffer)
+
+
+@pytest.mark.parametrize("resample", RESAMPLE_MODES)
+def test_modes_agree_on_framing(image_path, resample):
+    reference = KenBurns(image_path, (320, 180), 320, 2.0, resample="lanczos")
+    engine = KenBurns(image_path, (320, 180), 320, 2.0, resample=resample)
+    for t in (0.0, 1.0, 2.0):
+        expected = reference.render(t, np.empty((180, 320, 3), dtype=np.uint8)).astype(np.int16)
+        frame = engine.render(t, np.empty((180, 320, 3), dtype=np.uint8))
+        assert np.abs(frame - expected).mean() < 8
+
+
+def test_unknown_resample_is_rejected(image_path):
+    with pytest.raises(ValueError):
+        KenBurns(image_path, (320, 180), 320, 2.0, resample="cubic")
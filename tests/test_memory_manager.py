@@ -0,0 +1,67 @@
+import sqlite3
+
+from src.utils import memory_manager
+from src.utils.memory_manager import MemoryManager
+
+
+def test_cache_sees_commits_from_other_managers_in_the_same_tick(tmp_path):
+    reader, writer = MemoryManager(str(tmp_path)), MemoryManager(str(tmp_path))
+    assert reader.episode_count() == 0
+    for n in range(3):
+        # No sleep: a file mtime could be unchanged between these commits
+        writer.add_episode({"title": f"Episodio {n}", "summary": f"Resumen {n}"})
+        assert reader.episode_count() == n + 1
+    assert [ep["title"] for ep in reader.recent_episodes(2)] == ["Episodio 1", "Episodio 2"]
+
+
+def test_repeated_reads_are_cached(tmp_path, monkeypatch):
+    memory = MemoryManager(str(tmp_path))
+    memory.add_episode({"title": "Uno", "summary": "Tico encuentra una bellota"})
+    assert memory.episode_count() == 1
+    monkeypatch.setattr(memory, "_connect", lambda: (_ for _ in ()).throw(AssertionError("not cached")))
+    assert memory.episode_count() == 1
+
+
+def test_add_episode_updates_character_search(tmp_path):
+    memory = MemoryManager(str(tmp_path))
+    memory.save_memory({"episodes": [], "current_state": {"characters": {"Tico": {"humor": "alegre"}}}})
+    memory.add_episode({"title": "La bellota", "summary": "Tico esconde una bellota",
+                        "characters": {"Lola": {"ultimo_episodio": "La bellota"}, "Tico": {"humor": "curioso"}}})
+    assert memory.current_state()["characters"] == {"Tico": {"humor": "curioso"},
+                                                    "Lola": {"ultimo_episodio": "La bellota"}}
+    assert list(memory.search_characters("bellota")) == ["Lola"]
+    assert list(memory.search_characters("curioso")) == ["Tico"]
+    assert memory.search_characters("alegre") == {}
+
+
+def test_search_ignores_spanish_stopwords(tmp_path):
+    memory = MemoryManager(str(tmp_path))
+    memory.add_episode({"title": "El río", "summary": "Tico cruza el río con los patos"})
+    memory.add_episode({"title": "La nuez", "summary": "Lola encuentra una nuez para los niños"})
+    found = memory.search_episodes("una aventura con los patos", 2)
+    assert [ep["title"] for _, ep in found] == ["El río"]
+
+
+def test_search_index_waits_for_a_locked_database(tmp_path, monkeypatch):
+    blocker = sqlite3.connect(str(tmp_path / "universe_memory.sqlite"), isolation_level=None)
+    blocker.execute("CREATE TABLE episodes (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, summary TEXT, "
+                    "data TEXT NOT NULL, created REAL NOT NULL)")
+    blocker.execute("CREATE TABLE state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    blocker.execute("BEGIN IMMEDIATE")
+    monkeypatch.setattr(MemoryManager, "_connect",
+                        lambda self: sqlite3.connect(self.memory_file, timeout=0.05, isolation_level=None))
+    # The other writer finishes while the manager backs off
+    monkeypatch.setattr(memory_manager.time, "sleep", lambda seconds: blocker.execute("ROLLBACK"))
+
+    memory = MemoryManager(str(tmp_path))
+    memory.save_memory({"episodes": [], "current_state": {"characters": {"Tico": {"humor": "alegre"}}}})
+    assert list(memory.search_characters("alegre")) == ["Tico"]
+    blocker.close()
+
+
+def test_close_releases_the_watcher(tmp_path):
+    with MemoryManager(str(tmp_path)) as memory:
+        memory.add_episode({"title": "Uno", "summary": "Tico encuentra una bellota"})
+        assert memory.episode_count() == 1 and memory._watch is not None
+    assert memory._watch is None
+    assert memory.episode_count() == 1
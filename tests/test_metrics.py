@@ -0,0 +1,22 @@
+from src.utils.metrics import RunMetrics
+
+
+def test_prometheus_escapes_label_values():
+    metrics = RunMetrics(run_id="r1", pod='pod "x"')
+    metrics.incr("api_calls", provider="a\\b\nc")
+    text = metrics.to_prometheus()
+    assert 'pod="pod \\"x\\""' in text
+    assert 'provider="a\\\\b\\nc"' in text
+    # One sample per line: the newline inside the label never splits a line
+    assert all(line.startswith(("#", "videocreator_")) for line in text.splitlines())
+
+
+def test_counters_and_process_peak_memory():
+    metrics = RunMetrics(run_id="r1", pod="kids_story")
+    metrics.incr("retries", provider="imagen")
+    metrics.incr("retries", 2, provider="imagen")
+    metrics.incr("retries", provider="elevenlabs")
+    assert metrics.counter_total("retries") == 4
+    data = metrics.to_dict()
+    assert data["process_peak_memory_mb"] > 0
+    assert "videocreator_process_peak_memory_mb{" in metrics.to_prometheus()
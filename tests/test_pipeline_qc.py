@@ -0,0 +1,74 @@
+import json
+import os
+
+import pytest
+
+from src.pipeline import PodPipeline
+from src.utils import quality_control
+from src.utils.quality_control import QualityCheckError
+
+
+class FakeAssembler:
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.renders = 0
+
+    def assemble_video(self, script, visual_paths, audio_paths, language_tracks=None, run_id=None):
+        self.renders += 1
+        path = os.path.join(self.output_dir, f"video_{run_id}.mp4")
+        with open(path, 'wb') as f:
+            f.write(b"render %d" % self.renders)
+        return path
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    def make(**qc):
+        pod_dir = tmp_path / "pods" / "demo"
+        pod_dir.mkdir(parents=True, exist_ok=True)
+        (pod_dir / "config.json").write_text(json.dumps({"qc": qc}), encoding="utf-8")
+        pipeline = PodPipeline("demo", project_root=str(tmp_path))
+        pipeline._engines["video"] = FakeAssembler(str(tmp_path))
+        return pipeline
+
+    monkeypatch.setattr(quality_control, "check_assets", lambda *args: {"stage": "assets", "passed": True, "issues": []})
+    return make
+
+
+def _video_report(passed):
+    issues = [] if passed else [{"check": "av_drift", "severity": "error", "path": None, "detail": "drift"}]
+    return {"stage": "video", "passed": passed, "issues": issues}
+
+
+def test_gated_video_failure_is_moved_aside_and_rendered_again(pipeline, monkeypatch):
+    pipeline = pipeline(gate=True)
+    manifest = pipeline.new_manifest("tema")
+    monkeypatch.setattr(quality_control, "check_video", lambda path: _video_report(False))
+
+    with pytest.raises(QualityCheckError):
+        pipeline.render({"scenes": []}, [], {}, manifest)
+    assert not manifest.is_done("assembly")
+    run_dir = os.path.dirname(manifest.path)
+    assert [name for name in os.listdir(run_dir) if name.startswith("rejected_")]
+
+    checks = []
+    monkeypatch.setattr(quality_control, "check_video", lambda path: checks.append(path) or _video_report(True))
+    path = pipeline.render({"scenes": []}, [], {}, manifest)
+    assert manifest.is_done("assembly") and pipeline.video_engine.renders == 2 and checks == [path]
+
+    # Resuming a verified render neither re-renders nor re-checks it
+    assert pipeline.render({"scenes": []}, [], {}, manifest) == path
+    assert pipeline.video_engine.renders == 2 and checks == [path]
+
+
+def test_qc_only_reports_by_default(pipeline, monkeypatch):
+    pipeline = pipeline()
+    manifest = pipeline.new_manifest("tema")
+    monkeypatch.setattr(quality_control, "check_video", lambda path: _video_report(False))
+
+    path = pipeline.render({"scenes": []}, [], {}, manifest)
+    assert os.path.exists(path) and manifest.is_done("assembly")
+    assert manifest.get("qc_video", "passed") is False
@@ -0,0 +1,22 @@
+import subprocess
+import sys
+
+import pytest
+
+from src.utils.audio_probe import mp3_duration
+from src.utils.placeholders import imagen_size, placeholder_mp3, placeholder_png, speech_seconds
+
+
+def test_payloads_match_provider_sizes(tmp_path):
+    assert imagen_size("9:16") == (768, 1408) and imagen_size("unknown") == (1408, 768)
+    assert placeholder_png(32, 18).startswith(b"\x89PNG")
+    path = tmp_path / "narration.mp3"
+    path.write_bytes(placeholder_mp3(speech_seconds("Hola Tico, vamos a jugar al bosque")))
+    assert mp3_duration(str(path)) == pytest.approx(speech_seconds("Hola Tico, vamos a jugar al bosque"), abs=0.1)
+
+
+def test_engines_do_not_import_the_standin_server():
+    code = ("import sys, src.engines.audio_engine, src.engines.visual_engine; "
+            "print('src.utils.standins' in sys.modules, 'http.server' in sys.modules)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.split() == ["False", "False"]
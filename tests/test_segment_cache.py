@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+from src.engines import ffmpeg_renderer
+from src.engines.ffmpeg_renderer import prune_segment_cache
+
+
+def _segment(directory, name, size, mtime):
+    path = directory / name
+    path.write_bytes(b"\0" * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_prune_removes_least_recently_used_first(tmp_path):
+    old = _segment(tmp_path, "a.mp4", 100, 1000)
+    mid = _segment(tmp_path, "b.mp4", 100, 2000)
+    new = _segment(tmp_path, "c.mp4", 100, 3000)
+    rendering = _segment(tmp_path, "d.mp4.1234abcd.tmp.mp4", 500, 500)
+
+    assert prune_segment_cache(str(tmp_path), max_bytes=250) == 100
+    assert not old.exists() and mid.exists() and new.exists()
+    # Segments still being encoded are never counted or removed
+    assert rendering.exists()
+
+
+def test_prune_within_budget_keeps_everything(tmp_path):
+    _segment(tmp_path, "a.mp4", 100, 1000)
+    assert prune_segment_cache(str(tmp_path), max_bytes=100) == 0
+    assert os.listdir(tmp_path) == ["a.mp4"]
+
+
+def test_failed_segment_encode_removes_its_temp_file(tmp_path, monkeypatch):
+    partial = tmp_path / "a.mp4.1234abcd.tmp.mp4"
+
+    def failing_encode(args, two_pass=False):
+        partial.write_bytes(b"partial")
+        raise Exception("ffmpeg failed (1)")
+
+    monkeypatch.setattr(ffmpeg_renderer, "run_encode", failing_encode)
+    with pytest.raises(Exception, match="ffmpeg failed"):
+        ffmpeg_renderer._render_segment(["-i", "scene.png", str(partial)], str(tmp_path / "a.mp4"))
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,63 @@
+import subprocess
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.engines import stream_renderer
+from src.engines.stream_renderer import StreamingRenderer
+
+
+def test_narration_slots_absorb_silent_scenes():
+    timeline = [{"audio": None, "duration": 1.0}, {"audio": "a.mp3", "duration": 2.0},
+                {"audio": None, "duration": 0.5}, {"audio": "b.mp3", "duration": 3.0}]
+    lead, entries = StreamingRenderer().narration_entries(timeline)
+    assert lead == 1.0
+    assert entries == [["a.mp3", 2.5], ["b.mp3", 3.0]]
+
+
+def test_narration_list_escapes_quotes(tmp_path):
+    list_path = tmp_path / "narration.txt"
+    StreamingRenderer().write_narration_list([[str(tmp_path / "it's.mp3"), 1.25]], str(list_path))
+    assert list_path.read_text(encoding="utf-8") == f"file '{tmp_path}/it'\\''s.mp3'\nduration 1.250000\n"
+
+
+def test_encoder_is_killed_when_a_scene_fails(monkeypatch, tmp_path):
+    started = []
+
+    class RecordingPopen(subprocess.Popen):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            started.append(self)
+
+    def failing_frames(*args):
+        raise RuntimeError("corrupt image")
+        yield
+
+    renderer = StreamingRenderer(height=64)
+    monkeypatch.setattr(stream_renderer.subprocess, "Popen", RecordingPopen)
+    monkeypatch.setattr(renderer, "scene_frames", failing_frames)
+    timeline = [{"image": "unused.png", "audio": None, "duration": 1.0}]
+    args = renderer.build_stream_command(timeline, (64, 64), str(tmp_path / "out.mp4"), str(tmp_path / "unused.txt"))
+
+    with pytest.raises(RuntimeError):
+        renderer._encode(timeline, (64, 64), args)
+    assert started and started[0].returncode is not None
+
+
+def test_captions_do_not_accumulate_in_letterbox_bars(tmp_path):
+    image = tmp_path / "narrow.png"
+    Image.new("RGB", (90, 160), (40, 120, 200)).save(image)
+    renderer = StreamingRenderer(height=160, burn_subtitles=True)
+    renderer.caption_size = 14
+    scene = {"image": str(image), "duration": 2.0,
+             "cues": [(0.0, 1.0, "Una frase bastante larga para la banda"), (1.0, 2.0, "Hola")]}
+    canvas = (320, 160)
+    buffer = np.zeros((160, 320, 3), dtype=np.uint8)
+
+    frames = [frame.copy() for frame in renderer.scene_frames(scene, 48, canvas, buffer)]
+    # The second cue is short and stays inside the view, so the bars must be black again
+    assert frames[0][:, :10].any()
+    assert not frames[-1][:, :10].any() and not frames[-1][:, -10:].any()
+    # A caption held for several frames is not blended over itself
+    assert np.array_equal(frames[1][:, :10], frames[2][:, :10])
@@ -0,0 +1,36 @@
+import pytest
+
+from src.engines.subtitles import scene_cues, split_caption_lines, timeline_cues, to_srt, to_vtt
+
+
+def test_split_caption_lines_breaks_on_sentences_and_limits():
+    lines = split_caption_lines("Hola Tico. Vamos a jugar con la pelota roja en el parque grande",
+                                max_words=5, max_chars=40)
+    assert lines[0] == "Hola Tico."
+    assert all(len(line.split()) <= 5 for line in lines)
+    assert " ".join(lines) == "Hola Tico. Vamos a jugar con la pelota roja en el parque grande"
+
+
+def test_scene_cues_cover_the_scene():
+    cues = scene_cues("Había una vez un perro. Se llamaba Tico y le gustaba correr.", 4.0)
+    assert cues[0][0] == 0.0
+    assert cues[-1][1] == pytest.approx(4.0, abs=0.001)
+    for (_, end, _), (start, _, _) in zip(cues, cues[1:]):
+        assert start == end
+    assert scene_cues("", 3.0) == [] and scene_cues("Hola.", 0) == []
+
+
+def test_timeline_cues_shift_by_scene_start():
+    timeline = [
+        {"duration": 2.5, "cues": [(0.0, 2.5, "Uno.")]},
+        {"duration": 1.0, "cues": []},
+        {"duration": 3.0, "cues": [(0.0, 1.0, "Dos."), (1.0, 3.0, "Tres.")]},
+    ]
+    assert timeline_cues(timeline) == [(0.0, 2.5, "Uno."), (3.5, 4.5, "Dos."), (4.5, 6.5, "Tres.")]
+
+
+def test_srt_and_vtt_timestamps():
+    cues = [(0.0, 1.5, "Hola."), (3661.25, 3662.0, "Adiós.")]
+    assert to_srt(cues) == ("1\n00:00:00,000 --> 00:00:01,500\nHola.\n\n"
+                            "2\n01:01:01,250 --> 01:01:02,000\nAdiós.\n\n")
+    assert to_vtt(cues).startswith("WEBVTT\n\n00:00:00.000 --> 00:00:01.500\nHola.\n")